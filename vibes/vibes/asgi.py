@@ -8,9 +8,26 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
 
 import os
+import warnings
 
 from django.core.asgi import get_asgi_application
 
+from vibes import telemetry
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "vibes.settings")
+os.environ.setdefault("ASYNC_READ_VIEWS", "true")
+# Persistent connections are per thread, and async views use short-lived
+# ones; under ASGI connections are reused through DATABASE_POOL instead.
+os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
+os.environ.setdefault("DATABASE_POOL", "true")
+if os.environ["DATABASE_POOL"].lower() != "true" and os.environ["DATABASE_CONN_MAX_AGE"] == "0":
+    warnings.warn(
+        "DATABASE_POOL is off under ASGI, so every request opens a new database connection", RuntimeWarning
+    )
 
+telemetry.configure()
 application = get_asgi_application()
+
+from vibez_api.posts.suggest import build_index  # noqa: E402
+
+build_index()
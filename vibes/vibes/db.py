@@ -0,0 +1,53 @@
+"""
+Connection pool metrics for databases configured with OPTIONS['pool'].
+
+The gauges are read from psycopg_pool's own statistics each time the meter
+collects, so nothing is added to the request path.
+"""
+from django.conf import settings
+from django.db import connections
+from opentelemetry.metrics import Observation, get_meter
+
+meter = get_meter("vibes-django-app")
+
+
+def pool_stats():
+    """(alias, stats) for every pooled database; stats are cumulative since the pool was created."""
+    for alias, database in settings.DATABASES.items():
+        if not database.get('OPTIONS', {}).get('pool'):
+            continue
+        pool = connections[alias].pool
+        if pool is not None:
+            yield alias, pool.get_stats()
+
+
+def observe(read):
+    def callback(options):
+        return [Observation(read(stats), {'db.alias': alias}) for alias, stats in pool_stats()]
+    return callback
+
+
+meter.create_observable_gauge(
+    "db_pool_connections_in_use", unit="{connection}", description="Pooled connections lent out to requests",
+    callbacks=[observe(lambda stats: stats.get('pool_size', 0) - stats.get('pool_available', 0))],
+)
+meter.create_observable_gauge(
+    "db_pool_connections_idle", unit="{connection}", description="Pooled connections ready to be lent out",
+    callbacks=[observe(lambda stats: stats.get('pool_available', 0))],
+)
+meter.create_observable_gauge(
+    "db_pool_requests_waiting", unit="{request}", description="Requests queued for a pooled connection",
+    callbacks=[observe(lambda stats: stats.get('requests_waiting', 0))],
+)
+meter.create_observable_counter(
+    "db_pool_requests_queued", unit="{request}", description="Requests that had to wait for a pooled connection",
+    callbacks=[observe(lambda stats: stats.get('requests_queued', 0))],
+)
+meter.create_observable_counter(
+    "db_pool_wait_time", unit="ms", description="Time requests spent waiting for a pooled connection",
+    callbacks=[observe(lambda stats: stats.get('requests_wait_ms', 0))],
+)
+meter.create_observable_counter(
+    "db_pool_requests_failed", unit="{request}", description="Requests that timed out or were refused a connection",
+    callbacks=[observe(lambda stats: stats.get('requests_errors', 0))],
+)
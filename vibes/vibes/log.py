@@ -0,0 +1,149 @@
+"""
+Logging that keeps formatting and I/O off request threads.
+
+``configure`` is the LOGGING_CONFIG callable. It applies settings.LOGGING
+as dictConfig would, then starts the listener of every QueueHandler in it:
+callers only put records on a bounded queue, and a background thread formats
+them and hands them to the real handlers named in the QueueHandler's
+``targets`` entry (what Python 3.12's dictConfig does with
+``queue_handler``).
+"""
+import atexit
+import json
+import logging
+import logging.config
+import logging.handlers
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with anything passed as `extra` as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per logger name. ``limits`` maps logger names to records
+    per second and also covers their children; loggers without a limit are
+    let through. Records at ERROR and above are never held back. The next
+    record let through after a quiet spell carries how many were dropped in
+    ``suppressed``.
+    """
+
+    def __init__(self, limits=None):
+        super().__init__()
+        self.limits = limits or {}
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def rate_for(self, name):
+        while name:
+            if name in self.limits:
+                return self.limits[name]
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(record.name)
+            if bucket is None:
+                rate = self.rate_for(record.name)
+                bucket = self.buckets[record.name] = {'rate': rate, 'tokens': rate, 'at': now, 'suppressed': 0}
+            rate = bucket['rate']
+            if rate is None:
+                return True
+
+            bucket['tokens'] = min(rate, bucket['tokens'] + (now - bucket['at']) * rate)
+            bucket['at'] = now
+            if bucket['tokens'] < 1:
+                bucket['suppressed'] += 1
+                return False
+            bucket['tokens'] -= 1
+            suppressed, bucket['suppressed'] = bucket['suppressed'], 0
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on a bounded queue for a listener thread. ``targets`` names
+    the handlers from the same LOGGING config the listener writes to. When
+    the queue is full, records are dropped rather than blocking the caller.
+
+    Configure it with the ``"()"`` factory key, not ``"class"``: on Python
+    3.12+ dictConfig builds its own queue and listener for any QueueHandler
+    subclass named by ``"class"``, and insists on a ``handlers`` list.
+    """
+
+    def __init__(self, targets=(), maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.targets = list(targets)
+        self.listener = None
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The base class formats (and copies) here, on the caller's thread.
+        # Only the message arguments are bound now, since they may change
+        # once the caller moves on; formatting is left to the listener's
+        # handlers. Binding in place leaves the record's output unchanged
+        # for any other handler, so no copy is needed.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self, handlers):
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+def configure(config):
+    configurator = logging.config.dictConfigClass(config)
+    configurator.configure()
+    handlers = configurator.config.get('handlers', {})
+    for handler in list(handlers.values()):
+        if isinstance(handler, QueueHandler):
+            handler.start([handlers[name] for name in handler.targets])
@@ -1,16 +1,129 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
 from opentelemetry.metrics import get_meter
 
+logger = logging.getLogger(__name__)
+
 meter = get_meter("vibes-django-app")
 request_counter = meter.create_counter("http_requests_total", description="Total number of HTTP requests")
+# Milliseconds rather than seconds so the SDK's default bucket boundaries fit
+request_duration = meter.create_histogram(
+    "http_request_duration", unit="ms", description="Time spent handling a request"
+)
+query_count = meter.create_histogram(
+    "http_request_db_queries", unit="{query}", description="Database queries executed per request"
+)
+query_duration = meter.create_histogram(
+    "http_request_db_duration", unit="ms", description="Time spent in database queries per request"
+)
+response_size = meter.create_histogram(
+    "http_response_size", unit="By", description="Size of the response body"
+)
+budget_exceeded = meter.create_counter(
+    "http_request_query_budget_exceeded_total", description="Requests that ran more queries than their route allows"
+)
+
+
+class QueryStats:
+    """A connection execute_wrapper that counts and times every query it sees."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def query_budget(method, route):
+    budgets = settings.QUERY_BUDGETS
+    if f'{method} {route}' in budgets:
+        return budgets[f'{method} {route}']
+    if method in ('GET', 'HEAD') and route in budgets:
+        return budgets[route]
+    return settings.QUERY_BUDGET_DEFAULT
+
+
+def wrap_connections(stats):
+    """An ExitStack with ``stats`` wrapped around every database connection of the current thread."""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(stats))
+    return stack
 
 
 class RequestCounterMiddleware:
-    """Middleware to count all incoming HTTP requests."""
+    """
+    Per-request performance metrics: duration, database query count and
+    time, and response size, labelled with the resolved route name, method
+    and status class. Requests that run more queries than their route's
+    budget (QUERY_BUDGETS) are logged and counted, so an N+1 shows up as
+    soon as it ships.
+
+    Runs natively under both WSGI and ASGI, so async views are not pushed
+    onto a thread by this middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        request_counter.add(1)  # Increment counter for each request
-        response = self.get_response(request)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        started = time.perf_counter()
+        with wrap_connections(stats):
+            response = self.get_response(request)
+        self.record(request, response, stats, time.perf_counter() - started)
         return response
+
+    async def __acall__(self, request):
+        # Connections belong to the thread the ORM runs queries in, so the
+        # wrappers are installed and removed there rather than on the loop.
+        stats = QueryStats()
+        started = time.perf_counter()
+        wrappers = await sync_to_async(wrap_connections)(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, stats, elapsed):
+        match = request.resolver_match
+        route = match.url_name or match.route if match else 'unmatched'
+        attributes = {
+            'http.route': route,
+            'http.request.method': request.method,
+            'http.status_class': f'{response.status_code // 100}xx',
+        }
+        request_counter.add(1, attributes)
+        request_duration.record(elapsed * 1000, attributes)
+        query_count.record(stats.count, attributes)
+        query_duration.record(stats.duration * 1000, attributes)
+        if not response.streaming:
+            response_size.record(len(response.content), attributes)
+
+        budget = query_budget(request.method, route)
+        if budget is not None and stats.count > budget:
+            budget_exceeded.add(1, attributes)
+            logger.warning(
+                "%s %s ran %d queries, over its budget of %d", request.method, route, stats.count, budget,
+                extra={'route': route, 'queries': stats.count, 'budget': budget},
+            )
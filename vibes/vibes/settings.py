@@ -13,23 +13,12 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
-import opentelemetry.instrumentation.django
-from opentelemetry import trace
-
-
-# Instrument Django
-opentelemetry.instrumentation.django.DjangoInstrumentor().instrument()
-
-tracer = trace.get_tracer(__name__)
-
-
-
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -57,6 +46,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     'vibez_api.users',
@@ -67,11 +57,152 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'vibez_api.users.authentication.CachedTokenAuthentication',
     ],
 }
 
+# State that every worker process must see (token invalidation stamps,
+# read-your-writes pins) lives in the "shared" cache. It is process-local
+# unless SHARED_CACHE_BACKEND/SHARED_CACHE_LOCATION point at a shared backend
+# (e.g. django.core.cache.backends.redis.RedisCache).
+SHARED_CACHE_BACKEND = os.getenv('SHARED_CACHE_BACKEND', "django.core.cache.backends.locmem.LocMemCache")
+SHARED_CACHE_IS_LOCAL = SHARED_CACHE_BACKEND.endswith('.LocMemCache')
+
+# Token -> user lookups are cached per process. Logout and user changes are
+# broadcast to other processes through stamps in AUTH_TOKEN_CACHE_ALIAS. With
+# a process-local stamp cache other processes only notice when their entry
+# expires, so the TTL then defaults to a few seconds instead of five minutes.
+AUTH_TOKEN_CACHE_ALIAS = "shared"
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 5 if SHARED_CACHE_IS_LOCAL else 300))
+AUTH_TOKEN_CLOCK_SKEW = float(os.getenv('AUTH_TOKEN_CLOCK_SKEW', 1))
+
+# Signup and login hash passwords on a bounded thread pool. Requests beyond
+# AUTH_HASH_MAX_PENDING queued or running hashes get a 503 instead of
+# piling up behind a login storm.
+AUTH_HASH_WORKERS = int(os.getenv('AUTH_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+AUTH_HASH_MAX_PENDING = int(os.getenv('AUTH_HASH_MAX_PENDING', AUTH_HASH_WORKERS * 8))
+
+# Serve the feed, post detail, hashtag listing and comment detail reads with
+# native async views. vibes/asgi.py turns this on; under WSGI the sync DRF
+# views are cheaper.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'false').lower() == 'true'
+
+# Cursor pagination for post listings (feed, hashtag pages)
+POSTS_PAGE_SIZE = int(os.getenv('POSTS_PAGE_SIZE', 20))
+POSTS_MAX_PAGE_SIZE = int(os.getenv('POSTS_MAX_PAGE_SIZE', 100))
+
+# Comments are paged per post and per parent. Posts and comments carry only
+# the first COMMENT_INLINE_REPLIES comments or replies at each level, down to
+# COMMENT_INLINE_DEPTH levels of replies, with a link to page through the rest.
+COMMENTS_PAGE_SIZE = int(os.getenv('COMMENTS_PAGE_SIZE', 20))
+COMMENTS_MAX_PAGE_SIZE = int(os.getenv('COMMENTS_MAX_PAGE_SIZE', 100))
+COMMENT_INLINE_DEPTH = int(os.getenv('COMMENT_INLINE_DEPTH', 2))
+COMMENT_INLINE_REPLIES = int(os.getenv('COMMENT_INLINE_REPLIES', 3))
+
+# Rendered post representations are cached per process by default. Point
+# POSTS_CACHE_BACKEND/POSTS_CACHE_LOCATION at a shared backend (e.g.
+# django.core.cache.backends.redis.RedisCache) to share them across workers.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "posts": {
+        "BACKEND": os.getenv('POSTS_CACHE_BACKEND', "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv('POSTS_CACHE_LOCATION', "posts"),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv('POSTS_CACHE_MAX_ENTRIES', 10000))},
+    },
+    "shared": {
+        "BACKEND": SHARED_CACHE_BACKEND,
+        "LOCATION": os.getenv('SHARED_CACHE_LOCATION', "shared"),
+    },
+}
+POSTS_CACHE_ALIAS = "posts"
+POSTS_CACHE_TIMEOUT = int(os.getenv('POSTS_CACHE_TIMEOUT', 300))
+
+# Like counters can be buffered in memory and flushed in batches so likes on
+# a hot post don't serialize on its row lock. Each process only sees its own
+# unflushed likes; a crash loses up to one interval of counts until
+# `manage.py recount_counters` repairs them.
+LIKE_BUFFER_ENABLED = os.getenv('LIKE_BUFFER_ENABLED', 'false').lower() == 'true'
+LIKE_BUFFER_FLUSH_INTERVAL = float(os.getenv('LIKE_BUFFER_FLUSH_INTERVAL', 1))
+
+# Trending hashtags: per-tag usage is counted in fixed buckets and the top K
+# per window is snapshotted in the shared cache. Requests always get the last
+# snapshot; `manage.py compute_trending --loop` refreshes them every
+# TRENDING_REFRESH_SECONDS. A process-local cache can't be refreshed from
+# another process, so there each web process runs its own refresher thread.
+TRENDING_CACHE_ALIAS = "shared"
+TRENDING_BUCKET_SECONDS = int(os.getenv('TRENDING_BUCKET_SECONDS', 300))
+TRENDING_REFRESH_SECONDS = int(os.getenv('TRENDING_REFRESH_SECONDS', 60))
+TRENDING_TOP_K = int(os.getenv('TRENDING_TOP_K', 50))
+TRENDING_WORKER_IN_PROCESS = os.getenv('TRENDING_WORKER_IN_PROCESS', str(SHARED_CACHE_IS_LOCAL)).lower() == 'true'
+
+# Home timelines: new posts are pushed to followers' timelines unless the
+# author has more than TIMELINE_FANOUT_LIMIT followers, in which case their
+# posts are merged in when the timeline is read. The push, and the backfill
+# of a new follower's timeline, run in background workers
+# (manage.py run_timeline_worker, or in-process threads when enabled).
+TIMELINE_FANOUT_LIMIT = int(os.getenv('TIMELINE_FANOUT_LIMIT', 5000))
+TIMELINE_BACKFILL = int(os.getenv('TIMELINE_BACKFILL', 50))
+TIMELINE_WORKER_IN_PROCESS = os.getenv('TIMELINE_WORKER_IN_PROCESS', 'false').lower() == 'true'
+TIMELINE_WORKER_THREADS = int(os.getenv('TIMELINE_WORKER_THREADS', 1))
+TIMELINE_WORKER_POLL_INTERVAL = float(os.getenv('TIMELINE_WORKER_POLL_INTERVAL', 2))
+TIMELINE_WORKER_BATCH_SIZE = int(os.getenv('TIMELINE_WORKER_BATCH_SIZE', 10))
+TIMELINE_JOB_MAX_ATTEMPTS = int(os.getenv('TIMELINE_JOB_MAX_ATTEMPTS', 5))
+
+# Text search configuration used for Post.search_vector on PostgreSQL. The
+# column's trigger is created with it, so changing it needs a new migration.
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'english')
+
+# Hashtag autocomplete keeps an in-memory prefix index per process
+HASHTAG_SUGGEST_LIMIT = int(os.getenv('HASHTAG_SUGGEST_LIMIT', 10))
+HASHTAG_SUGGEST_DEPTH = int(os.getenv('HASHTAG_SUGGEST_DEPTH', 20))
+HASHTAG_SUGGEST_RELOAD_SECONDS = int(os.getenv('HASHTAG_SUGGEST_RELOAD_SECONDS', 300))
+
+# How long shared caches may serve an anonymous hashtag page without
+# revalidating it. Post, comment and signed-in reads are always revalidated.
+HASHTAG_PAGE_MAX_AGE = int(os.getenv('HASHTAG_PAGE_MAX_AGE', 30))
+
+# Media uploads are spooled to disk and uploaded by background workers
+# (manage.py run_media_worker, or in-process threads when enabled).
+# MEDIA_STORAGE_BACKEND is 'cloudinary', 'local' (files under MEDIA_ROOT) or a
+# dotted path to a vibez_api.uploads.StorageBackend subclass.
+MEDIA_STORAGE_BACKEND = os.getenv('MEDIA_STORAGE_BACKEND', 'cloudinary')
+MEDIA_SPOOL_DIR = os.getenv('MEDIA_SPOOL_DIR', BASE_DIR / 'media_spool')
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', BASE_DIR / 'media')
+MEDIA_BASE_URL = os.getenv('MEDIA_BASE_URL', 'http://localhost:8000/media/')
+MEDIA_WORKER_IN_PROCESS = os.getenv('MEDIA_WORKER_IN_PROCESS', 'false').lower() == 'true'
+MEDIA_WORKER_THREADS = int(os.getenv('MEDIA_WORKER_THREADS', 2))
+MEDIA_WORKER_POLL_INTERVAL = float(os.getenv('MEDIA_WORKER_POLL_INTERVAL', 2))
+MEDIA_WORKER_BATCH_SIZE = int(os.getenv('MEDIA_WORKER_BATCH_SIZE', 10))
+MEDIA_UPLOAD_MAX_ATTEMPTS = int(os.getenv('MEDIA_UPLOAD_MAX_ATTEMPTS', 3))
+MEDIA_UPLOAD_CONCURRENCY = int(os.getenv('MEDIA_UPLOAD_CONCURRENCY', 8))
+MEDIA_UPLOAD_TIMEOUT = float(os.getenv('MEDIA_UPLOAD_TIMEOUT', 60))
+MEDIA_CLAIM_TIMEOUT = int(os.getenv('MEDIA_CLAIM_TIMEOUT', 600))
+
+# Per-request query budgets checked by vibes.middleware.RequestCounterMiddleware.
+# Bare URL names budget GET and HEAD; prefix the method for writes
+# ("PATCH post-detail"). Anything else falls back to QUERY_BUDGET_DEFAULT.
+# Requests over budget are logged and counted. Sized for a cold posts cache.
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', 30))
+QUERY_BUDGETS = {
+    'post-list': 10,
+    'timeline': 12,
+    'post-search': 10,
+    'post-hashtag-list': 10,
+    'hashtag-trending': 4,
+    'hashtag-suggest': 4,
+    'post-detail': 10,
+    'post-comment-list': 8,
+    'comment-detail': 8,
+    'comment-replies': 8,
+    'user-detail': 4,
+}
+
 MIDDLEWARE = [
+    "vibes.middleware.RequestCounterMiddleware",
+    "vibez_api.replicas.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -79,8 +210,6 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-
-    "vibes.middleware.RequestCounterMiddleware",
 ]
 
 ROOT_URLCONF = "vibes.urls"
@@ -107,6 +236,19 @@ WSGI_APPLICATION = "vibes.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Connections are kept open between requests (DATABASE_CONN_MAX_AGE seconds,
+# checked before reuse) or, with DATABASE_POOL, borrowed from a psycopg 3 pool
+# shared by the whole process; Django requires CONN_MAX_AGE = 0 for the pool.
+# A request that waits DATABASE_POOL_TIMEOUT seconds for a connection fails.
+DATABASE_POOL = os.getenv('DATABASE_POOL', 'false').lower() == 'true'
+DATABASE_POOL_OPTIONS = {
+    'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', 10)),
+    'timeout': float(os.getenv('DATABASE_POOL_TIMEOUT', 5)),
+    'max_waiting': int(os.getenv('DATABASE_POOL_MAX_WAITING', 0)),
+    'max_idle': float(os.getenv('DATABASE_POOL_MAX_IDLE', 600)),
+}
+
 DATABASES = {
     "default": {
         'ENGINE': 'django.db.backends.postgresql',
@@ -114,6 +256,10 @@ DATABASES = {
         'USER': os.getenv('DATABASE_USER'),
         'PASSWORD': os.getenv('DATABASE_PASSWORD'),
         'HOST': os.getenv('DATABASE_HOST', 'db'),
+        'PORT': os.getenv('DATABASE_PORT', ''),
+        'CONN_MAX_AGE': 0 if DATABASE_POOL else int(os.getenv('DATABASE_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DATABASE_HEALTH_CHECKS', 'true').lower() == 'true',
+        'OPTIONS': {'pool': DATABASE_POOL_OPTIONS} if DATABASE_POOL else {},
         # 'OPTIONS': {
         #     'sslmode': 'require',
         #     'options': '-c endpoint=ep-wandering-bar-a26rmp8l'
@@ -121,36 +267,103 @@ DATABASES = {
     }
 }
 
+# Read replicas, as "host[:port][=weight],..." sharing the primary's name and
+# credentials. GET requests read from them (vibez_api.replicas); a client that
+# wrote reads from the primary for READ_YOUR_WRITES_SECONDS. Keep that window
+# above REPLICA_MAX_LAG + REPLICA_LAG_CHECK_INTERVAL. Those pins live in the
+# "shared" cache, so replicas require a shared SHARED_CACHE_BACKEND.
+DATABASE_REPLICA_WEIGHTS = {}
+for index, replica in enumerate(item.strip() for item in os.getenv('DATABASE_REPLICAS', '').split(',') if item.strip()):
+    address, _, weight = replica.partition('=')
+    host, _, port = address.partition(':')
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'], HOST=host, PORT=port or DATABASES['default']['PORT'], TEST={'MIRROR': 'default'}
+    )
+    DATABASE_REPLICA_WEIGHTS[f'replica_{index}'] = float(weight or 1)
+
+DATABASE_ROUTERS = ['vibez_api.replicas.ReplicaRouter']
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 2))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 1))
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
+READ_YOUR_WRITES_CACHE_ALIAS = "shared"
+if DATABASE_REPLICA_WEIGHTS and SHARED_CACHE_IS_LOCAL:
+    # A pin set by the process that took the write must be seen by whichever
+    # process serves the client's next read.
+    raise ImproperlyConfigured("DATABASE_REPLICAS needs SHARED_CACHE_BACKEND set to a shared cache backend")
+
+# OpenTelemetry, set up once per process by vibes.telemetry.configure().
+# Exporter endpoints come from the standard OTEL_EXPORTER_OTLP_* variables.
+# Traces are sampled by ratio; with TELEMETRY_SAMPLE_ERRORS, unsampled requests
+# that answer 5xx still export one span. Export queues are bounded and drop when full.
+# Set TELEMETRY_LOG_LEVEL empty to stop shipping log records.
+TELEMETRY_ENABLED = os.getenv('TELEMETRY_ENABLED', 'true').lower() == 'true'
+TELEMETRY_SERVICE_NAME = os.getenv('OTEL_SERVICE_NAME', 'vibes-django-app')
+TELEMETRY_TRACES_SAMPLE_RATIO = float(os.getenv('TELEMETRY_TRACES_SAMPLE_RATIO', 0.1))
+TELEMETRY_SAMPLE_ERRORS = os.getenv('TELEMETRY_SAMPLE_ERRORS', 'true').lower() == 'true'
+TELEMETRY_EXPORT_QUEUE_SIZE = int(os.getenv('TELEMETRY_EXPORT_QUEUE_SIZE', 2048))
+TELEMETRY_EXPORT_BATCH_SIZE = int(os.getenv('TELEMETRY_EXPORT_BATCH_SIZE', 512))
+TELEMETRY_EXPORT_DELAY_MS = int(os.getenv('TELEMETRY_EXPORT_DELAY_MS', 5000))
+TELEMETRY_METRICS_INTERVAL_MS = int(os.getenv('TELEMETRY_METRICS_INTERVAL_MS', 60000))
+TELEMETRY_LOG_LEVEL = os.getenv('TELEMETRY_LOG_LEVEL', 'WARNING').upper()
+
+# Loggers only put records on a queue; a listener thread formats them and
+# does the I/O (vibes.log). LOG_LEVELS sets per-logger levels, e.g.
+# "django.db.backends=DEBUG,vibez_api=DEBUG". LOG_RATE_LIMITS caps the
+# records per second kept from noisy loggers below ERROR.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_LEVELS = dict(map(str.strip, item.split('=', 1)) for item in os.getenv('LOG_LEVELS', '').split(',') if '=' in item)
+LOG_RATE_LIMITS = {
+    'django.db.backends': float(os.getenv('LOG_RATE_LIMIT_SQL', 50)),
+    'django.request': float(os.getenv('LOG_RATE_LIMIT_REQUEST', 20)),
+    'vibes.middleware': float(os.getenv('LOG_RATE_LIMIT_BUDGETS', 5)),
+}
+
+LOGGING_CONFIG = "vibes.log.configure"
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "vibes.log.JsonFormatter"},
+        "text": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "filters": {
+        "rate_limit": {"()": "vibes.log.RateLimitFilter", "limits": LOG_RATE_LIMITS},
+    },
     "handlers": {
+        "queue": {
+            "()": "vibes.log.QueueHandler",
+            "filters": ["rate_limit"],
+            "targets": ["console", "file", "otlp"],
+            "maxsize": LOG_QUEUE_SIZE,
+        },
         "console": {
-            "level": "DEBUG",  # Capture all logs from DEBUG level and above
             "class": "logging.StreamHandler",
+            "formatter": LOG_FORMAT,
         },
         "file": {
             "level": "ERROR",  # Log only errors to a file
             "class": "logging.FileHandler",
             "filename": "django_errors.log",
+            "formatter": "json",
+        },
+        "otlp": {
+            "()": "vibes.telemetry.log_handler",
         },
     },
+    "root": {
+        "handlers": ["queue"],
+        "level": LOG_LEVEL,
+    },
     "loggers": {
+        # Everything propagates to the root's queue
         "django": {
-            "handlers": ["console", "file"],
-            "level": "DEBUG",
-            "propagate": True,
-        },
-        "django.request": {
-            "handlers": ["console", "file"],  # Logs request errors (500, 404, etc.)
-            "level": "ERROR",
-            "propagate": True,
-        },
-        "django.security": {
-            "handlers": ["console", "file"],  # Logs security issues
-            "level": "WARNING",
+            "handlers": [],
+            "level": os.getenv('DJANGO_LOG_LEVEL', 'INFO').upper(),
             "propagate": True,
         },
+        **{name: {"level": level.upper()} for name, level in LOG_LEVELS.items()},
     },
 }
 
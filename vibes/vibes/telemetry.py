@@ -0,0 +1,201 @@
+"""
+OpenTelemetry bootstrap: traces, metrics and logs for one process.
+
+``configure()`` is called by the entry points (manage.py, wsgi.py, asgi.py)
+before Django loads, and only its first call in a process does anything.
+Everything is tuned through the TELEMETRY_* settings; exporter endpoints
+and headers come from the standard OTEL_EXPORTER_OTLP_* variables.
+
+Traces are sampled at the head by trace id (TELEMETRY_TRACES_SAMPLE_RATIO),
+following the parent's decision when there is one. Spans that lose the draw
+are not recorded at all. With TELEMETRY_SAMPLE_ERRORS on, a request that
+lost the draw and answered 5xx gets one span after the fact, in the same
+trace, carrying its method, route and status; nothing else of that trace is
+kept. Recording every unsampled request just in case it fails cost about as
+much as sampling them all (see ``manage.py bench_telemetry``).
+
+Every exporter sits behind a batch processor with a bounded queue. A full
+queue drops spans instead of blocking the request that produced them.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from opentelemetry import _logs, metrics, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import Decision, ParentBased, Sampler, SamplingResult, TraceIdRatioBased
+from opentelemetry.semconv.trace import SpanAttributes
+from opentelemetry.trace import NonRecordingSpan, SpanContext, SpanKind, StatusCode, TraceFlags
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_configured = False
+_logger_provider = None
+
+# Marks the spans record_failed_request starts, which ErrorAwareSampler always samples
+ERROR_SAMPLED = 'vibes.error_sampled'
+
+# Bucket boundaries for the request histograms recorded by
+# vibes.middleware.RequestCounterMiddleware; the SDK defaults suit durations
+# in milliseconds but not counts or byte sizes.
+HISTOGRAM_BUCKETS = {
+    'http_request_db_queries': (0, 1, 2, 3, 5, 8, 12, 20, 30, 50, 100),
+    'http_response_size': (0, 256, 1024, 4096, 16384, 65536, 262144, 1048576),
+}
+
+
+class ErrorAwareSampler(Sampler):
+    """
+    Ratio sampling by trace id that always samples the spans
+    ``record_failed_request`` starts for failed requests.
+    """
+
+    def __init__(self, ratio):
+        self.delegate = ParentBased(TraceIdRatioBased(ratio))
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None,
+                      trace_state=None):
+        if attributes and attributes.get(ERROR_SAMPLED):
+            return SamplingResult(Decision.RECORD_AND_SAMPLE, attributes, trace_state)
+        return self.delegate.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+
+    def get_description(self):
+        return f'ErrorAwareSampler{{{self.delegate.get_description()}}}'
+
+
+def record_failed_request(span, request, response):
+    """
+    DjangoInstrumentor response hook: stands in for the unsampled server
+    span of a request that answered 5xx, which was never recorded.
+    """
+    if span.is_recording() or response.status_code < 500:
+        return
+    match = request.resolver_match
+    attributes = {
+        ERROR_SAMPLED: True,
+        SpanAttributes.HTTP_METHOD: request.method,
+        SpanAttributes.HTTP_STATUS_CODE: response.status_code,
+    }
+    if match and match.route:
+        attributes[SpanAttributes.HTTP_ROUTE] = match.route
+    started = getattr(request, '_otel_start_time', None)
+    failed = trace.get_tracer(__name__).start_span(
+        f'{request.method} {match.route}' if match and match.route else request.method,
+        context=trace.set_span_in_context(span),
+        kind=SpanKind.SERVER,
+        attributes=attributes,
+        start_time=int(started * 1e9) if started else None,
+    )
+    failed.set_status(StatusCode.ERROR)
+    failed.end()
+
+
+def batch_options():
+    return {
+        'max_queue_size': settings.TELEMETRY_EXPORT_QUEUE_SIZE,
+        'max_export_batch_size': min(settings.TELEMETRY_EXPORT_BATCH_SIZE, settings.TELEMETRY_EXPORT_QUEUE_SIZE),
+        'schedule_delay_millis': settings.TELEMETRY_EXPORT_DELAY_MS,
+    }
+
+
+def configure_traces(resource):
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    provider = TracerProvider(resource=resource, sampler=ErrorAwareSampler(settings.TELEMETRY_TRACES_SAMPLE_RATIO))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(), **batch_options()))
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+def configure_metrics(resource):
+    from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+    from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
+
+    reader = PeriodicExportingMetricReader(
+        OTLPMetricExporter(), export_interval_millis=settings.TELEMETRY_METRICS_INTERVAL_MS
+    )
+    views = [
+        View(instrument_name=name, aggregation=ExplicitBucketHistogramAggregation(boundaries))
+        for name, boundaries in HISTOGRAM_BUCKETS.items()
+    ]
+    provider = MeterProvider(resource=resource, metric_readers=[reader], views=views)
+    metrics.set_meter_provider(provider)
+    # Registers the connection pool gauges, which are only read at collection
+    from vibes import db  # noqa: F401
+    return provider
+
+
+def configure_logs(resource):
+    from opentelemetry.exporter.otlp.proto.http._log_exporter import OTLPLogExporter
+    from opentelemetry.sdk._logs import LoggerProvider
+    from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
+
+    global _logger_provider
+    provider = LoggerProvider(resource=resource)
+    provider.add_log_record_processor(BatchLogRecordProcessor(OTLPLogExporter(), **batch_options()))
+    _logs.set_logger_provider(provider)
+    _logger_provider = provider
+    return provider
+
+
+def log_handler():
+    """The OTLP handler for LOGGING; a NullHandler when log export is off."""
+    if _logger_provider is None:
+        return logging.NullHandler()
+    from opentelemetry.sdk._logs import LoggingHandler
+
+    class RecordSpanLoggingHandler(LoggingHandler):
+        # Runs on the log listener thread (vibes.log), where no span is
+        # current; the span comes from the ids LoggingInstrumentor stamped
+        # on the record where it was created.
+        def emit(self, record):
+            trace_id = int(getattr(record, 'otelTraceID', '0'), 16)
+            if not trace_id:
+                return super().emit(record)
+            flags = TraceFlags(TraceFlags.SAMPLED if record.otelTraceSampled else TraceFlags.DEFAULT)
+            span = NonRecordingSpan(SpanContext(trace_id, int(record.otelSpanID, 16), False, flags))
+            with trace.use_span(span):
+                super().emit(record)
+
+    return RecordSpanLoggingHandler(level=settings.TELEMETRY_LOG_LEVEL, logger_provider=_logger_provider)
+
+
+def instrument(tracer_provider, meter_provider):
+    from opentelemetry.instrumentation.django import DjangoInstrumentor
+    from opentelemetry.instrumentation.logging import LoggingInstrumentor
+
+    # No database spans: Django runs on psycopg 3 here, which the psycopg2
+    # instrumentor never sees, and the generic dbapi integration only wraps
+    # psycopg.connect(), which the DATABASE_POOL pool bypasses. Query counts
+    # and time per request come from vibes.middleware.RequestCounterMiddleware.
+    DjangoInstrumentor().instrument(
+        tracer_provider=tracer_provider, meter_provider=meter_provider,
+        response_hook=record_failed_request if settings.TELEMETRY_SAMPLE_ERRORS else None,
+    )
+    # Adds trace and span ids to log records for the formatters
+    LoggingInstrumentor().instrument(tracer_provider=tracer_provider)
+
+
+def configure():
+    """Set up telemetry for this process; later calls are no-ops. Returns whether it is enabled."""
+    global _configured
+    with _lock:
+        if _configured:
+            return settings.TELEMETRY_ENABLED
+        _configured = True
+        if not settings.TELEMETRY_ENABLED:
+            return False
+
+        resource = Resource.create({'service.name': settings.TELEMETRY_SERVICE_NAME})
+        tracer_provider = configure_traces(resource)
+        meter_provider = configure_metrics(resource)
+        if settings.TELEMETRY_LOG_LEVEL:
+            configure_logs(resource)
+        instrument(tracer_provider, meter_provider)
+        logger.debug("Telemetry configured for %s", settings.TELEMETRY_SERVICE_NAME)
+        return True
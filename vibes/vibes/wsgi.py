@@ -11,6 +11,13 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from vibes import telemetry
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "vibes.settings")
 
+telemetry.configure()
 application = get_wsgi_application()
+
+from vibez_api.posts.suggest import build_index  # noqa: E402
+
+build_index()
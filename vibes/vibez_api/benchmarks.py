@@ -0,0 +1,122 @@
+"""Helpers shared by the ``bench_*`` management commands."""
+import http.client
+import json
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.db import connection
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    """Throughput and latency percentiles (in ms) for a list of per-request seconds."""
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(max(latencies, default=0) * 1000, 2),
+    }
+
+
+def run_threads(target, count):
+    """
+    Run ``target(index)`` on ``count`` threads started together and return
+    the wall-clock seconds until the last one finishes.
+    """
+    barrier = threading.Barrier(count + 1)
+
+    def run(index):
+        barrier.wait()
+        try:
+            target(index)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+class Recorder:
+    """Thread-safe collection of request latencies and failures."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds, ok=True):
+        with self.lock:
+            self.latencies.append(seconds)
+            if not ok:
+                self.errors += 1
+
+    def summary(self, elapsed):
+        return dict(summarize(self.latencies, elapsed), errors=self.errors)
+
+
+@contextmanager
+def bench_users(count, prefix='bench'):
+    """
+    Throwaway users for a benchmark run. Afterwards every user named
+    ``<prefix>_*`` is deleted with everything they created.
+    """
+    User.objects.filter(username__startswith=f'{prefix}_').delete()
+    User.objects.bulk_create([User(username=f'{prefix}_{index}') for index in range(count)])
+    users = list(User.objects.filter(username__startswith=f'{prefix}_').order_by('pk'))
+    try:
+        yield users
+    finally:
+        User.objects.filter(username__startswith=f'{prefix}_').delete()
+
+
+class HttpClient:
+    """A keep-alive HTTP connection to a running server; use one per thread."""
+
+    def __init__(self, base_url, token=None, timeout=30):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.headers = {'Authorization': f'Token {token}'} if token else {}
+        self.connection = None
+
+    def request(self, method, path, data=None):
+        """Send a request and return (status, body bytes); reconnects once if the connection dropped."""
+        body = json.dumps(data) if data is not None else None
+        headers = dict(self.headers, **({'Content-Type': 'application/json'} if body else {}))
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, self.prefix + path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
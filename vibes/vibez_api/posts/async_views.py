@@ -0,0 +1,138 @@
+from abc import ABCMeta, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import F
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.request import Request
+
+from ..users.authentication import CachedTokenAuthentication
+from .cache import arender_posts
+from .comment_tree import CommentTree
+from .conditional import post_validators, comment_validators, page_etag, not_modified, add_validators
+from .likes import aliked_on_posts, apply_liked_by_me, apply_comment_liked_by_me
+from .models import Post, Comment, HashTag
+from .pagination import PostCursorPagination
+from .serializers import CommentSerializer
+from .views import PostListView, PostDetailsView, PostHashtagsView, CommentDetailsView
+
+
+async def render_for(posts, user):
+    """Rendered ``posts`` with liked_by_me."""
+    liked = await aliked_on_posts(user, [post.pk for post in posts])
+    return apply_liked_by_me(await arender_posts(posts), *liked)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncReadView(View, metaclass=ABCMeta):
+    """
+    Serves GET through ``read()`` as a native async view and hands every
+    other method to ``sync_view``, the DRF view that owns the endpoint's
+    writes.
+
+    Authentication and error bodies follow DRF: a bad token or, with
+    ``login_required``, no token at all is a 401 with WWW-Authenticate, and
+    APIExceptions raised while reading become their usual responses.
+    """
+    sync_view = None
+    login_required = True
+    authentication = CachedTokenAuthentication()
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            credentials = await self.authentication.aauthenticate(request)
+            request = Request(request)
+            request.user = credentials[0] if credentials else AnonymousUser()
+            if self.login_required and not request.user.is_authenticated:
+                raise NotAuthenticated
+            return await self.read(request, *args, **kwargs)
+        except APIException as exc:
+            response = JsonResponse({'detail': exc.detail}, status=exc.status_code)
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+            return response
+
+    @abstractmethod
+    async def read(self, request, *args, **kwargs):
+        """The GET response, once the request is authenticated."""
+
+    async def delegate(self, request, *args, **kwargs):
+        return await sync_to_async(self.get_sync_view())(request, *args, **kwargs)
+
+    post = put = patch = delete = delegate
+
+    @classmethod
+    def get_sync_view(cls):
+        if '_sync_handler' not in cls.__dict__:
+            cls._sync_handler = cls.sync_view.as_view()
+        return cls._sync_handler
+
+
+class AsyncPostListView(AsyncReadView):
+    sync_view = PostListView
+
+    async def read(self, request):
+        paginator = PostCursorPagination()
+        posts = await paginator.apaginate_queryset(Post.objects.only('id', 'created_at'), request)
+        return JsonResponse(paginator.get_paginated_data(await render_for(posts, request.user)))
+
+
+class AsyncPostDetailsView(AsyncReadView):
+    sync_view = PostDetailsView
+
+    async def read(self, request, pk):
+        # Only the stamp is read before deciding; the post itself comes from the post cache
+        post = await Post.objects.only('id', 'updated_at').filter(pk=pk).afirst()
+        if post is None:
+            return JsonResponse({'detail': 'No Post matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+
+        liked = await aliked_on_posts(request.user, [pk])
+        etag, last_modified = post_validators(post, *liked)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = JsonResponse(apply_liked_by_me(await arender_posts([post]), *liked)[0])
+        return add_validators(response, etag, last_modified)
+
+
+class AsyncPostHashtagsView(AsyncReadView):
+    sync_view = PostHashtagsView
+    login_required = False
+
+    async def read(self, request, hashtag):
+        paginator = PostCursorPagination()
+        posts = await paginator.apaginate_queryset(
+            Post.objects.filter(hashtags__name=hashtag).only('id', 'created_at', 'updated_at'), request
+        )
+        # Only an empty page can mean the tag doesn't exist
+        if not posts and not await HashTag.objects.filter(name=hashtag).aexists():
+            return JsonResponse({"errors": "Hashtag not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        liked = await aliked_on_posts(request.user, [post.pk for post in posts])
+        etag = page_etag(request, paginator.get_next_link(), posts, *liked)
+        response = not_modified(request, etag)
+        if response is None:
+            response = JsonResponse(paginator.get_paginated_data(apply_liked_by_me(await arender_posts(posts), *liked)))
+        return add_validators(response, etag, public=not request.user.is_authenticated)
+
+
+class AsyncCommentDetailsView(AsyncReadView):
+    sync_view = CommentDetailsView
+
+    async def read(self, request, pk):
+        comment = await Comment.objects.annotate(post_updated_at=F('post__updated_at')).filter(pk=pk).afirst()
+        if comment is None:
+            return JsonResponse({'detail': 'No Comment matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+
+        _, liked_comments = await aliked_on_posts(request.user, [comment.post_id])
+        etag, last_modified = comment_validators(comment, comment.post_updated_at, liked_comments)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            tree = await CommentTree.afor_comments([comment])
+            data = CommentSerializer(comment, context={'comment_tree': tree}).data
+            response = JsonResponse(apply_comment_liked_by_me(data, liked_comments))
+        return add_validators(response, etag, last_modified)
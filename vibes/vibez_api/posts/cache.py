@@ -0,0 +1,124 @@
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from ..replicas import primary
+from .comment_tree import CommentTree
+from .models import Post, PostMedia, PostHashTag
+from .prefetch import agroup, alist, attach_prefetched
+
+
+def post_cache():
+    return caches[settings.POSTS_CACHE_ALIAS]
+
+
+def version_key(post_id):
+    return f'post:{post_id}:version'
+
+
+def data_key(post_id, version):
+    return f'post:{post_id}:{version}'
+
+
+def new_version():
+    # Versions are unique tokens rather than counters, so a version key that
+    # was evicted can never resurrect a representation cached under it.
+    return uuid.uuid4().hex[:12]
+
+
+def get_versions(post_ids):
+    cache = post_cache()
+    keys = {version_key(pk): pk for pk in post_ids}
+    versions = cache.get_many(keys)
+
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, None)
+        versions.update(cache.get_many(missing))
+    return {pk: versions.get(key) for key, pk in keys.items()}
+
+
+def invalidate_post(post_id):
+    post_cache().set(version_key(post_id), new_version(), None)
+
+
+def render_posts(posts, context=None):
+    """
+    Serialized representations for ``posts``, in order.
+
+    Cached pieces are fetched with one multi-get; the posts that missed are
+    loaded and serialized together in one batch and written back.
+    """
+    from .serializers import PostSerializer
+
+    cache = post_cache()
+    post_ids = [post.pk for post in posts]
+    keys, versions, rendered = read_cached(post_ids)
+
+    missing = [pk for pk in post_ids if pk not in rendered]
+    if missing:
+        # What is cached outlives any replica lag, so it is read from the primary
+        with primary():
+            fresh = Post.objects.filter(pk__in=missing).prefetch_related('media', 'hashtags')
+            data = PostSerializer(fresh, many=True, context=dict(context or {})).data
+        cache.set_many(_fill(rendered, keys, versions, data), settings.POSTS_CACHE_TIMEOUT)
+
+    return [rendered[pk] for pk in post_ids if pk in rendered]
+
+
+async def arender_posts(posts, context=None):
+    """
+    render_posts for async views. Misses load posts, media, hashtags and
+    comments with the async ORM instead of prefetch_related.
+
+    The cache backends' async methods are thread hops around the sync ones,
+    so the version and data reads share a single hop.
+    """
+    from .serializers import PostSerializer
+
+    post_ids = [post.pk for post in posts]
+    keys, versions, rendered = await sync_to_async(read_cached)(post_ids)
+
+    missing = [pk for pk in post_ids if pk not in rendered]
+    if missing:
+        with primary():
+            fresh, tree = await aload_posts(missing)
+            data = PostSerializer(fresh, many=True, context=dict(context or {}, comment_tree=tree)).data
+        await post_cache().aset_many(_fill(rendered, keys, versions, data), settings.POSTS_CACHE_TIMEOUT)
+
+    return [rendered[pk] for pk in post_ids if pk in rendered]
+
+
+async def aload_posts(post_ids):
+    # One query after another: the async ORM runs every query on the same
+    # thread, so gathering them would not overlap anything.
+    posts = await alist(Post.objects.filter(pk__in=post_ids))
+    media = await agroup(PostMedia.objects.filter(post_id__in=post_ids), 'post_id')
+    hashtags = await agroup(PostHashTag.objects.filter(post_id__in=post_ids).select_related('hashtag'), 'post_id')
+    tree = await CommentTree.afor_posts(post_ids)
+    attach_prefetched(posts, 'media', media)
+    attach_prefetched(posts, 'hashtags', {pk: [link.hashtag for link in links] for pk, links in hashtags.items()})
+    return posts, tree
+
+
+def read_cached(post_ids):
+    """The data keys and versions for ``post_ids`` and whichever representations are cached."""
+    versions = get_versions(post_ids)
+    keys = {pk: data_key(pk, versions[pk]) for pk in post_ids}
+    cached = post_cache().get_many(keys.values())
+    return keys, versions, {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+
+def _fill(rendered, keys, versions, data):
+    """Add freshly serialized posts to ``rendered`` and return the entries to write back."""
+    for item in data:
+        rendered[item['id']] = dict(item)
+    return {keys[item['id']]: rendered[item['id']] for item in data if versions[item['id']]}
+
+
+def render_post(post, context=None):
+    rendered = render_posts([post], context)
+    return rendered[0] if rendered else None
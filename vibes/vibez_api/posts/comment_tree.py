@@ -0,0 +1,218 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
+from django.urls import reverse
+
+from .models import Comment, CommentMedia
+from .prefetch import agroup, alist, attach_prefetched
+
+# Top-level comments are shown newest first, replies in thread order
+TOP_LEVEL_ORDER = ('-created_at', '-id')
+REPLY_ORDER = ('path',)
+
+
+def first_per_group(queryset, group, ordering, count):
+    """The first ``count`` rows of ``queryset`` in each ``group``, by ``ordering``."""
+    position = Window(
+        RowNumber(), partition_by=[F(name) for name in group],
+        order_by=[F(name.lstrip('-')).desc() if name.startswith('-') else F(name).asc() for name in ordering],
+    )
+    return queryset.annotate(position=position).filter(position__lte=count)
+
+
+def top_level_query(post_ids):
+    """
+    The newest COMMENT_INLINE_REPLIES (plus one, to tell whether there are
+    more) top-level comments on each post. Like replies_query, that is one
+    short range of comment_top_level_idx per post where the database allows
+    LIMIT inside UNION ALL, rather than numbering every top-level comment
+    the posts have.
+    """
+    count = settings.COMMENT_INLINE_REPLIES + 1
+    if not post_ids:
+        return Comment.objects.none()
+    if connection.features.supports_slicing_ordering_in_compound:
+        queries = [
+            Comment.objects.filter(post_id=post_id, parent__isnull=True).order_by(*TOP_LEVEL_ORDER)[:count]
+            for post_id in post_ids
+        ]
+        return queries[0].union(*queries[1:], all=True)
+    return first_per_group(
+        Comment.objects.filter(post_id__in=post_ids, parent__isnull=True), ['post_id'], TOP_LEVEL_ORDER, count,
+    )
+
+
+def replies_query(parents):
+    """
+    The first COMMENT_INLINE_REPLIES (plus one) replies to each of
+    ``parents``. Where the database allows LIMIT inside UNION ALL that is
+    one short index range per parent, so a comment with ten thousand
+    replies costs no more than one with four.
+    """
+    count = settings.COMMENT_INLINE_REPLIES + 1
+    if connection.features.supports_slicing_ordering_in_compound:
+        queries = [Comment.objects.filter(parent.replies_filter()).order_by(*REPLY_ORDER)[:count] for parent in parents]
+        return queries[0].union(*queries[1:], all=True)
+    return first_per_group(
+        Comment.objects.filter(reduce(or_, (parent.replies_filter() for parent in parents))),
+        ['parent_id'], REPLY_ORDER, count,
+    )
+
+
+def shown(comments):
+    return comments[:settings.COMMENT_INLINE_REPLIES]
+
+
+def continuation(url_name, kwargs, position=None):
+    """Where a client reads on from when a list was cut short at ``position``."""
+    from .pagination import KeysetPagination
+
+    url = reverse(url_name, kwargs=kwargs)
+    if position is None:
+        return url
+    return f'{url}?{urlencode({"cursor": KeysetPagination.encode_position(position)})}'
+
+
+class CommentTree:
+    """
+    The comments shown inline for a batch of posts or comments.
+
+    A post shows its newest COMMENT_INLINE_REPLIES top-level comments, and
+    every comment shown its first COMMENT_INLINE_REPLIES replies, down to
+    COMMENT_INLINE_DEPTH levels below the posts' top-level comments or the
+    comments the tree was built for. Wherever a list is cut short,
+    ``more_comments`` and ``more_replies`` link to the paged endpoint that
+    carries on, so no thread is ever read in full.
+
+    Each level is one query, plus one for media, however big the threads are.
+    """
+
+    def __init__(self, post_ids, comments, deepest):
+        self.loaded_posts = set(post_ids)
+        self.deepest = deepest
+        self.by_id = {}
+        self.roots = defaultdict(list)
+        self.children = defaultdict(list)
+
+        for comment in comments:
+            self.by_id[comment.pk] = comment
+            if comment.parent_id is None:
+                self.roots[comment.post_id].append(comment)
+            else:
+                self.children[comment.parent_id].append(comment)
+        for roots in self.roots.values():
+            roots.sort(key=lambda comment: (comment.created_at, comment.pk), reverse=True)
+        for replies in self.children.values():
+            replies.sort(key=lambda comment: comment.path)
+
+    @classmethod
+    def for_posts(cls, post_ids):
+        post_ids = list(post_ids)
+        roots = list(top_level_query(post_ids))
+        comments = cls.with_replies(roots, cls.shown_roots(roots))
+        prefetch_related_objects(comments, 'media')
+        return cls(post_ids, comments, settings.COMMENT_INLINE_DEPTH)
+
+    @classmethod
+    def for_comments(cls, comments):
+        comments = cls.with_replies(list(comments), comments)
+        prefetch_related_objects(comments, 'media')
+        return cls((), comments, cls.deepest_for(comments))
+
+    @classmethod
+    async def afor_posts(cls, post_ids):
+        post_ids = list(post_ids)
+        roots = await alist(top_level_query(post_ids))
+        comments = await cls.awith_replies(roots, cls.shown_roots(roots))
+        await cls.aattach_media(comments)
+        return cls(post_ids, comments, settings.COMMENT_INLINE_DEPTH)
+
+    @classmethod
+    async def afor_comments(cls, comments):
+        comments = await cls.awith_replies(list(comments), comments)
+        await cls.aattach_media(comments)
+        return cls((), comments, cls.deepest_for(comments))
+
+    @staticmethod
+    def deepest_for(comments):
+        return min((comment.depth for comment in comments), default=0) + settings.COMMENT_INLINE_DEPTH
+
+    @staticmethod
+    def expandable(comments):
+        # The counter spares a query per level for comments nobody replied to
+        return [comment for comment in comments if comment.replies_count]
+
+    @classmethod
+    def with_replies(cls, comments, parents):
+        for _ in range(settings.COMMENT_INLINE_DEPTH):
+            parents = cls.expandable(parents)
+            if not parents:
+                break
+            replies = list(replies_query(parents))
+            comments += replies
+            parents = cls.shown_replies(replies)
+        return comments
+
+    @classmethod
+    async def awith_replies(cls, comments, parents):
+        for _ in range(settings.COMMENT_INLINE_DEPTH):
+            parents = cls.expandable(parents)
+            if not parents:
+                break
+            replies = await alist(replies_query(parents))
+            comments += replies
+            parents = cls.shown_replies(replies)
+        return comments
+
+    @staticmethod
+    def shown_roots(roots):
+        grouped = defaultdict(list)
+        for root in sorted(roots, key=lambda root: (root.created_at, root.pk), reverse=True):
+            grouped[root.post_id].append(root)
+        return [root for comments in grouped.values() for root in shown(comments)]
+
+    @staticmethod
+    def shown_replies(replies):
+        grouped = defaultdict(list)
+        for reply in sorted(replies, key=lambda reply: reply.path):
+            grouped[reply.parent_id].append(reply)
+        return [reply for siblings in grouped.values() for reply in shown(siblings)]
+
+    @staticmethod
+    async def aattach_media(comments):
+        media = await agroup(CommentMedia.objects.filter(comment_id__in=[comment.pk for comment in comments]),
+                             'comment_id')
+        attach_prefetched(comments, 'media', media)
+
+    def get(self, pk):
+        return self.by_id.get(pk)
+
+    def covers(self, comment):
+        return comment.pk in self.by_id
+
+    def comments_for(self, post_id):
+        return shown(self.roots.get(post_id, []))
+
+    def replies_for(self, comment_id):
+        return shown(self.children.get(comment_id, []))
+
+    def more_comments(self, post_id):
+        comments = self.comments_for(post_id)
+        if len(self.roots.get(post_id, [])) <= len(comments):
+            return None
+        return continuation('post-comment-list', {'post_id': post_id}, [comments[-1].created_at, comments[-1].pk])
+
+    def more_replies(self, comment):
+        if comment.depth >= self.deepest:
+            # Replies this deep were not read; the counter says whether there are any
+            return continuation('comment-replies', {'pk': comment.pk}) if comment.replies_count else None
+        replies = self.replies_for(comment.pk)
+        if len(self.children.get(comment.pk, [])) <= len(replies):
+            return None
+        return continuation('comment-replies', {'pk': comment.pk}, [replies[-1].path])
@@ -0,0 +1,70 @@
+"""
+Conditional GET for post, comment and hashtag reads.
+
+A response's strong ETag is a digest of everything that decides its bytes:
+the updated_at of each post in it, which moves with every edit, comment,
+like and media change (a comment renders inside its post, so it goes by its
+post's), and the viewer's own likes on those posts, which decide
+``liked_by_me``. Both are cheap reads, so a client that already holds the
+representation gets its 304 before anything is rendered or serialized.
+
+Last-Modified comes from the same updated_at. It only has whole-second
+resolution, so clients should send If-None-Match; as RFC 9110 requires,
+If-Modified-Since is ignored when both are present. Hashtag pages send no
+Last-Modified: a post dropping out of a page moves nothing on the page.
+
+Like counts include deltas still waiting in a process's like buffer, which
+move the stamps only when they are flushed, LIKE_BUFFER_FLUSH_INTERVAL later.
+"""
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    digest = hashlib.blake2b('\x1f'.join(map(str, parts)).encode(), digest_size=16).hexdigest()
+    return quote_etag(digest)
+
+
+def post_validators(post, liked_posts, liked_comments):
+    """The ETag and Last-Modified of ``post`` for a viewer whose likes liked_on_posts gave."""
+    etag = make_etag('post', post.pk, post.updated_at.isoformat(), sorted(liked_posts), sorted(liked_comments))
+    return etag, post.updated_at
+
+
+def comment_validators(comment, post_updated_at, liked_comments):
+    etag = make_etag('comment', comment.pk, post_updated_at.isoformat(), sorted(liked_comments))
+    return etag, post_updated_at
+
+
+def page_etag(request, next_link, posts, liked_posts, liked_comments):
+    """The ETag of a page of ``posts``, which must have updated_at loaded."""
+    stamps = [(post.pk, post.updated_at.isoformat()) for post in posts]
+    return make_etag('page', request.get_full_path(), next_link, stamps, sorted(liked_posts), sorted(liked_comments))
+
+
+def not_modified(request, etag, last_modified=None):
+    """A 304 (or 412 for a failed If-Match) if the client's copy is current, else None."""
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def add_validators(response, etag, last_modified=None, public=False):
+    """
+    Set ETag, Last-Modified and Cache-Control on ``response``, a 200 or the
+    304 not_modified gave. Responses for a signed-in user carry their likes,
+    so only anonymous ones may be cached publicly, for HASHTAG_PAGE_MAX_AGE
+    seconds; the rest must be revalidated every time.
+    """
+    response.headers.setdefault('ETag', etag)
+    if last_modified is not None:
+        response.headers.setdefault('Last-Modified', http_date(timegm(last_modified.utctimetuple())))
+    if public:
+        patch_cache_control(response, public=True, max_age=settings.HASHTAG_PAGE_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
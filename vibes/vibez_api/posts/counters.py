@@ -0,0 +1,178 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import invalidate_post
+from .models import Post, Comment, Like
+
+logger = logging.getLogger(__name__)
+
+
+def touch_posts(post_ids):
+    """Move updated_at on ``post_ids`` (a list or a values() queryset) after a change the row doesn't hold."""
+    return Post.objects.filter(pk__in=post_ids).update(updated_at=timezone.now())
+
+
+def adjust_post_counters(post_id, **deltas):
+    return Post.objects.filter(pk=post_id).update(
+        updated_at=timezone.now(), **{name: F(name) + delta for name, delta in deltas.items()}
+    )
+
+
+def adjust_comment_counters(comment_id, **deltas):
+    return Comment.objects.filter(pk=comment_id).update(**{name: F(name) + delta for name, delta in deltas.items()})
+
+
+def adjust_comment_likes(comment_id, delta):
+    """Move a comment's like counter and return its post id, or None if the comment is gone."""
+    table = connection.ops.quote_name(Comment._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET likes_count = likes_count + %s WHERE id = %s RETURNING post_id", [delta, comment_id]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class CounterBuffer:
+    """
+    Write-behind buffer for like counters.
+
+    Likes on a hot post would otherwise all queue on that post's row lock.
+    Deltas are summed in memory per post and per comment and written every
+    LIKE_BUFFER_FLUSH_INTERVAL seconds as one
+    ``UPDATE ... SET likes_count = likes_count + CASE id WHEN ... END`` per
+    table. Readers in this process add ``pending()`` to what they read, so a
+    liker sees their own like before it is flushed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.deltas = {Post: Counter(), Comment: Counter()}
+        self.inflight = {Post: Counter(), Comment: Counter()}
+        self.flusher = None
+
+    def add(self, model, pk, delta):
+        with self.lock:
+            self.deltas[model][pk] += delta
+        self.start()
+
+    def pending(self, model, pk):
+        return self.deltas[model].get(pk, 0) + self.inflight[model].get(pk, 0)
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                batch = {
+                    model: Counter({pk: delta for pk, delta in deltas.items() if delta})
+                    for model, deltas in self.deltas.items()
+                }
+                self.inflight = batch
+                self.deltas = {Post: Counter(), Comment: Counter()}
+
+            try:
+                touched = self.write(batch)
+            except Exception:
+                with self.lock:
+                    for model, deltas in batch.items():
+                        self.deltas[model].update(deltas)
+                raise
+            finally:
+                self.inflight = {Post: Counter(), Comment: Counter()}
+
+            for post_id in touched:
+                invalidate_post(post_id)
+            return sum(len(deltas) for deltas in batch.values())
+
+    def write(self, batch):
+        touched = set()
+        with transaction.atomic():
+            for model, deltas in batch.items():
+                if not deltas:
+                    continue
+                increments = Case(
+                    *(When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()),
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+                model.objects.filter(pk__in=sorted(deltas)).update(likes_count=F('likes_count') + increments)
+                if model is Post:
+                    touched.update(deltas)
+                else:
+                    touched.update(Comment.objects.filter(pk__in=deltas).values_list('post_id', flat=True))
+            touch_posts(sorted(touched))
+        return touched
+
+    def start(self):
+        if self.flusher is None:
+            with self.lock:
+                if self.flusher is None:
+                    self.flusher = threading.Thread(target=self.run, name='like-counter-flusher', daemon=True)
+                    self.flusher.start()
+                    atexit.register(self.flush)
+
+    def run(self):
+        while True:
+            time.sleep(settings.LIKE_BUFFER_FLUSH_INTERVAL)
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                logger.exception("Flushing buffered like counts failed; will retry")
+                connection.close()
+
+
+like_buffer = CounterBuffer()
+
+
+def count_of(queryset, field):
+    counted = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+COUNTERS = [
+    (Post, 'likes_count', Like.objects.all(), 'post'),
+    (Post, 'comments_count', Comment.objects.all(), 'post'),
+    (Comment, 'likes_count', Like.objects.all(), 'comment'),
+    (Comment, 'replies_count', Comment.objects.all(), 'parent'),
+]
+
+
+def recount_counters(dry_run=False):
+    """
+    Recompute every denormalized counter from the source tables.
+
+    Only rows whose stored value has drifted are written. Returns the number
+    of drifted rows per counter.
+    """
+    drift = {}
+    for model, counter, source, field in COUNTERS:
+        actual = count_of(source, field)
+        drifted = model.objects.annotate(actual=actual).exclude(**{counter: F('actual')})
+        label = f'{model._meta.model_name}.{counter}'
+        if dry_run:
+            drift[label] = drifted.count()
+        elif model is Post:
+            drift[label] = model.objects.filter(pk__in=drifted.values('pk')).update(
+                updated_at=timezone.now(), **{counter: actual}
+            )
+        else:
+            # Comments render inside their posts; touch those while the drift still shows
+            touch_posts(drifted.values('post_id'))
+            drift[label] = model.objects.filter(pk__in=drifted.values('pk')).update(**{counter: actual})
+    return drift
@@ -0,0 +1,55 @@
+import re
+from functools import partial
+
+from django.db import transaction
+
+from .models import HashTag, PostHashTag
+from .trending import record_usage
+from . import suggest
+
+
+def extract_hashtags(content):
+    hashtag = re.findall(r"#(\w+)", content)
+    return hashtag
+
+
+def normalize_hashtags(content):
+    """Lower-cased tags from ``content`` in first-seen order, without duplicates."""
+    names = (tag.lower() for tag in extract_hashtags(content or ''))
+    return list(dict.fromkeys(name for name in names if len(name) <= HashTag._meta.get_field('name').max_length))
+
+
+def set_post_hashtags(post, content, user, created=False):
+    """
+    Make the post's hashtags match ``content``.
+
+    Only the links that changed are written: tag rows are upserted with one
+    insert-ignore-conflicts plus one lookup, and links are bulk inserted or
+    deleted, so the query count does not depend on how many tags there are.
+    Returns the (added, removed) tag names.
+    """
+    names = normalize_hashtags(content)
+
+    with transaction.atomic():
+        current = {} if created else dict(
+            PostHashTag.objects.filter(post=post).values_list('hashtag__name', 'hashtag_id')
+        )
+        added = [name for name in names if name not in current]
+        removed = [name for name in current if name not in names]
+
+        if removed:
+            PostHashTag.objects.filter(post=post, hashtag_id__in=[current[name] for name in removed]).delete()
+
+        if added:
+            HashTag.objects.bulk_create([HashTag(name=name) for name in added], ignore_conflicts=True)
+            hashtag_ids = list(HashTag.objects.filter(name__in=added).values_list('id', flat=True))
+            PostHashTag.objects.bulk_create(
+                [PostHashTag(post=post, hashtag_id=hashtag_id, added_by=user) for hashtag_id in hashtag_ids],
+                ignore_conflicts=True,
+            )
+            record_usage(hashtag_ids)
+
+        transaction.on_commit(partial(suggest.record_usage, added))
+        transaction.on_commit(partial(suggest.record_usage, removed, -1))
+
+    return added, removed
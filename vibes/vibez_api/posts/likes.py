@@ -0,0 +1,176 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import invalidate_post
+from .counters import adjust_post_counters, adjust_comment_likes, like_buffer, touch_posts
+from .models import Post, Comment, Like
+
+
+class LikeTargetMissing(Exception):
+    pass
+
+
+def _fetchone(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()
+
+
+def _is_foreign_key_violation(exc):
+    # psycopg exposes the SQLSTATE on the driver error; SQLite only has the message
+    sqlstate = getattr(exc.__cause__, 'sqlstate', None)
+    if sqlstate:
+        return sqlstate == '23503'
+    return 'FOREIGN KEY' in str(exc).upper()
+
+
+def _count_like(post_id, comment_id, delta):
+    if settings.LIKE_BUFFER_ENABLED:
+        model, pk = (Post, post_id) if post_id else (Comment, comment_id)
+        transaction.on_commit(partial(like_buffer.add, model, pk, delta))
+        return
+    if post_id:
+        if not adjust_post_counters(post_id, likes_count=delta):
+            raise LikeTargetMissing
+    else:
+        post_id = adjust_comment_likes(comment_id, delta)
+        if post_id is None:
+            raise LikeTargetMissing
+        touch_posts([post_id])
+    transaction.on_commit(partial(invalidate_post, post_id))
+
+
+def like(user, post_id=None, comment_id=None):
+    """
+    Like a post or a comment; returns True if the like is new.
+
+    The write is one INSERT ... ON CONFLICT DO NOTHING against the partial
+    unique constraints, so concurrent double taps cannot both insert and
+    the counter moves only for the one that did. Raises LikeTargetMissing
+    (and rolls back) if the post or comment does not exist; any other
+    integrity error is raised as is.
+
+    With LIKE_BUFFER_ENABLED the counter is not touched here at all; the
+    delta goes to the in-process buffer once the like commits, and a missing
+    target surfaces as the deferred foreign key check failing at commit.
+    """
+    table = connection.ops.quote_name(Like._meta.db_table)
+    try:
+        with transaction.atomic():
+            inserted = _fetchone(
+                f"INSERT INTO {table} (user_id, post_id, comment_id, created_at) VALUES (%s, %s, %s, %s) "
+                f"ON CONFLICT DO NOTHING RETURNING id",
+                [user.pk, post_id, comment_id, connection.ops.adapt_datetimefield_value(timezone.now())],
+            )
+            if inserted:
+                _count_like(post_id, comment_id, 1)
+    except IntegrityError as exc:
+        if _is_foreign_key_violation(exc):
+            raise LikeTargetMissing from exc
+        raise
+    return inserted is not None
+
+
+def unlike(user, post_id=None, comment_id=None):
+    """Remove a like with a single DELETE; returns True if there was one."""
+    table = connection.ops.quote_name(Like._meta.db_table)
+    target, value = ('post_id', post_id) if post_id else ('comment_id', comment_id)
+    with transaction.atomic():
+        deleted = _fetchone(f"DELETE FROM {table} WHERE user_id = %s AND {target} = %s RETURNING id", [user.pk, value])
+        if deleted:
+            _count_like(post_id, comment_id, -1)
+    return deleted is not None
+
+
+def _collect_comment_ids(comments, ids):
+    for comment in comments:
+        ids.add(comment['id'])
+        _collect_comment_ids(comment.get('replies', []), ids)
+
+
+def _split_liked(rows):
+    liked_posts, liked_comments = set(), set()
+    for post_id, comment_id in rows:
+        if post_id:
+            liked_posts.add(post_id)
+        else:
+            liked_comments.add(comment_id)
+    return liked_posts, liked_comments
+
+
+def _liked_by(user, post_ids, comment_ids):
+    if not user.is_authenticated or not (post_ids or comment_ids):
+        return set(), set()
+
+    liked = Like.objects.filter(user=user).filter(Q(post_id__in=post_ids) | Q(comment_id__in=comment_ids))
+    return _split_liked(liked.values_list('post_id', 'comment_id'))
+
+
+def _likes_on_posts(user, post_ids):
+    return Like.objects.filter(user=user).filter(Q(post_id__in=post_ids) | Q(comment__post_id__in=post_ids))
+
+
+def liked_on_posts(user, post_ids):
+    """
+    The posts, and comments on those posts, that ``user`` liked. Needs only
+    the post ids, so it can run before anything is rendered.
+    """
+    if not user.is_authenticated or not post_ids:
+        return set(), set()
+    return _split_liked(_likes_on_posts(user, post_ids).values_list('post_id', 'comment_id'))
+
+
+async def aliked_on_posts(user, post_ids):
+    """liked_on_posts for async views, which run it alongside rendering."""
+    if not user.is_authenticated or not post_ids:
+        return set(), set()
+    return _split_liked([row async for row in _likes_on_posts(user, post_ids).values_list('post_id', 'comment_id')])
+
+
+def _pending_likes(model, pk):
+    return like_buffer.pending(model, pk) if settings.LIKE_BUFFER_ENABLED else 0
+
+
+def _mark_comments(comments, liked_comments):
+    return [
+        dict(comment, liked_by_me=comment['id'] in liked_comments,
+             likes_count=comment['likes_count'] + _pending_likes(Comment, comment['id']),
+             replies=_mark_comments(comment.get('replies', []), liked_comments))
+        for comment in comments
+    ]
+
+
+def mark_liked_by_me(posts, user):
+    """
+    Copies of the rendered ``posts`` with ``liked_by_me`` set on every post
+    and nested comment, resolved with one query for the whole page. Like
+    counts also take in deltas still waiting in this process's buffer.
+    """
+    comment_ids = set()
+    for post in posts:
+        _collect_comment_ids(post.get('comments', []), comment_ids)
+    return apply_liked_by_me(posts, *_liked_by(user, {post['id'] for post in posts}, comment_ids))
+
+
+def apply_liked_by_me(posts, liked_posts, liked_comments):
+    return [
+        dict(post, liked_by_me=post['id'] in liked_posts,
+             likes_count=post['likes_count'] + _pending_likes(Post, post['id']),
+             comments=_mark_comments(post.get('comments', []), liked_comments))
+        for post in posts
+    ]
+
+
+def mark_comments_liked_by_me(comments, user):
+    comment_ids = set()
+    _collect_comment_ids(comments, comment_ids)
+    _, liked_comments = _liked_by(user, set(), comment_ids)
+    return _mark_comments(comments, liked_comments)
+
+
+def apply_comment_liked_by_me(comment, liked_comments):
+    return _mark_comments([comment], liked_comments)[0]
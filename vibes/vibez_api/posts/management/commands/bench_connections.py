@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from vibez_api.benchmarks import HttpClient, Recorder, bench_users, run_threads
+from vibez_api.posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare database connection handling on servers started with different settings against "
+        "this database, e.g. `DATABASE_CONN_MAX_AGE=0 gunicorn vibes.wsgi -b :8000 --threads 8`, the "
+        "same with DATABASE_CONN_MAX_AGE=60 on :8001 and with DATABASE_POOL=true on :8002. Reports "
+        "throughput, latency and how many PostgreSQL sessions each server opened."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', action='append', default=[], metavar='NAME=URL',
+                            help="A server to measure; repeat for each configuration.")
+        parser.add_argument('--threads', type=int, default=16, help="Concurrent client threads.")
+        parser.add_argument('--duration', type=float, default=10, help="Seconds per endpoint and server.")
+
+    def handle(self, *args, **options):
+        servers = [server.split('=', 1) for server in options['server']]
+        if not servers or any(len(server) != 2 for server in servers):
+            raise CommandError("Give at least one --server NAME=URL")
+
+        with bench_users(1, prefix='bench_connections') as (user,):
+            token = Token.objects.create(user=user).key
+            post = Post.objects.create(user=user, content="bench connections")
+            endpoints = {
+                'post detail': f'/api/posts/{post.pk}/',
+                'user detail': f'/api/auth/users/{user.pk}/',
+                'feed': '/api/posts/',
+            }
+            for endpoint, path in endpoints.items():
+                for name, url in servers:
+                    sessions = self.sessions_opened()
+                    summary = self.run(url, token, path, options['threads'], options['duration'])
+                    if sessions is not None:
+                        summary['sessions'] = self.sessions_opened() - sessions
+                    self.stdout.write(f"{endpoint} [{name}]: " + ", ".join(f"{key}={value}" for key, value in summary.items()))
+
+    def sessions_opened(self):
+        """Sessions PostgreSQL has started on this database so far (pg_stat_database, PostgreSQL 14+)."""
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_stat_clear_snapshot()")
+            cursor.execute("SELECT sessions FROM pg_stat_database WHERE datname = current_database()")
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def run(self, url, token, path, threads, duration):
+        recorder = Recorder()
+        deadline = time.monotonic() + duration
+
+        def read(index):
+            client = HttpClient(url, token=token)
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    status, _ = client.request('GET', path)
+                except OSError:
+                    status = None
+                recorder.record(time.perf_counter() - started, status == 200)
+            client.close()
+
+        elapsed = run_threads(read, threads)
+        return recorder.summary(elapsed)
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from vibez_api.benchmarks import Recorder, bench_users, run_threads
+from vibez_api.posts.counters import like_buffer
+from vibez_api.posts.models import Post, Like
+
+
+class LockSampler(threading.Thread):
+    """Polls pg_locks for lock requests that are waiting on another transaction."""
+
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.samples = 0
+        self.waiting_samples = 0
+        self.max_waiting = 0
+
+    def run(self):
+        try:
+            with connections['default'].cursor() as cursor:
+                while not self.stopped.wait(self.interval):
+                    cursor.execute("SELECT count(*) FROM pg_locks WHERE NOT granted")
+                    waiting = cursor.fetchone()[0]
+                    self.samples += 1
+                    self.waiting_samples += bool(waiting)
+                    self.max_waiting = max(self.max_waiting, waiting)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return {
+            'lock_wait_share': round(self.waiting_samples / self.samples, 3) if self.samples else 0.0,
+            'max_waiting_locks': self.max_waiting,
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer the like endpoint on a few hot posts from many threads and compare "
+        "direct counter updates with the write-behind like buffer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=50, help="Like/unlike requests per thread.")
+        parser.add_argument('--posts', type=int, default=1, help="Number of hot posts to spread likes over.")
+        parser.add_argument('--mode', choices=['direct', 'buffered', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        modes = ['direct', 'buffered'] if options['mode'] == 'both' else [options['mode']]
+        with bench_users(options['threads'], prefix='bench_likes') as users:
+            posts = [Post.objects.create(user=users[0], content=f'hot post {index}') for index in range(options['posts'])]
+            for mode in modes:
+                Like.objects.filter(post__in=posts).delete()
+                Post.objects.filter(pk__in=[post.pk for post in posts]).update(likes_count=0)
+                with override_settings(LIKE_BUFFER_ENABLED=mode == 'buffered'):
+                    result = self.run_mode(users, posts, options['requests'])
+                    like_buffer.flush()
+                result['counters_match'] = self.counters_match(posts)
+                self.stdout.write(f"{mode}: " + ", ".join(f"{key}={value}" for key, value in result.items()))
+
+    def run_mode(self, users, posts, requests):
+        recorder = Recorder()
+
+        def hammer(index):
+            client = APIClient()
+            client.force_authenticate(users[index])
+            for number in range(requests):
+                post = posts[(index + number) % len(posts)]
+                send = client.put if number % 2 == 0 else client.delete
+                started = time.perf_counter()
+                response = send(f'/api/posts/{post.pk}/like/')
+                recorder.record(time.perf_counter() - started, ok=response.status_code < 400)
+
+        sampler = LockSampler() if connection.vendor == 'postgresql' else None
+        if sampler:
+            sampler.start()
+        elapsed = run_threads(hammer, len(users))
+        result = recorder.summary(elapsed)
+        if sampler:
+            result.update(sampler.stop())
+        return result
+
+    def counters_match(self, posts):
+        for post in Post.objects.filter(pk__in=[post.pk for post in posts]):
+            if post.likes_count != Like.objects.filter(post=post).count():
+                return False
+        return True
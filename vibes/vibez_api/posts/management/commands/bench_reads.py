@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from vibez_api.benchmarks import HttpClient, Recorder, bench_users, run_threads
+from vibez_api.posts.hashtags import set_post_hashtags
+from vibez_api.posts.models import Post, Comment
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the read endpoints (feed, post detail, hashtag listing, comment detail) on a WSGI "
+        "and an ASGI server sharing this database, e.g. `gunicorn vibes.wsgi -b :8000` and "
+        "`uvicorn vibes.asgi:application --port 8001`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', help="Base URL of the WSGI server.")
+        parser.add_argument('--asgi-url', help="Base URL of the ASGI server.")
+        parser.add_argument('--threads', type=int, default=16, help="Concurrent client threads.")
+        parser.add_argument('--duration', type=float, default=10, help="Seconds per endpoint and server.")
+        parser.add_argument('--posts', type=int, default=50, help="Posts to create for the run.")
+
+    def handle(self, *args, **options):
+        servers = [(name, options[f'{name}_url']) for name in ('wsgi', 'asgi') if options[f'{name}_url']]
+        if not servers:
+            raise CommandError("Give --wsgi-url and/or --asgi-url")
+
+        with bench_users(1, prefix='bench_reads') as (user,):
+            token = Token.objects.create(user=user).key
+            endpoints = self.create_data(user, options['posts'])
+            for endpoint, path in endpoints.items():
+                for name, url in servers:
+                    summary = self.run(url, token, path, options['threads'], options['duration'])
+                    self.stdout.write(f"{endpoint} [{name}]: " + ", ".join(f"{key}={value}" for key, value in summary.items()))
+
+    def create_data(self, user, count):
+        posts = []
+        for index in range(count):
+            post = Post.objects.create(user=user, content=f"bench post {index} #benchreads")
+            set_post_hashtags(post, post.content, user, created=True)
+            posts.append(post)
+        comment = None
+        for index in range(10):
+            comment = Comment.objects.create(user=user, post=posts[-1], content=f"bench comment {index}", parent=comment)
+        return {
+            'feed': '/api/posts/',
+            'post detail': f'/api/posts/{posts[-1].pk}/',
+            'hashtag listing': '/api/posts/hashtag/benchreads/',
+            'comment detail': f'/api/comments/{comment.pk}/comment/',
+        }
+
+    def run(self, url, token, path, threads, duration):
+        recorder = Recorder()
+        deadline = time.monotonic() + duration
+
+        def read(index):
+            client = HttpClient(url, token=token)
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                code, _ = client.request('GET', path)
+                recorder.record(time.perf_counter() - started, ok=code == 200)
+            client.close()
+
+        return recorder.summary(run_threads(read, threads))
@@ -0,0 +1,214 @@
+import json
+import statistics
+import subprocess
+import time
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from vibez_api.benchmarks import bench_users, percentile
+from vibez_api.posts.hashtags import set_post_hashtags
+from vibez_api.posts import urls as post_urls
+from vibez_api.posts.models import Post, Comment
+from vibez_api.users import urls as user_urls
+
+PREFIX = 'bench_routes'
+PASSWORD = 'bench-password-1'
+
+
+class Route:
+    """
+    One benchmarked request. ``path`` and ``data`` may be callables taking
+    the iteration number, for writes that need a fresh target every time.
+    """
+
+    def __init__(self, url_name, method, path, data=None, client='owner', prepare=None):
+        self.url_name, self.method = url_name, method
+        self.path, self.data = path, data
+        self.client, self.prepare = client, prepare
+
+    @property
+    def label(self):
+        return f'{self.url_name} {self.method}'
+
+    def resolve(self, value, iteration):
+        return value(iteration) if callable(value) else value
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every route in the posts and users apps through the test client and report latency "
+        "percentiles, query counts and response sizes. Writes the results as JSON so runs on different "
+        "commits can be compared. Seed the database first (manage.py seed_data) for realistic numbers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30, help="Measured requests per route.")
+        parser.add_argument('--warmup', type=int, default=3, help="Unmeasured requests per route first.")
+        parser.add_argument('--output', default='bench_routes.json', help="Where to write the JSON results.")
+        parser.add_argument('--compare', help="Earlier results file to print changes against.")
+        parser.add_argument('--only', nargs='*', help="Restrict the run to these URL names.")
+
+    def handle(self, *args, **options):
+        runs = options['warmup'] + options['iterations']
+        with bench_users(2 + runs, prefix=PREFIX) as users:
+            routes = self.build_routes(users, runs)
+            self.check_coverage(routes)
+            if options['only']:
+                routes = [route for route in routes if route.url_name in options['only']]
+
+            results = {}
+            for route in routes:
+                results[route.label] = self.measure(route, options['warmup'], options['iterations'])
+                self.stdout.write(self.format_row(route.label, results[route.label]))
+
+        report = {
+            'commit': self.current_commit(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'endpoints': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+        self.stdout.write(f"Wrote {options['output']}")
+
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                self.compare(json.load(baseline)['endpoints'], results)
+
+    def build_routes(self, users, runs):
+        owner, other, targets = users[0], users[1], users[2:]
+        User.objects.filter(pk__in=[owner.pk, other.pk]).update(password=make_password(PASSWORD))
+        self.clients = {
+            'owner': self.client_for(owner),
+            'anonymous': APIClient(),
+        }
+
+        hot = self.create_post(owner, "bench routes hot post coffee #benchroutes")
+        comment = Comment.objects.create(user=other, post=hot, content="bench comment")
+        Comment.objects.create(user=owner, post=hot, parent=comment, content="bench reply")
+        disposable_posts = [self.create_post(owner, f"bench disposable {index} #benchroutes") for index in range(runs)]
+        liked_posts = [self.create_post(other, f"bench like target {index}") for index in range(runs)]
+        disposable_comments = [
+            Comment.objects.create(user=owner, post=hot, content=f"bench disposable {index}") for index in range(runs)
+        ]
+        liked_comments = [
+            Comment.objects.create(user=other, post=hot, content=f"bench like target {index}") for index in range(runs)
+        ]
+
+        def log_in(iteration):
+            token = Token.objects.create(user=User.objects.create_user(f'{PREFIX}_logout_{iteration}'))
+            self.clients['logout'] = self.client_for(token.user)
+
+        return [
+            Route('post-list', 'GET', '/api/posts/'),
+            Route('post-list', 'POST', '/api/posts/', lambda i: {'content': f'bench post {i} #benchroutes'}),
+            Route('timeline', 'GET', '/api/timeline/'),
+            Route('post-search', 'GET', '/api/posts/search/?q=coffee'),
+            Route('post-hashtag-list', 'GET', '/api/posts/hashtag/benchroutes/', client='anonymous'),
+            Route('hashtag-trending', 'GET', '/api/hashtags/trending/'),
+            Route('hashtag-suggest', 'GET', '/api/hashtags/suggest/?q=be'),
+            Route('post-detail', 'GET', f'/api/posts/{hot.pk}/'),
+            Route('post-detail', 'PATCH', f'/api/posts/{hot.pk}/', lambda i: {'content': f'bench edit {i} #benchroutes'}),
+            Route('post-detail', 'DELETE', lambda i: f'/api/posts/{disposable_posts[i].pk}/'),
+            Route('like-post', 'PUT', lambda i: f'/api/posts/{liked_posts[i].pk}/like/'),
+            Route('like-post', 'DELETE', lambda i: f'/api/posts/{liked_posts[i].pk}/like/'),
+            Route('like-post', 'POST', f'/api/posts/{hot.pk}/like/'),
+            Route('like-comment', 'PUT', lambda i: f'/api/posts/comment/{liked_comments[i].pk}/like/'),
+            Route('like-comment', 'DELETE', lambda i: f'/api/posts/comment/{liked_comments[i].pk}/like/'),
+            Route('like-comment', 'POST', f'/api/posts/comment/{comment.pk}/like/'),
+            Route('post-comment', 'POST', f'/api/posts/{hot.pk}/comment/', lambda i: {'content': f'bench comment {i}'}),
+            Route('reply-comment', 'POST', f'/api/posts/{hot.pk}/comment/{comment.pk}/reply/',
+                  lambda i: {'content': f'bench reply {i}'}),
+            Route('post-comment-list', 'GET', f'/api/posts/{hot.pk}/comments/'),
+            Route('comment-detail', 'GET', f'/api/comments/{comment.pk}/comment/'),
+            Route('comment-replies', 'GET', f'/api/comments/{comment.pk}/replies/'),
+            Route('comment-detail', 'DELETE', lambda i: f'/api/comments/{disposable_comments[i].pk}/comment/'),
+            Route('signup', 'POST', '/api/auth/signup/', lambda i: {
+                'username': f'{PREFIX}_signup_{i}', 'email': f'{PREFIX}_signup_{i}@example.com', 'password': PASSWORD,
+            }, client='anonymous'),
+            Route('login', 'POST', '/api/auth/login/', {'username': other.username, 'password': PASSWORD},
+                  client='anonymous'),
+            Route('logout', 'POST', '/api/auth/logout/', client='logout', prepare=log_in),
+            Route('user-detail', 'GET', f'/api/auth/users/{other.pk}/'),
+            Route('user-follow', 'POST', lambda i: f'/api/auth/users/{targets[i].pk}/follow/'),
+            Route('user-follow', 'DELETE', lambda i: f'/api/auth/users/{targets[i].pk}/follow/'),
+        ]
+
+    def create_post(self, user, content):
+        post = Post.objects.create(user=user, content=content)
+        set_post_hashtags(post, content, user, created=True)
+        return post
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user)[0].key}')
+        return client
+
+    def check_coverage(self, routes):
+        covered = {route.url_name for route in routes}
+        for urls in (post_urls, user_urls):
+            for pattern in urls.urlpatterns:
+                if pattern.name not in covered:
+                    self.stderr.write(f"Route {pattern.name} is not benchmarked")
+
+    def measure(self, route, warmup, iterations):
+        latencies, queries, sizes, statuses = [], [], [], Counter()
+        for iteration in range(warmup + iterations):
+            if route.prepare:
+                route.prepare(iteration)
+            client = self.clients[route.client]
+            send = getattr(client, route.method.lower())
+            path, data = route.resolve(route.path, iteration), route.resolve(route.data, iteration)
+
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = send(path, data, format='json') if data is not None else send(path)
+                elapsed = time.perf_counter() - started
+
+            if iteration >= warmup:
+                latencies.append(elapsed)
+                queries.append(len(context.captured_queries))
+                sizes.append(len(response.content))
+                statuses[str(response.status_code)] += 1
+
+        return {
+            'method': route.method,
+            'path': route.resolve(route.path, 0),
+            'status': dict(statuses),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+            'queries': statistics.median(queries),
+            'queries_max': max(queries),
+            'bytes': statistics.median(sizes),
+        }
+
+    def format_row(self, label, result):
+        statuses = ' '.join(f'{code}x{count}' for code, count in sorted(result['status'].items()))
+        return (f"{label:<28} p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms"
+                f"  queries {result['queries']:>5g}  bytes {result['bytes']:>8g}  [{statuses}]")
+
+    def compare(self, baseline, results):
+        self.stdout.write("Change against baseline (p95, queries):")
+        for label, result in results.items():
+            before = baseline.get(label)
+            if before is None:
+                continue
+            p95 = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            self.stdout.write(f"{label:<28} p95 {p95:+7.1f}%  queries {result['queries'] - before['queries']:+g}")
+
+    def current_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
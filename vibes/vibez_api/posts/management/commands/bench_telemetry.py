@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+
+ROUTES = ['post-list', 'post-detail', 'timeline', 'like-post']
+
+
+class CollectorSink(ThreadingHTTPServer):
+    """An OTLP/HTTP endpoint that accepts everything and counts what arrives."""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SinkHandler)
+        self.lock = threading.Lock()
+        self.received = Counter()
+
+    @property
+    def endpoint(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def take(self):
+        with self.lock:
+            received, self.received = self.received, Counter()
+        return received
+
+
+class SinkHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with self.server.lock:
+            self.server.received['requests'] += 1
+            self.server.received['bytes'] += len(body)
+            if self.path == '/v1/traces':
+                request = ExportTraceServiceRequest.FromString(body)
+                self.server.received['spans'] += sum(
+                    len(scope.spans) for resource in request.resource_spans for scope in resource.scope_spans
+                )
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-protobuf')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure what telemetry costs per request. Runs bench_routes in child processes with telemetry "
+        "disabled, at the configured sample ratio without and with TELEMETRY_SAMPLE_ERRORS, and at a ratio "
+        "of 1, exporting to a local OTLP sink, and reports the added latency for each route."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help="Measured requests per route.")
+        parser.add_argument('--warmup', type=int, default=10, help="Unmeasured requests per route first.")
+        parser.add_argument('--ratio', type=float, default=settings.TELEMETRY_TRACES_SAMPLE_RATIO,
+                            help="Sample ratio for the sampled run.")
+        parser.add_argument('--only', nargs='*', default=ROUTES, help="URL names to measure.")
+
+    def handle(self, *args, **options):
+        variants = [
+            ('off', {'TELEMETRY_ENABLED': 'false'}),
+            (f"sampled {options['ratio']:g}", {'TELEMETRY_TRACES_SAMPLE_RATIO': str(options['ratio']),
+                                               'TELEMETRY_SAMPLE_ERRORS': 'false'}),
+            (f"sampled {options['ratio']:g} +errors", {'TELEMETRY_TRACES_SAMPLE_RATIO': str(options['ratio']),
+                                                       'TELEMETRY_SAMPLE_ERRORS': 'true'}),
+            ('sampled 1', {'TELEMETRY_TRACES_SAMPLE_RATIO': '1'}),
+        ]
+        sink = CollectorSink()
+        threading.Thread(target=sink.serve_forever, name='otlp-sink', daemon=True).start()
+        try:
+            results = {}
+            for name, env in variants:
+                results[name] = self.run_variant(sink, env, options)
+                received = sink.take()
+                self.stdout.write(f"{name}: exported {received['spans']} spans in {received['requests']} requests "
+                                  f"({received['bytes']} bytes)")
+        finally:
+            sink.shutdown()
+            sink.server_close()
+        self.report(results)
+
+    def run_variant(self, sink, env, options):
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            command = [
+                sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_routes',
+                '--iterations', str(options['iterations']), '--warmup', str(options['warmup']),
+                '--output', output.name, '--only', *options['only'],
+            ]
+            environment = {
+                **os.environ,
+                'TELEMETRY_ENABLED': 'true',
+                'TELEMETRY_LOG_LEVEL': '',
+                'OTEL_EXPORTER_OTLP_ENDPOINT': sink.endpoint,
+                **env,
+            }
+            finished = subprocess.run(command, env=environment, capture_output=True, text=True)
+            if finished.returncode:
+                raise CommandError(f"bench_routes failed:\n{finished.stderr}")
+            with open(output.name) as results:
+                return json.load(results)['endpoints']
+
+    def report(self, results):
+        names = list(results)
+        baseline = results[names[0]]
+        self.stdout.write(f"{'route':<28}" + ''.join(f"{name + ' p50':>24}" for name in names) + "   added per request")
+        for label, before in baseline.items():
+            p50s = [results[name][label]['p50_ms'] for name in names]
+            added = '  '.join(f"{p50 - before['p50_ms']:+.2f} ms" for p50 in p50s[1:])
+            self.stdout.write(f"{label:<28}" + ''.join(f"{p50:>21.2f} ms" for p50 in p50s) + f"   {added}")
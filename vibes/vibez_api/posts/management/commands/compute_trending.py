@@ -0,0 +1,38 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from vibez_api.posts.trending import WINDOWS, TrendingWorker, prune_buckets, refresh_trending, trending_cache
+
+
+class Command(BaseCommand):
+    help = "Recompute the trending hashtag snapshots and optionally prune expired buckets."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true', help="Delete buckets no window reads any more.")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep refreshing every TRENDING_REFRESH_SECONDS until stopped.")
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            self.stdout.write(f"Pruned {prune_buckets()} bucket(s)")
+
+        if options['loop']:
+            worker = TrendingWorker()
+            worker.start()
+
+            def shutdown(signum, frame):
+                worker.stop()
+
+            signal.signal(signal.SIGTERM, shutdown)
+            signal.signal(signal.SIGINT, shutdown)
+            self.stdout.write(f"Refreshing trending hashtags every {settings.TRENDING_REFRESH_SECONDS}s")
+            worker.join()
+            return
+
+        refresh_trending()
+        for window in WINDOWS:
+            snapshot = trending_cache().get(f'trending:{window}')
+            top = ', '.join(f"#{item['name']}" for item in snapshot['results'][:5])
+            self.stdout.write(f"{window}: {len(snapshot['results'])} tags ({top})")
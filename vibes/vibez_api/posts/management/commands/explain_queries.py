@@ -0,0 +1,107 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from vibez_api.benchmarks import bench_users
+from vibez_api.posts.management.commands import bench_routes
+
+# Every cache misses, so each request runs the queries a cold cache would
+NO_CACHES = {alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'} for alias in settings.CACHES}
+
+
+class Command(bench_routes.Command):
+    help = (
+        "Request every read route benchmarked by bench_routes once with caching off, run EXPLAIN ANALYZE "
+        "(EXPLAIN QUERY PLAN on SQLite) on each SELECT it issued and flag sequential scans. Seed the "
+        "database first (manage.py seed_data): on a near-empty table the planner rightly prefers a scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='*', help="Restrict the run to these URL names.")
+        parser.add_argument('--min-rows', type=int, default=10000,
+                            help="Only flag sequential scans that read at least this many rows (PostgreSQL).")
+        parser.add_argument('--plans', action='store_true', help="Print the full plan of every query.")
+        parser.add_argument('--strict', action='store_true', help="Exit with an error if anything was flagged.")
+
+    def handle(self, *args, **options):
+        flagged = 0
+        with bench_users(2, prefix=bench_routes.PREFIX) as users:
+            routes = [route for route in self.build_routes(users, 1) if route.method in ('GET', 'HEAD')]
+            if options['only']:
+                routes = [route for route in routes if route.url_name in options['only']]
+
+            for route in routes:
+                queries = self.capture(route)
+                self.stdout.write(f"{route.label} ({len(queries)} SELECTs)")
+                for sql in queries:
+                    flagged += self.explain(sql, options)
+
+        summary = f"{flagged} sequential scan{'' if flagged == 1 else 's'} flagged"
+        if flagged and options['strict']:
+            raise CommandError(summary)
+        self.stdout.write(summary)
+
+    def capture(self, route):
+        """The distinct SELECTs one request of ``route`` ran, in order."""
+        client = self.clients[route.client]
+        # CaptureQueriesContext sees nothing once the query log is at its cap
+        reset_queries()
+        with override_settings(CACHES=NO_CACHES), CaptureQueriesContext(connection) as context:
+            response = getattr(client, route.method.lower())(route.resolve(route.path, 0))
+        if response.status_code >= 400:
+            self.stderr.write(f"{route.label} answered {response.status_code}")
+
+        queries = []
+        for query in context.captured_queries:
+            sql = query['sql']
+            if sql.lstrip().upper().startswith('SELECT') and sql not in queries:
+                queries.append(sql)
+        return queries
+
+    def explain(self, sql, options):
+        """Print the query's timing and scans; returns how many scans were flagged."""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+                (plan,) = cursor.fetchone()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            plan = plan[0]
+            scans = [
+                (node['Relation Name'], self.rows_read(node))
+                for node in self.nodes(plan['Plan']) if node['Node Type'] == 'Seq Scan'
+            ]
+            flagged = [(relation, rows) for relation, rows in scans if rows >= options['min_rows']]
+            self.stdout.write(f"  {plan['Execution Time']:8.2f} ms  {self.shorten(sql)}")
+            details = json.dumps(plan['Plan'], indent=2) if options['plans'] else None
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                steps = [row[-1] for row in cursor.fetchall()]
+            # "SCAN table USING [COVERING] INDEX" walks an index; a bare SCAN reads the table
+            flagged = [(step.split()[1], None) for step in steps if step.startswith('SCAN ') and ' USING ' not in step]
+            self.stdout.write(f"  {self.shorten(sql)}")
+            details = '\n'.join(steps) if options['plans'] else None
+
+        for relation, rows in flagged:
+            read = f" reading {rows} rows" if rows is not None else ""
+            self.stdout.write(self.style.WARNING(f"    sequential scan on {relation}{read}"))
+        if details:
+            self.stdout.write('\n'.join(f"    {line}" for line in details.splitlines()))
+        return len(flagged)
+
+    def nodes(self, node):
+        yield node
+        for child in node.get('Plans', ()):
+            yield from self.nodes(child)
+
+    def rows_read(self, node):
+        per_loop = node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)
+        return per_loop * node.get('Actual Loops', 1)
+
+    def shorten(self, sql, width=110):
+        sql = ' '.join(sql.split())
+        return sql if len(sql) <= width else sql[:width - 3] + '...'
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from vibez_api.posts.counters import recount_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute like, comment and reply counters from the source tables to repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drifted rows without fixing them.")
+
+    def handle(self, *args, **options):
+        drift = recount_counters(dry_run=options['dry_run'])
+        verb = 'drifted' if options['dry_run'] else 'repaired'
+        for label, rows in drift.items():
+            self.stdout.write(f"{label}: {rows} {verb}")
@@ -0,0 +1,33 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from vibez_api.posts.media_pipeline import MediaWorker, process_pending
+
+
+class Command(BaseCommand):
+    help = "Upload pending post and comment media from the local spool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=1, help="Number of worker threads.")
+        parser.add_argument('--once', action='store_true', help="Process one batch and exit.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            handled = process_pending()
+            self.stdout.write(f"Processed {handled} media file(s)")
+            return
+
+        workers = [MediaWorker() for _ in range(options['threads'])]
+        for worker in workers:
+            worker.start()
+
+        def shutdown(signum, frame):
+            for worker in workers:
+                worker.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        self.stdout.write(f"Media worker running with {len(workers)} thread(s)")
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,33 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from vibez_api.posts.timeline import TimelineWorker, process_jobs
+
+
+class Command(BaseCommand):
+    help = "Push new posts and backfills into followers' home timelines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=1, help="Number of worker threads.")
+        parser.add_argument('--once', action='store_true', help="Run one batch of jobs and exit.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            handled = process_jobs()
+            self.stdout.write(f"Ran {handled} timeline job(s)")
+            return
+
+        workers = [TimelineWorker() for _ in range(options['threads'])]
+        for worker in workers:
+            worker.start()
+
+        def shutdown(signum, frame):
+            for worker in workers:
+                worker.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        self.stdout.write(f"Timeline worker running with {len(workers)} thread(s)")
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vibez_api.seed import Seeder, clear
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic social graph (users, follows, posts, hashtags, media, comments, likes) for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--likes', type=int, default=100000, help="Like attempts; duplicates are dropped.")
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--hashtags', type=int, default=500)
+        parser.add_argument('--follows', type=int, default=20, help="Average accounts followed per user.")
+        parser.add_argument('--days', type=int, default=30, help="Spread post timestamps over this many days.")
+        parser.add_argument('--reply-ratio', type=float, default=0.4, help="Share of comments that are replies.")
+        parser.add_argument('--max-depth', type=int, default=4, help="Deepest reply nesting.")
+        parser.add_argument('--media-ratio', type=float, default=0.2, help="Share of posts with media.")
+        parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent for popularity.")
+        parser.add_argument('--no-timelines', action='store_true', help="Skip filling home timelines.")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed, for reproducible data.")
+        parser.add_argument('--clear', action='store_true', help="Delete previously seeded data first.")
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['posts'] < 1:
+            raise CommandError("Need at least 2 users and 1 post")
+
+        if options['clear']:
+            self.stdout.write(f"Deleted {clear()} seeded rows")
+
+        seeder = Seeder(
+            users=options['users'], posts=options['posts'], likes=options['likes'], comments=options['comments'],
+            hashtags=options['hashtags'], follows=options['follows'], days=options['days'],
+            reply_ratio=options['reply_ratio'], max_depth=options['max_depth'], media_ratio=options['media_ratio'],
+            exponent=options['zipf'], timelines=not options['no_timelines'], seed=options['seed'],
+            log=self.stdout.write,
+        )
+        created = seeder.run()
+        self.stdout.write(self.style.SUCCESS(", ".join(f"{count} {name}" for name, count in created.items())))
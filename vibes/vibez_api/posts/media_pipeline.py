@@ -0,0 +1,200 @@
+import logging
+import os
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .models import PostMedia, CommentMedia
+from ..uploads import upload_files
+from ..workers import InProcessWorkers, PollingWorker
+
+logger = logging.getLogger(__name__)
+
+MEDIA_MODELS = [
+    (PostMedia, 'post_id'),
+    (CommentMedia, 'comment_id'),
+]
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif']
+VIDEO_EXTENSIONS = ['.mp4', '.mov', '.avi']
+
+
+def get_media_type(name):
+    extension = os.path.splitext(name)[1].lower()
+
+    if extension in IMAGE_EXTENSIONS:
+        return 'image'
+    elif extension in VIDEO_EXTENSIONS:
+        return 'video'
+    else:
+        return 'unknown'
+
+
+def spool(file):
+    """Write an uploaded file to the local spool directory and return its path."""
+    directory = Path(settings.MEDIA_SPOOL_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{uuid.uuid4()}{os.path.splitext(file.name)[1].lower()}"
+
+    with open(path, 'wb') as out:
+        for chunk in file.chunks():
+            out.write(chunk)
+    return str(path)
+
+
+def enqueue(model, file, **owner):
+    """
+    Persist a pending media row for ``file`` and return it immediately.
+
+    The pending rows are the queue: workers claim them, upload the spooled
+    file and flip them to ready or failed. The file is only spooled once the
+    row commits, so a request that rolls back leaves no file behind; until
+    then the row has no spool_path and workers leave it alone.
+    """
+    media = model.objects.create(
+        media_type=get_media_type(file.name),
+        status='pending',
+        **owner,
+    )
+    transaction.on_commit(partial(spool_committed, media, file))
+    return media
+
+
+def spool_committed(media, file):
+    try:
+        media.spool_path = spool(file)
+    except OSError:
+        # claim() fails the row once it has waited MEDIA_CLAIM_TIMEOUT
+        logger.exception("Could not spool %s %s", media._meta.model_name, media.pk)
+        return
+    if not type(media).objects.filter(pk=media.pk).update(spool_path=media.spool_path):
+        # Deleted since it committed
+        discard_spool(media)
+        return
+    wake_workers()
+
+
+def claimable(model):
+    stale = timezone.now() - timedelta(seconds=settings.MEDIA_CLAIM_TIMEOUT)
+    return model.objects.filter(
+        Q(status='pending', spool_path__gt='')
+        | Q(status='pending', created_at__lt=stale)
+        | Q(status='processing', claimed_at__lt=stale)
+    )
+
+
+def claim(model, owner, limit):
+    """
+    Claim the media of up to ``limit`` posts or comments (``owner``) for
+    upload, returned as one batch per owner. Every claimable row of an owner
+    is claimed together, so its files upload all or nothing; workers lock
+    only each owner's first claimable row, so two of them never split one.
+
+    Owners that can never be uploaded are failed instead: ones with a row
+    whose spool was never written (the process died between the commit and
+    spooling) or left in processing after MEDIA_UPLOAD_MAX_ATTEMPTS claims,
+    which keeps killing its worker.
+    """
+    with transaction.atomic():
+        earlier = claimable(model).filter(**{owner: OuterRef(owner)}, pk__lt=OuterRef('pk'))
+        heads = claimable(model).filter(~Exists(earlier)).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            heads = heads.select_for_update(skip_locked=True)
+        owners = [getattr(head, owner) for head in heads[:limit]]
+
+        batches = defaultdict(list)
+        for row in claimable(model).filter(**{f'{owner}__in': owners}).order_by('id'):
+            batches[getattr(row, owner)].append(row)
+
+        claimed, abandoned = [], []
+        for batch in batches.values():
+            usable = all(row.spool_path and row.attempts < settings.MEDIA_UPLOAD_MAX_ATTEMPTS for row in batch)
+            (claimed if usable else abandoned).append(batch)
+
+        now = timezone.now()
+        model.objects.filter(pk__in=[row.pk for batch in claimed for row in batch]).update(
+            status='processing', claimed_at=now, attempts=F('attempts') + 1
+        )
+        for batch in abandoned:
+            logger.error("Giving up on %s %s", model._meta.model_name, [(row.pk, row.attempts) for row in batch])
+            for media in batch:
+                fail(media)
+    for batch in claimed:
+        for row in batch:
+            row.status, row.claimed_at, row.attempts = 'processing', now, row.attempts + 1
+    return claimed
+
+
+def fail(media):
+    media.status = 'failed'
+    discard_spool(media)
+    media.save(update_fields=['status', 'spool_path'])
+
+
+def process(batch):
+    """Upload every media row of one post or comment together; they all succeed or none do."""
+    try:
+        stored = upload_files([media.spool_path for media in batch])
+    except Exception:
+        logger.exception("Uploading %s %s failed", batch[0]._meta.model_name, [media.pk for media in batch])
+        for media in batch:
+            if media.attempts < settings.MEDIA_UPLOAD_MAX_ATTEMPTS:
+                media.status = 'pending'
+                media.save(update_fields=['status'])
+            else:
+                fail(media)
+        return False
+
+    for media, result in zip(batch, stored):
+        media.media_url = result.url
+        media.status = 'ready'
+        discard_spool(media)
+        # save() rather than update() so the post cache hears about it
+        media.save(update_fields=['media_url', 'status', 'spool_path'])
+    return True
+
+
+def discard_spool(media):
+    if media.spool_path:
+        try:
+            os.remove(media.spool_path)
+        except FileNotFoundError:
+            pass
+        media.spool_path = ''
+
+
+def process_pending(limit=None):
+    """Claim and upload the media of one batch of owners. Returns the number of rows handled."""
+    limit = limit or settings.MEDIA_WORKER_BATCH_SIZE
+    handled = 0
+    for model, owner in MEDIA_MODELS:
+        for batch in claim(model, owner, limit):
+            process(batch)
+            handled += len(batch)
+    return handled
+
+
+class MediaWorker(PollingWorker):
+    """Polls the pending media rows and uploads them until stopped."""
+    thread_name = 'media-worker'
+
+    def __init__(self, poll_interval=None):
+        super().__init__(poll_interval or settings.MEDIA_WORKER_POLL_INTERVAL)
+
+    def process(self):
+        return process_pending()
+
+
+_workers = InProcessWorkers(MediaWorker, 'MEDIA_WORKER_IN_PROCESS', 'MEDIA_WORKER_THREADS')
+
+
+def wake_workers():
+    """Nudge the in-process workers, starting them on first use if enabled."""
+    _workers.wake()
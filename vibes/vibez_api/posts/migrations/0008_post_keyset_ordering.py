@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0007_alter_like_comment_alter_like_post_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="post",
+            options={"ordering": ["-created_at", "-id"]},
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="post_created_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:04
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    Like = apps.get_model("posts", "Like")
+
+    for model, counter, source, field in [
+        (Post, "likes_count", Like, "post"),
+        (Post, "comments_count", Comment, "post"),
+        (Comment, "likes_count", Like, "comment"),
+        (Comment, "replies_count", Comment, "parent"),
+    ]:
+        counted = (
+            source.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("*"))
+            .values("total")
+        )
+        model.objects.update(
+            **{
+                counter: Coalesce(
+                    Subquery(counted, output_field=IntegerField()), Value(0)
+                )
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0008_post_keyset_ordering"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="likes_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="replies_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="comments_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:06
+
+from django.db import migrations, models
+
+
+def mark_existing_ready(apps, schema_editor):
+    # Media created before the pipeline was uploaded synchronously.
+    for model_name in ("PostMedia", "CommentMedia"):
+        apps.get_model("posts", model_name).objects.update(status="ready")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0009_denormalized_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="commentmedia",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="commentmedia",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="commentmedia",
+            name="spool_path",
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name="commentmedia",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="postmedia",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="postmedia",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="postmedia",
+            name="spool_path",
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name="postmedia",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="commentmedia",
+            name="media_url",
+            field=models.URLField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name="postmedia",
+            name="media_url",
+            field=models.URLField(blank=True),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+    ]
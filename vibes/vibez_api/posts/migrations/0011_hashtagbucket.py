@@ -0,0 +1,46 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0010_media_upload_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HashTagBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "hashtag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="buckets",
+                        to="posts.hashtag",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["bucket", "hashtag"], name="hashtag_bucket_idx"
+                    )
+                ],
+                "unique_together": {("hashtag", "bucket")},
+            },
+        ),
+    ]
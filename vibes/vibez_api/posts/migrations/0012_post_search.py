@@ -0,0 +1,64 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_structures(apps, schema_editor):
+    # The GIN index and tsvector backfill only exist on PostgreSQL; SQLite
+    # gets an FTS5 table that the search module keeps in step instead.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX post_search_idx ON posts_post USING gin (search_vector)"
+        )
+        schema_editor.execute(
+            "UPDATE posts_post SET search_vector = to_tsvector(%s::regconfig, coalesce(content, ''))",
+            [settings.SEARCH_CONFIG],
+        )
+    elif schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE posts_post_fts USING fts5(content, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO posts_post_fts (rowid, content) SELECT id, coalesce(content, '') FROM posts_post"
+        )
+
+
+def drop_search_structures(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS post_search_idx")
+    elif schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS posts_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0011_hashtagbucket"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="post",
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=["search_vector"], name="post_search_idx"
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_structures, drop_search_structures),
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_comment_likes(apps, schema_editor):
+    # Comment likes were never covered by unique_together; keep the oldest
+    # like per (user, comment) and take the duplicates off the counters.
+    Like = apps.get_model("posts", "Like")
+    Comment = apps.get_model("posts", "Comment")
+
+    duplicates = (
+        Like.objects.filter(comment__isnull=False)
+        .values("user_id", "comment_id")
+        .annotate(first=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        Like.objects.filter(
+            user_id=row["user_id"], comment_id=row["comment_id"]
+        ).exclude(id=row["first"]).delete()
+        Comment.objects.filter(pk=row["comment_id"]).update(
+            likes_count=models.F("likes_count") - (row["total"] - 1)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0013_timelineentry"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="like",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="like",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("post__isnull", False)),
+                fields=("user", "post"),
+                name="unique_post_like",
+            ),
+        ),
+        migrations.RunPython(remove_duplicate_comment_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="like",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("comment__isnull", False)),
+                fields=("user", "comment"),
+                name="unique_comment_like",
+            ),
+        ),
+    ]
@@ -0,0 +1,198 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres import operations as postgres_operations
+from django.db import migrations, models
+
+# Runs outside a transaction so that PostgreSQL can build and drop the
+# indexes CONCURRENTLY, without blocking writes to these tables. Other
+# databases get the plain operations.
+
+
+class AddIndexConcurrently(postgres_operations.AddIndexConcurrently):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+def field_index_names(schema_editor, model, column):
+    """The single-column indexes on ``column`` that the field itself created."""
+    meta_indexes = {index.name for index in model._meta.indexes}
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return [
+        name for name, info in constraints.items()
+        if info["index"] and not info["unique"] and not info["primary_key"]
+        and info["columns"] == [column] and name not in meta_indexes
+    ]
+
+
+class DropForeignKeyIndex(migrations.AlterField):
+    """
+    AlterField to db_index=False. On PostgreSQL only the index is dropped,
+    concurrently; a plain AlterField would also drop and re-add the foreign
+    key constraint, revalidating every row under lock.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        column = model._meta.get_field(self.name).column
+        for name in field_index_names(schema_editor, model, column):
+            schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(name)}")
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        field = model._meta.get_field(self.name)
+        index = models.Index(
+            fields=[field.name], name=schema_editor._create_index_name(model._meta.db_table, [field.column])
+        )
+        schema_editor.add_index(model, index, concurrently=True)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("posts", "0014_like_unique_constraints"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "-created_at", "-id"], name="comment_post_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="comment",
+            index=models.Index(
+                condition=models.Q(("parent__isnull", False)),
+                fields=["parent", "created_at", "id"],
+                name="comment_replies_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="commentmedia",
+            index=models.Index(
+                condition=models.Q(("status__in", ["pending", "processing"])),
+                fields=["id"],
+                name="comment_media_queue_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="like",
+            index=models.Index(
+                condition=models.Q(("post__isnull", False)),
+                fields=["post"],
+                name="like_post_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="like",
+            index=models.Index(
+                condition=models.Q(("comment__isnull", False)),
+                fields=["comment"],
+                name="like_comment_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="post",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="post_user_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="posthashtag",
+            index=models.Index(fields=["hashtag", "post"], name="post_hashtag_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="postmedia",
+            index=models.Index(
+                condition=models.Q(("status__in", ["pending", "processing"])),
+                fields=["id"],
+                name="post_media_queue_idx",
+            ),
+        ),
+        # The composite indexes lead with these foreign keys, so their own
+        # indexes go once the replacements exist.
+        DropForeignKeyIndex(
+            model_name="comment",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="replies",
+                to="posts.comment",
+            ),
+        ),
+        DropForeignKeyIndex(
+            model_name="comment",
+            name="post",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="comments",
+                to="posts.post",
+            ),
+        ),
+        DropForeignKeyIndex(
+            model_name="like",
+            name="comment",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="likes",
+                to="posts.comment",
+            ),
+        ),
+        DropForeignKeyIndex(
+            model_name="like",
+            name="post",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="likes",
+                to="posts.post",
+            ),
+        ),
+        DropForeignKeyIndex(
+            model_name="post",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="posts",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        DropForeignKeyIndex(
+            model_name="posthashtag",
+            name="hashtag",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="posts.hashtag",
+            ),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+PATH_STEP = 19
+
+
+def fill_paths(apps, schema_editor):
+    # One level per pass: the comments without a path whose parent has one
+    # (or who have no parent) get the parent's path plus their own id.
+    Comment = apps.get_model("posts", "Comment")
+
+    depth = 0
+    while True:
+        if depth == 0:
+            level = Comment.objects.filter(path="", parent__isnull=True).annotate(parent_path=models.Value(""))
+        else:
+            level = Comment.objects.filter(path="", parent__depth=depth - 1).exclude(parent__path="").annotate(
+                parent_path=F("parent__path")
+            )
+        batch = []
+        for comment in level.only("id").iterator(chunk_size=2000):
+            comment.path = comment.parent_path + f"{comment.pk:0{PATH_STEP}d}"
+            comment.depth = depth
+            batch.append(comment)
+        if not batch:
+            break
+        Comment.objects.bulk_update(batch, ["path", "depth"], batch_size=2000)
+        depth += 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0015_hot_query_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                condition=models.Q(("parent__isnull", True)),
+                fields=["post", "-created_at", "-id"],
+                name="comment_top_level_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["depth", "path"], name="comment_thread_idx"),
+        ),
+    ]
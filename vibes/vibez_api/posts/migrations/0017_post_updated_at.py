@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0016_comment_paths"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
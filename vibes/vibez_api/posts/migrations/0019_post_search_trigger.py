@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def search_config():
+    # tsvector_update_trigger only accepts a schema-qualified configuration
+    return settings.SEARCH_CONFIG if '.' in settings.SEARCH_CONFIG else f'pg_catalog.{settings.SEARCH_CONFIG}'
+
+
+def create_search_trigger(apps, schema_editor):
+    # Post.search_vector is filled in by the INSERT or UPDATE that writes
+    # the content, instead of by a second UPDATE after every save.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TRIGGER post_search_vector_update BEFORE INSERT OR UPDATE OF content ON posts_post "
+            "FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger(search_vector, %s, content)",
+            [search_config()],
+        )
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP TRIGGER IF EXISTS post_search_vector_update ON posts_post")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0018_timelinejob"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
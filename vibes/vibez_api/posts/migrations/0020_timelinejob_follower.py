@@ -0,0 +1,39 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0019_post_search_trigger"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timelinejob",
+            name="follower",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="timelinejob",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("post", "Fan out post"),
+                    ("author", "Backfill author"),
+                    ("follow", "Backfill follower"),
+                ],
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:02
+
+from django.db import migrations
+
+OLD_STEP = 10
+PATH_STEP = 19
+
+
+def repad_paths(apps, schema_editor):
+    # Paths written with 10-digit segments, told apart from 19-digit ones by
+    # their length, get each segment zero-padded to 19 digits.
+    Comment = apps.get_model("posts", "Comment")
+
+    batch = []
+    for comment in Comment.objects.only("id", "path", "depth").iterator(chunk_size=2000):
+        if len(comment.path) != (comment.depth + 1) * OLD_STEP:
+            continue
+        segments = [comment.path[start:start + OLD_STEP] for start in range(0, len(comment.path), OLD_STEP)]
+        comment.path = "".join(segment.zfill(PATH_STEP) for segment in segments)
+        batch.append(comment)
+        if len(batch) == 2000:
+            Comment.objects.bulk_update(batch, ["path"])
+            batch = []
+    Comment.objects.bulk_update(batch, ["path"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0020_timelinejob_follower"),
+    ]
+
+    operations = [
+        migrations.RunPython(repad_paths, migrations.RunPython.noop),
+    ]
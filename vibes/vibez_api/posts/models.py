@@ -1,15 +1,29 @@
-from django.db import models
+from django.db import connections, models, router, transaction
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 class Post(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
+    # Indexed by post_user_created_idx
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts', db_index=False)
     content = models.TextField(blank=True, null=True)
     hashtags = models.ManyToManyField("HashTag", related_name='posts', through='PostHashTag')
+    likes_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Moved on every change to what the post renders as, its comments, likes
+    # and media included (see counters.touch_posts); ETags are derived from it.
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='post_created_id_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='post_user_created_idx'),
+            GinIndex(fields=['search_vector'], name='post_search_idx'),
+        ]
 
 
 class PostMedia(models.Model):
@@ -17,23 +31,116 @@ class PostMedia(models.Model):
         ('image', 'Image'),
         ('video', 'Video'),
     ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
 
     post = models.ForeignKey(Post, related_name='media', on_delete=models.CASCADE)
-    media_url = models.URLField()
+    media_url = models.URLField(blank=True)
     media_type = models.CharField(max_length=20, choices=MEDIA_TYPES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    spool_path = models.CharField(max_length=500, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(status__in=['pending', 'processing']),
+                         name='post_media_queue_idx'),
+        ]
+
     def __str__(self):
         return f"{self.media_type} for Post {self.post.id}"
 
 
+# Digits per level of Comment.path; zero-padded so paths sort like their ids.
+# 19 digits hold any positive BigAutoField value.
+PATH_STEP = 19
+
+
+def path_segment(pk):
+    return f'{pk:0{PATH_STEP}d}'
+
+
+def allocate_id(model, using):
+    """The next id from ``model``'s sequence, or None where ids are only known once the row is inserted."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, %s))",
+                       [model._meta.db_table, model._meta.pk.column])
+        return cursor.fetchone()[0]
+
+
 class Comment(models.Model):
     content = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
-    parent = models.ForeignKey("self", on_delete=models.CASCADE, related_name="replies", null=True, blank=True)
+    # Indexed by comment_post_created_idx and comment_replies_idx
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments", db_index=False)
+    parent = models.ForeignKey("self", on_delete=models.CASCADE, related_name="replies", null=True, blank=True,
+                               db_index=False)
+    likes_count = models.IntegerField(default=0)
+    replies_count = models.IntegerField(default=0)
+    # The ids from the thread's top-level comment down to this one, one
+    # PATH_STEP-digit segment each, so a subtree is one range of paths.
+    path = models.TextField(blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id'], name='comment_post_created_idx'),
+            models.Index(fields=['post', '-created_at', '-id'], condition=models.Q(parent__isnull=True),
+                         name='comment_top_level_idx'),
+            models.Index(fields=['parent', 'created_at', 'id'], condition=models.Q(parent__isnull=False),
+                         name='comment_replies_idx'),
+            models.Index(fields=['depth', 'path'], name='comment_thread_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        A new comment's path ends with its own id. On PostgreSQL the id is
+        taken from the sequence first, so the row is inserted with its path
+        and never rewritten. Elsewhere it is an INSERT and then an UPDATE of
+        the path, in one transaction, so no reader ever sees it without a
+        path. Depth and the path prefix come from ``parent``; pass the
+        parent instance rather than parent_id, as the serializer does, and
+        there is no query for it.
+        """
+        if self.path:
+            return super().save(*args, **kwargs)
+        using = kwargs.get('using') or router.db_for_write(Comment, instance=self)
+        if self.parent_id:
+            self.depth = self.parent.depth + 1
+        prefix = self.parent.path if self.parent_id else ''
+        if self.pk is None:
+            self.pk = allocate_id(Comment, using)
+        if self.pk is not None:
+            self.path = prefix + path_segment(self.pk)
+            # With the id already set, save() would try an UPDATE first
+            return super().save(*args, **{**kwargs, 'force_insert': True})
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            self.path = prefix + path_segment(self.pk)
+            Comment.objects.using(using).filter(pk=self.pk).update(path=self.path)
+
+    def subtree_range(self):
+        """Bounds strictly containing the paths of every reply below this comment."""
+        return self.path, self.path[:-PATH_STEP] + path_segment(int(self.path[-PATH_STEP:]) + 1)
+
+    def replies_filter(self):
+        """
+        The direct replies, as one range of comment_thread_idx: in path (so
+        thread) order, however many replies those replies have.
+        """
+        low, high = self.subtree_range()
+        return models.Q(depth=self.depth + 1, path__gt=low, path__lt=high)
 
     def __str__(self):
         return self.content
@@ -44,19 +151,39 @@ class CommentMedia(models.Model):
         ('image', 'Image'),
         ('video', 'Video')
     ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
 
     comment = models.ForeignKey(Comment, related_name='media', on_delete=models.CASCADE)
-    media_url = models.URLField()
+    media_url = models.URLField(blank=True)
     media_type = models.CharField(max_length=20, choices=MEDIA_TYPES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    spool_path = models.CharField(max_length=500, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(status__in=['pending', 'processing']),
+                         name='comment_media_queue_idx'),
+        ]
+
     def __str__(self):
         return f"{self.media_type} for Comment {self.comment.id}"
 
 
 class Like(models.Model):
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="likes", null=True, blank=True)
-    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name="likes", null=True, blank=True)
+    # Every like leaves one of these NULL; like_post_idx and like_comment_idx
+    # index only the rows where they are set.
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="likes", null=True, blank=True,
+                             db_index=False)
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name="likes", null=True, blank=True,
+                                db_index=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="likes")
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -68,9 +195,22 @@ class Like(models.Model):
                         models.Q(post__isnull=True, comment__isnull=False)
                 ),
                 name="like_must_have_either_post_or_comment"
-            )
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                condition=models.Q(post__isnull=False),
+                name="unique_post_like"
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'comment'],
+                condition=models.Q(comment__isnull=False),
+                name="unique_comment_like"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['post'], condition=models.Q(post__isnull=False), name='like_post_idx'),
+            models.Index(fields=['comment'], condition=models.Q(comment__isnull=False), name='like_comment_idx'),
         ]
-        unique_together = ('user', 'post')
 
     def __str__(self):
         return f"{self.user.username} liked a {self.post.id if self.post else self.comment.id}"
@@ -86,12 +226,74 @@ class HashTag(models.Model):
 
 class PostHashTag(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
-    hashtag = models.ForeignKey(HashTag, on_delete=models.CASCADE)
+    # Indexed by post_hashtag_idx
+    hashtag = models.ForeignKey(HashTag, on_delete=models.CASCADE, db_index=False)
     date_added = models.DateTimeField(auto_now_add=True)
     added_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
     class Meta:
         unique_together = ('post', 'hashtag')
+        indexes = [
+            models.Index(fields=['hashtag', 'post'], name='post_hashtag_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hashtag.name} for Post {self.post.id}"
+
+
+class HashTagBucket(models.Model):
+    """How many times a hashtag was used during one fixed-size time bucket."""
+    hashtag = models.ForeignKey(HashTag, on_delete=models.CASCADE, related_name='buckets')
+    bucket = models.DateTimeField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('hashtag', 'bucket')
+        indexes = [
+            models.Index(fields=['bucket', 'hashtag'], name='hashtag_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hashtag.name} x{self.count} at {self.bucket}"
+
+
+class TimelineEntry(models.Model):
+    """A post pushed into a follower's home timeline when it was written."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_created_idx'),
+            models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} for {self.user_id}"
+
+
+class TimelineJob(models.Model):
+    """
+    Timeline work left for the background workers: pushing a new post to the
+    author's followers, backfilling an author who drops back under the
+    fan-out limit, or backfilling a new follower with the author's recent
+    posts. The pending rows are the queue.
+    """
+    KINDS = [
+        ('post', 'Fan out post'),
+        ('author', 'Backfill author'),
+        ('follow', 'Backfill follower'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+', null=True, blank=True)
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.hashtag.name} for Post {self.post.id}"
\ No newline at end of file
+        return f"{self.kind} job for {self.post_id or self.author_id}"
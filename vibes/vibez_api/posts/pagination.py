@@ -0,0 +1,180 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import models
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a fixed, unique ordering.
+
+    The cursor is the encoded key of the last row on the page, so every page
+    is one indexed range read and rows inserted ahead of the cursor never
+    shift the pages that follow it.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    page_size_setting = 'POSTS_PAGE_SIZE'
+    max_page_size_setting = 'POSTS_MAX_PAGE_SIZE'
+    # Fields for ordering keys that are annotations rather than model fields
+    cursor_fields = {}
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, self.page_size_setting)
+        requested = request.query_params.get(self.page_size_query_param)
+        if requested:
+            try:
+                page_size = int(requested)
+            except ValueError:
+                pass
+        return max(1, min(page_size, getattr(settings, self.max_page_size_setting)))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page([obj async for obj in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        self.request = request
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.build_filter(position))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def build_filter(self, position):
+        # (a, b) < (x, y) expanded to a < x OR (a = x AND b < y), which every
+        # backend can serve from a composite index in either direction.
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def get_position(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    @staticmethod
+    def encode_position(position):
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in position]
+        return base64.urlsafe_b64encode(json.dumps(values).encode('ascii')).decode('ascii')
+
+    def encode_cursor(self, position):
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.encode_position(position)
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [self.to_python(field.lstrip('-'), value) for field, value in zip(self.ordering, values)]
+        except (TypeError, ValueError, UnicodeError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, name, value):
+        if value is None:
+            raise ValueError
+        field = self.cursor_fields.get(name)
+        if field is None:
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return value
+        return field.to_python(value)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+
+class PostCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class CommentCursorPagination(KeysetPagination):
+    """Top-level comments of a post, newest first."""
+    ordering = ('-created_at', '-id')
+    page_size_setting = 'COMMENTS_PAGE_SIZE'
+    max_page_size_setting = 'COMMENTS_MAX_PAGE_SIZE'
+
+
+class ReplyCursorPagination(CommentCursorPagination):
+    """Replies to one comment, in thread order."""
+    ordering = ('path',)
+
+
+class SearchCursorPagination(KeysetPagination):
+    ordering = ('-rank', '-id')
+    cursor_fields = {'rank': models.FloatField()}
+
+
+class TimelinePagination(KeysetPagination):
+    """
+    Pages a home timeline merged from two keyset reads: the user's
+    precomputed entries and posts pulled at read time from authors with too
+    many followers to fan out to.
+    """
+    ordering = ('-created_at', '-id')
+
+    def paginate_timeline(self, entries, pulled, request):
+        from .models import Post
+
+        self.request = request
+        self.model = Post
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        entries = entries.order_by('-created_at', '-post_id')
+        pulled = pulled.order_by(*self.ordering)
+        if position is not None:
+            created_at, post_id = position
+            entries = entries.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, post_id__lt=post_id))
+            pulled = pulled.filter(self.build_filter(position))
+
+        keys = set(entries.values_list('created_at', 'post_id')[:self.page_size + 1])
+        keys.update(pulled.values_list('created_at', 'id')[:self.page_size + 1])
+        merged = sorted(keys, reverse=True)
+
+        self.has_next = len(merged) > self.page_size
+        self.page = [Post(id=post_id, created_at=created_at) for created_at, post_id in merged[:self.page_size]]
+        return self.page
@@ -0,0 +1,30 @@
+"""
+Async loading helpers.
+
+``prefetch_related`` only runs inside a sync call. The async read paths
+instead load each relation with its own async query and attach the results
+the way prefetch_related would, so the sync serializers find them without
+touching the database.
+"""
+from collections import defaultdict
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def agroup(queryset, key):
+    grouped = defaultdict(list)
+    async for obj in queryset:
+        grouped[getattr(obj, key)].append(obj)
+    return grouped
+
+
+def attach_prefetched(instances, name, grouped):
+    """Store ``grouped[instance.pk]`` as the prefetched result of ``instance.<name>.all()``."""
+    for instance in instances:
+        queryset = getattr(instance, name).all()
+        queryset._result_cache = grouped.get(instance.pk, [])
+        queryset._prefetch_done = True
+        instance._prefetched_objects_cache = getattr(instance, '_prefetched_objects_cache', {})
+        instance._prefetched_objects_cache[name] = queryset
@@ -0,0 +1,97 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+from .models import Post
+
+
+class PostgresSearch:
+    """
+    Full-text search over the Post.search_vector column and its GIN index.
+    A trigger (migration 0019) keeps the column in step with the content.
+    """
+
+    def index(self, post):
+        pass
+
+    def index_many(self, post_ids):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def search(self, text):
+        query = SearchQuery(text, search_type='websearch', config=settings.SEARCH_CONFIG)
+        # ts_rank is a float4; widen it so the value in a cursor compares equal to the row it came from
+        rank = Cast(SearchRank(F('search_vector'), query), FloatField())
+        return Post.objects.filter(search_vector=query).annotate(rank=rank)
+
+
+class SqliteSearch:
+    """
+    Fallback for development on SQLite, backed by the posts_post_fts FTS5
+    table. Ranks by bm25, negated so that higher is better as on Postgres.
+    """
+    table = 'posts_post_fts'
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post.pk])
+            cursor.execute(f"INSERT INTO {self.table} (rowid, content) VALUES (%s, %s)", [post.pk, post.content or ''])
+
+    def index_many(self, post_ids):
+        rows = Post.objects.filter(pk__in=post_ids).values_list('id', 'content')
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [[post_id] for post_id in post_ids])
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, content) VALUES (%s, %s)",
+                [[post_id, content or ''] for post_id, content in rows],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post_id])
+
+    def search(self, text):
+        terms = re.findall(r"\w+", text.lower())
+        if not terms:
+            return Post.objects.none()
+
+        expression = ' '.join(f'"{term}"' for term in terms)
+        matches = RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [expression])
+        # Correlated, but only evaluated for the rows the MATCH above let through
+        rank = RawSQL(
+            f"SELECT -bm25({self.table}) FROM {self.table} WHERE {self.table} MATCH %s AND rowid = posts_post.id",
+            [expression],
+            output_field=FloatField(),
+        )
+        return Post.objects.filter(id__in=matches).annotate(rank=rank)
+
+
+class ContainsSearch:
+    """Unranked substring match for backends without a full-text engine."""
+
+    def index(self, post):
+        pass
+
+    def index_many(self, post_ids):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def search(self, text):
+        return Post.objects.filter(content__icontains=text).annotate(rank=RawSQL("0", [], output_field=FloatField()))
+
+
+def get_engine():
+    if connection.vendor == 'postgresql':
+        return PostgresSearch()
+    elif connection.vendor == 'sqlite':
+        return SqliteSearch()
+    return ContainsSearch()
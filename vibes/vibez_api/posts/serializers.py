@@ -1,14 +1,29 @@
-import os
-
 from rest_framework import serializers
 from .models import Post, Like, Comment, PostMedia, CommentMedia, HashTag
-from ..uploads import upload_file
+from .comment_tree import CommentTree
+from .media_pipeline import enqueue
+
+
+def get_comment_tree(context, post_id):
+    tree = context.get('comment_tree')
+    if tree is None or post_id not in tree.loaded_posts:
+        tree = CommentTree.for_posts([post_id])
+        context['comment_tree'] = tree
+    return tree
+
+
+def get_reply_tree(context, comment):
+    tree = context.get('comment_tree')
+    if tree is None or not tree.covers(comment):
+        tree = CommentTree.for_comments([comment])
+        context['comment_tree'] = tree
+    return tree
 
 
 class PostMediaSerializer(serializers.ModelSerializer):
     class Meta:
         model = PostMedia
-        fields = ['media_url', 'media_type', 'created_at']
+        fields = ['media_url', 'media_type', 'status', 'created_at']
 
 
 
@@ -23,12 +38,12 @@ class LikeSerializer(serializers.ModelSerializer):
 class CommentMediaSerializer(serializers.ModelSerializer):
     class Meta:
         model = CommentMedia
-        fields = ['media_url', 'media_type', 'created_at']
+        fields = ['media_url', 'media_type', 'status', 'created_at']
 
 
 class CommentSerializer(serializers.ModelSerializer):
     replies = serializers.SerializerMethodField()
-    likes_count = serializers.IntegerField(source='likes.count', read_only=True)
+    more_replies = serializers.SerializerMethodField()
     media = CommentMediaSerializer(many=True, read_only=True)
     media_files = serializers.ListField(
         child=serializers.FileField(),
@@ -38,15 +53,24 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
-        fields = ['id', 'content', 'media_files', 'user', 'created_at','replies', 'post', 'parent', 'likes_count', 'media' ]
-        read_only_fields = ['user', 'created_at']
+        fields = ['id', 'content', 'media_files', 'user', 'created_at','replies', 'more_replies', 'post', 'parent', 'depth', 'likes_count', 'replies_count', 'media' ]
+        read_only_fields = ['user', 'created_at', 'likes_count', 'replies_count']
 
 
 
     def get_replies(self, obj):
+        tree = get_reply_tree(self.context, obj)
+        return CommentSerializer(tree.replies_for(obj.pk), many=True, context=self.context).data
+
+    def get_more_replies(self, obj):
+        return get_reply_tree(self.context, obj).more_replies(obj)
 
-        replies = Comment.objects.filter(parent=obj).order_by('-created_at')
-        return  CommentSerializer(replies, many=True).data
+    def validate(self, attrs):
+        # A reply's path continues its parent's, so both must be on the same post
+        parent, post = attrs.get('parent'), attrs.get('post')
+        if parent is not None and post is not None and parent.post_id != post.pk:
+            raise serializers.ValidationError({'parent': "Replies must be on the same post as their parent."})
+        return attrs
 
 
 
@@ -59,30 +83,9 @@ class CommentSerializer(serializers.ModelSerializer):
         comment = Comment.objects.create(**validated_data)
 
         for media_file in media_data:
-            try:
-                uploaded_media = upload_file(media_file)
-                media_type = self.get_media_type(uploaded_media)
-
-                CommentMedia.objects.create(
-                    comment=comment,
-                    media_url=uploaded_media,
-                    media_type=media_type
-                )
-            except Exception as e:
-                print(f"Error uploading media file: {media_file}. Error: {str(e)}")
+            enqueue(CommentMedia, media_file, comment=comment)
         return comment
 
-    def get_media_type(self, media_url):
-        extension = os.path.splitext(media_url)[1].lower()
-
-
-        if extension in ['.jpg', '.jpeg', '.png', '.gif']:
-            return 'image'
-        elif extension in ['.mp4', '.mov', '.avi']:
-            return 'video'
-        else:
-            return 'unknown'
-
 
 class HashTagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -90,10 +93,19 @@ class HashTagSerializer(serializers.ModelSerializer):
         fields = ['name']  # Add any additional fields as necessary
 
 
+class PostListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        if 'comment_tree' not in self.context:
+            self.context['comment_tree'] = CommentTree.for_posts(post.pk for post in posts)
+        return super().to_representation(posts)
+
+
 class PostSerializer(serializers.ModelSerializer):
     media = PostMediaSerializer(many=True, read_only=True)
-    likes_count = serializers.IntegerField(source='likes.count', read_only=True)
     comments = serializers.SerializerMethodField()
+    more_comments = serializers.SerializerMethodField()
     hashtags = HashTagSerializer(many=True, read_only=True)
     media_files = serializers.ListField(
         child=serializers.FileField(),
@@ -104,14 +116,18 @@ class PostSerializer(serializers.ModelSerializer):
 
 
     def get_comments(self, obj):
-        comments = Comment.objects.filter(post=obj, parent=None).order_by('-created_at')
-        return CommentSerializer(comments, many=True).data
+        tree = get_comment_tree(self.context, obj.pk)
+        return CommentSerializer(tree.comments_for(obj.pk), many=True, context=self.context).data
+
+    def get_more_comments(self, obj):
+        return get_comment_tree(self.context, obj.pk).more_comments(obj.pk)
 
 
     class Meta:
         model = Post
-        fields = ['id', 'content', 'user', 'created_at','hashtags', 'comments', 'likes_count', 'media', 'media_files']
-        read_only_fields = ['user', 'created_at']
+        list_serializer_class = PostListSerializer
+        fields = ['id', 'content', 'user', 'created_at','hashtags', 'comments', 'more_comments', 'likes_count', 'comments_count', 'media', 'media_files']
+        read_only_fields = ['user', 'created_at', 'likes_count', 'comments_count']
         ordering = ['-created_at']
 
 
@@ -122,28 +138,6 @@ class PostSerializer(serializers.ModelSerializer):
         post = Post.objects.create(**validated_data)
 
         for media_file in media_data:
-
-            uploaded_media = upload_file(media_file)
-
-            media_type = self.get_media_type(uploaded_media)
-
-            PostMedia.objects.create(
-                post=post,
-                media_url=uploaded_media,
-                media_type=media_type
-            )
+            enqueue(PostMedia, media_file, post=post)
 
         return post
-
-
-
-    def get_media_type(self, media_url):
-        extension = os.path.splitext(media_url)[1].lower()
-
-        if extension in ['.jpg', '.jpeg', '.png', '.gif']:
-            return 'image'
-        elif extension in ['.mp4', '.mov', '.avi']:
-            return 'video'
-        else:
-            return 'unknown'
-
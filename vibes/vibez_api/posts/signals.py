@@ -0,0 +1,89 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_post
+from .counters import touch_posts
+from .media_pipeline import discard_spool
+from .models import Post, PostMedia, Comment, CommentMedia, PostHashTag, HashTag
+from . import suggest
+from .search import get_engine
+
+
+def invalidate_on_commit(post_id):
+    # Counters are bumped after the row write in the same transaction, so
+    # wait for the commit before letting readers re-render.
+    if post_id is not None:
+        transaction.on_commit(partial(invalidate_post, post_id))
+
+
+@receiver([post_save, post_delete], sender=Post)
+def post_changed(sender, instance, **kwargs):
+    invalidate_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, **kwargs):
+    get_engine().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    get_engine().remove(instance.pk)
+
+
+# Only saves are heard below. A receiver for a child's deletes would run for
+# every row a post or comment delete cascades to and stop Django deleting
+# those rows in bulk, so deletes invalidate at their one call site instead:
+# the post's own post_delete above, CommentDetailsView, and likes.py.
+@receiver(post_save, sender=PostMedia)
+@receiver(post_save, sender=PostHashTag)
+@receiver(post_save, sender=Comment)
+def post_child_changed(sender, instance, **kwargs):
+    invalidate_on_commit(instance.post_id)
+
+
+# Saving a post moves its updated_at, and adding or deleting a comment moves
+# its post's through adjust_post_counters; these are the other changes a post
+# renders. Hashtags only change while the post itself is saved.
+@receiver(post_save, sender=PostMedia)
+def post_media_touched(sender, instance, **kwargs):
+    touch_posts([instance.post_id])
+
+
+@receiver(post_save, sender=Comment)
+def comment_edited(sender, instance, created, **kwargs):
+    if not created:
+        touch_posts([instance.post_id])
+
+
+@receiver(post_save, sender=CommentMedia)
+def comment_media_changed(sender, instance, **kwargs):
+    post_id = Comment.objects.filter(pk=instance.comment_id).values_list('post_id', flat=True).first()
+    if post_id is not None:
+        touch_posts([post_id])
+    invalidate_on_commit(post_id)
+
+
+@receiver(post_delete, sender=PostMedia)
+@receiver(post_delete, sender=CommentMedia)
+def media_deleted(sender, instance, **kwargs):
+    # Rows removed before a worker got to them leave their spooled file behind
+    transaction.on_commit(partial(discard_spool, instance))
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # The post's hashtag links are about to cascade away, with it or with its author
+    if suggest.loaded():
+        names = list(instance.hashtags.values_list('name', flat=True))
+        transaction.on_commit(partial(suggest.record_usage, names, -1))
+
+
+@receiver(post_save, sender=HashTag)
+def hashtag_created(sender, instance, created, **kwargs):
+    # Tags normally arrive in bulk through set_post_hashtags; this covers the admin and shell
+    if created:
+        transaction.on_commit(partial(suggest.record_usage, [instance.name], 0))
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Count
+
+from .models import HashTag
+
+logger = logging.getLogger(__name__)
+
+
+class TrieNode:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+class HashtagIndex:
+    """
+    Prefix index over hashtag names weighted by how often they are used.
+
+    Every trie node keeps its own best ``depth`` names, so a lookup is a walk
+    down the prefix followed by a slice. Writers take a lock and swap in new
+    lists; readers never lock.
+
+    A node only knows the names that made its list. When a weight drops, a
+    name pushed out earlier can't take the freed place until the next
+    rebuild, so nodes keep more names than a lookup usually asks for.
+    """
+
+    def __init__(self, depth):
+        self.depth = depth
+        self.root = TrieNode()
+        self.weights = {}
+        self.lock = threading.Lock()
+
+    def rank(self, name):
+        return (-self.weights[name], name)
+
+    def add(self, name, delta=1):
+        with self.lock:
+            self.weights[name] = self.weights.get(name, 0) + delta
+
+            node = self.root
+            for char in name:
+                node = node.children.setdefault(char, TrieNode())
+                top = node.top
+                if len(top) < self.depth and name not in top and (not top or self.rank(top[-1]) < self.rank(name)):
+                    node.top = top + [name]
+                elif name in top or len(top) < self.depth or self.rank(name) < self.rank(top[-1]):
+                    candidates = set(top)
+                    candidates.add(name)
+                    node.top = sorted(candidates, key=self.rank)[:self.depth]
+
+    def suggest(self, prefix, limit):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [(name, self.weights.get(name, 0)) for name in node.top[:limit]]
+
+    @classmethod
+    def load(cls):
+        index = cls(settings.HASHTAG_SUGGEST_DEPTH)
+        # Heaviest first, so most nodes fill up early and later names only append
+        tags = HashTag.objects.annotate(uses=Count('posthashtag')).order_by('-uses', 'name').values_list('name', 'uses')
+        for name, uses in tags.iterator():
+            index.add(name, uses)
+        return index
+
+
+_index = None
+_loaded_at = 0
+_reloading = threading.Lock()
+
+
+def get_index():
+    """
+    The process-wide index, built by build_index() as the process starts or
+    else on first use.
+
+    Tags created by other workers show up when the index is rebuilt every
+    HASHTAG_SUGGEST_RELOAD_SECONDS; the rebuild runs in the background while
+    the previous index keeps serving.
+    """
+    if _index is None:
+        with _reloading:
+            if _index is None:
+                load_index()
+    elif time.monotonic() - _loaded_at > settings.HASHTAG_SUGGEST_RELOAD_SECONDS and _reloading.acquire(blocking=False):
+        threading.Thread(target=reload_index, name='hashtag-suggest-reload', daemon=True).start()
+    return _index
+
+
+def build_index():
+    """
+    Build the index before the first request needs it; vibes/wsgi.py and
+    vibes/asgi.py call this as each worker process starts. ASGI servers load
+    the application inside their event loop, where the ORM can't run, so
+    there it is built on a thread that early suggestions wait for.
+    """
+    _reloading.acquire()
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        # Also closes the connection, so none opened here is shared with forked workers
+        reload_index()
+    else:
+        threading.Thread(target=reload_index, name='hashtag-suggest-load', daemon=True).start()
+
+
+def load_index():
+    global _index, _loaded_at
+    _index, _loaded_at = HashtagIndex.load(), time.monotonic()
+
+
+def reload_index():
+    try:
+        load_index()
+    except DatabaseError:
+        logger.exception("Building the hashtag index failed; keeping the previous one, if any")
+    finally:
+        connection.close()
+        _reloading.release()
+
+
+def loaded():
+    return _index is not None
+
+
+def record_usage(names, delta=1):
+    if _index is not None:
+        for name in names:
+            _index.add(name, delta)
+
+
+def suggest(prefix, limit):
+    prefix = prefix.lstrip('#').lower()
+    if not prefix:
+        return []
+    return get_index().suggest(prefix, limit)
@@ -0,0 +1,173 @@
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Post, TimelineEntry, TimelineJob
+from ..users.models import Follow, UserStats
+from ..workers import InProcessWorkers, PollingWorker
+
+logger = logging.getLogger(__name__)
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def is_pull_author(author_id):
+    """Authors above the fan-out limit are merged into timelines at read time instead of pushed."""
+    return UserStats.objects.filter(user_id=author_id, followers_count__gt=settings.TIMELINE_FANOUT_LIMIT).exists()
+
+
+def publish(post):
+    """
+    Put a new post in its author's own timeline and queue the push to their
+    followers. Call inside the transaction that creates the post; the
+    workers are woken once it commits.
+    """
+    TimelineEntry.objects.create(user_id=post.user_id, post_id=post.pk, author_id=post.user_id,
+                                 created_at=post.created_at)
+    TimelineJob.objects.create(kind='post', author_id=post.user_id, post=post)
+    transaction.on_commit(wake_workers)
+
+
+def fan_out(post_id, author_id):
+    """Push a post to its author's followers, unless they have too many."""
+    if is_pull_author(author_id):
+        return
+    post = Post.objects.filter(pk=post_id).values('created_at').first()
+    if post is None:
+        return
+    followers = Follow.objects.filter(following_id=author_id).values_list('follower_id', flat=True)
+    _push(followers, [(post_id, post['created_at'])], author_id)
+
+
+def backfill_followers(author_id):
+    """Give every follower the recent posts of an author who is pushed again after being pulled."""
+    if is_pull_author(author_id):
+        return
+    recent = list(Post.objects.filter(user_id=author_id).values_list('id', 'created_at')[:settings.TIMELINE_BACKFILL])
+    followers = Follow.objects.filter(following_id=author_id).values_list('follower_id', flat=True)
+    _push(followers, recent, author_id)
+
+
+def _push(recipients, posts, author_id):
+    batch = []
+    for user_id in recipients.iterator():
+        for post_id, created_at in posts:
+            batch.append(TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id, created_at=created_at))
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """Give a new follower the author's recent posts, unless they have unfollowed since."""
+    # Locking the follow makes an unfollow wait, so its forget_author runs after this
+    following = Follow.objects.select_for_update().filter(follower_id=user_id, following_id=author_id)
+    if following.first() is None or is_pull_author(author_id):
+        return
+    recent = Post.objects.filter(user_id=author_id).values_list('id', 'created_at')[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id, created_at=created_at) for post_id, created_at in recent],
+        ignore_conflicts=True,
+    )
+
+
+def forget_author(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def author_gained_follower(user_id, author_id):
+    """Queue the new follower's backfill. Call inside the follow's transaction."""
+    TimelineJob.objects.create(kind='follow', author_id=author_id, follower_id=user_id)
+    transaction.on_commit(wake_workers)
+
+
+def author_lost_follower(author_id):
+    """
+    Queue a backfill when an unfollow brings an author back to the fan-out
+    limit: their posts stop being pulled at read time, so the followers'
+    timelines need them pushed. Call inside the unfollow's transaction.
+    """
+    if UserStats.objects.filter(user_id=author_id, followers_count=settings.TIMELINE_FANOUT_LIMIT).exists():
+        TimelineJob.objects.create(kind='author', author_id=author_id)
+        transaction.on_commit(wake_workers)
+
+
+def run_job(job):
+    if job.kind == 'post':
+        fan_out(job.post_id, job.author_id)
+    elif job.kind == 'follow':
+        backfill(job.follower_id, job.author_id)
+    else:
+        backfill_followers(job.author_id)
+
+
+def process_jobs(limit=None):
+    """
+    Run up to ``limit`` queued timeline jobs, oldest first. Each one is
+    claimed, run and deleted in one transaction, so concurrent workers skip
+    it and a crash leaves it queued. A failure ends the round, so the job
+    is retried after the poll interval, and it is dropped after
+    TIMELINE_JOB_MAX_ATTEMPTS tries.
+    """
+    limit = limit or settings.TIMELINE_WORKER_BATCH_SIZE
+    handled = 0
+    while handled < limit:
+        job = None
+        try:
+            with transaction.atomic():
+                jobs = TimelineJob.objects.order_by('id')
+                if connection.features.has_select_for_update_skip_locked:
+                    jobs = jobs.select_for_update(skip_locked=True)
+                job = jobs.first()
+                if job is None:
+                    break
+                run_job(job)
+                job.delete()
+        except Exception:
+            if job is None:
+                raise
+            logger.exception("Timeline job %s failed", job.pk)
+            if job.attempts + 1 >= settings.TIMELINE_JOB_MAX_ATTEMPTS:
+                logger.error("Dropping timeline job %s after %s attempts", job.pk, job.attempts + 1)
+                TimelineJob.objects.filter(pk=job.pk).delete()
+            else:
+                TimelineJob.objects.filter(pk=job.pk).update(attempts=F('attempts') + 1)
+            break
+        handled += 1
+    return handled
+
+
+class TimelineWorker(PollingWorker):
+    """Runs queued timeline jobs until stopped."""
+    thread_name = 'timeline-worker'
+
+    def __init__(self, poll_interval=None):
+        super().__init__(poll_interval or settings.TIMELINE_WORKER_POLL_INTERVAL)
+
+    def process(self):
+        return process_jobs()
+
+
+_workers = InProcessWorkers(TimelineWorker, 'TIMELINE_WORKER_IN_PROCESS', 'TIMELINE_WORKER_THREADS')
+
+
+def wake_workers():
+    """Nudge the in-process workers, starting them on first use if enabled."""
+    _workers.wake()
+
+
+def timeline_sources(user):
+    """
+    The precomputed entries for ``user`` plus the posts of followed authors
+    that are read on demand because they are too widely followed to push.
+    """
+    entries = TimelineEntry.objects.filter(user=user)
+    pull_authors = Follow.objects.filter(
+        follower=user, following__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).values_list('following_id', flat=True)
+    pulled = Post.objects.filter(user_id__in=list(pull_authors))
+    return entries, pulled
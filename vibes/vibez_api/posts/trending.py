@@ -0,0 +1,135 @@
+import heapq
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .models import HashTag, HashTagBucket
+from ..workers import InProcessWorkers, PollingWorker
+
+WINDOWS = {
+    '1h': timedelta(hours=1),
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+}
+
+
+def trending_cache():
+    return caches[settings.TRENDING_CACHE_ALIAS]
+
+
+def bucket_for(moment):
+    size = settings.TRENDING_BUCKET_SECONDS
+    return datetime.fromtimestamp(int(moment.timestamp()) // size * size, tz=dt_timezone.utc)
+
+
+def record_usage(hashtag_ids, moment=None):
+    """Count one use of each hashtag in the current bucket: two statements whatever the tag count."""
+    if not hashtag_ids:
+        return
+    bucket = bucket_for(moment or timezone.now())
+    HashTagBucket.objects.bulk_create(
+        [HashTagBucket(hashtag_id=hashtag_id, bucket=bucket) for hashtag_id in hashtag_ids],
+        ignore_conflicts=True,
+    )
+    HashTagBucket.objects.filter(hashtag_id__in=hashtag_ids, bucket=bucket).update(count=F('count') + 1)
+
+
+def velocity_score(current, previous):
+    # Volume weighted by growth over the preceding window of the same length,
+    # smoothed so brand new tags don't get an infinite boost.
+    return current * (current + 1) / (previous + 1)
+
+
+def compute_trending(window, now=None):
+    """Score every tag used in ``window`` against the window before it and keep the top K."""
+    now = now or timezone.now()
+    span = WINDOWS[window]
+    start, previous_start = now - span, now - 2 * span
+
+    totals = (
+        HashTagBucket.objects.filter(bucket__gte=bucket_for(previous_start))
+        .values('hashtag_id')
+        .annotate(
+            current=Sum('count', filter=Q(bucket__gte=bucket_for(start))),
+            previous=Sum('count', filter=Q(bucket__lt=bucket_for(start))),
+        )
+    )
+    scored = (
+        (velocity_score(row['current'] or 0, row['previous'] or 0), row['current'] or 0, row['previous'] or 0, row['hashtag_id'])
+        for row in totals
+        if row['current']
+    )
+    top = heapq.nlargest(settings.TRENDING_TOP_K, scored)
+    names = dict(HashTag.objects.filter(pk__in=[hashtag_id for *_, hashtag_id in top]).values_list('id', 'name'))
+
+    return {
+        'window': window,
+        'computed_at': now.isoformat(),
+        'results': [
+            {'name': names[hashtag_id], 'count': current, 'previous_count': previous, 'score': round(score, 3)}
+            for score, current, previous, hashtag_id in top
+            if hashtag_id in names
+        ],
+    }
+
+
+def store_snapshot(window, snapshot):
+    cache = trending_cache()
+    cache.set(f'trending:{window}', snapshot, None)
+    cache.set(f'trending:{window}:fresh', True, settings.TRENDING_REFRESH_SECONDS)
+
+
+def refresh_trending(now=None):
+    for window in WINDOWS:
+        store_snapshot(window, compute_trending(window, now))
+
+
+def get_trending(window):
+    """
+    The last top-K snapshot for ``window``.
+
+    Requests never wait on the aggregation once a snapshot exists: a stale
+    one is served as it is and the in-process refresher, if there is one, is
+    woken. Only a window that has no snapshot at all is computed inline.
+    """
+    key = f'trending:{window}'
+    cached = trending_cache().get_many([key, f'{key}:fresh'])
+    snapshot = cached.get(key)
+
+    if snapshot is None:
+        snapshot = compute_trending(window)
+        store_snapshot(window, snapshot)
+    elif f'{key}:fresh' not in cached:
+        wake_workers()
+    return snapshot
+
+
+def prune_buckets(now=None):
+    """Drop buckets older than twice the longest window; nothing reads them any more."""
+    horizon = (now or timezone.now()) - 2 * max(WINDOWS.values())
+    deleted, _ = HashTagBucket.objects.filter(bucket__lt=bucket_for(horizon)).delete()
+    return deleted
+
+
+class TrendingWorker(PollingWorker):
+    """Refreshes every window's snapshot each TRENDING_REFRESH_SECONDS until stopped."""
+    thread_name = 'trending-worker'
+
+    def __init__(self, poll_interval=None):
+        super().__init__(poll_interval or settings.TRENDING_REFRESH_SECONDS)
+
+    def process(self):
+        refresh_trending()
+        # Nothing queues up behind a refresh, so always wait for the next one
+        return 0
+
+
+_workers = InProcessWorkers(TrendingWorker, 'TRENDING_WORKER_IN_PROCESS')
+
+
+def wake_workers():
+    """Nudge the in-process refresher, starting it on first use if enabled."""
+    _workers.wake()
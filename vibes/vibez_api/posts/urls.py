@@ -1,13 +1,31 @@
 
+from django.conf import settings
 from django.urls import path
 from .views import (PostListView, PostDetailsView, LikePostView,
-                    LikeCommentView, CommentDetailsView, CommentPostView, PostHashtagsView)
+                    LikeCommentView, CommentDetailsView, CommentPostView, PostHashtagsView,
+                    TrendingHashtagsView, HashtagSuggestView, PostSearchView, TimelineView,
+                    PostCommentsView, CommentRepliesView)
+
+if settings.ASYNC_READ_VIEWS:
+    # Same endpoints, with GET served natively async and writes still going
+    # through the DRF views above.
+    from .async_views import (AsyncPostListView as PostListView, AsyncPostDetailsView as PostDetailsView,
+                              AsyncPostHashtagsView as PostHashtagsView,
+                              AsyncCommentDetailsView as CommentDetailsView)
 
 urlpatterns = [
     path('posts/', PostListView.as_view(), name='post-list'),
 
+    path('timeline/', TimelineView.as_view(), name='timeline'),
+
+    path('posts/search/', PostSearchView.as_view(), name='post-search'),
+
     path('posts/hashtag/<hashtag>/', PostHashtagsView.as_view(), name='post-hashtag-list'),
 
+    path('hashtags/trending/', TrendingHashtagsView.as_view(), name='hashtag-trending'),
+
+    path('hashtags/suggest/', HashtagSuggestView.as_view(), name='hashtag-suggest'),
+
     path('posts/<int:pk>/', PostDetailsView.as_view(), name='post-detail'),
 
     path('posts/<int:post_id>/like/', LikePostView.as_view(), name='like-post'),
@@ -16,8 +34,12 @@ urlpatterns = [
 
     path('posts/<int:post_id>/comment/', CommentPostView.as_view(), name='post-comment'),
 
+    path('posts/<int:post_id>/comments/', PostCommentsView.as_view(), name='post-comment-list'),
+
     path('comments/<int:pk>/comment/', CommentDetailsView.as_view(), name='comment-detail'),
 
+    path('comments/<int:pk>/replies/', CommentRepliesView.as_view(), name='comment-replies'),
+
     path('posts/<int:post_id>/comment/<int:parent_id>/reply/', CommentPostView.as_view(), name='reply-comment'),
 
 
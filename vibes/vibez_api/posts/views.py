@@ -1,5 +1,9 @@
 from datetime import timedelta
+from functools import partial
 from django.utils import timezone
+from django.db import transaction
+from django.conf import settings
+from django.db.models import F
 
 from rest_framework import status
 from rest_framework.views import APIView
@@ -7,13 +11,21 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Post, Like, Comment, HashTag, PostHashTag
 from .serializers import PostSerializer, CommentSerializer
+from .pagination import (PostCursorPagination, SearchCursorPagination, TimelinePagination,
+                         CommentCursorPagination, ReplyCursorPagination)
+from .comment_tree import CommentTree
+from .counters import adjust_post_counters, adjust_comment_counters
+from .cache import render_posts, render_post, invalidate_post
 from rest_framework.generics import get_object_or_404
-from rest_framework.authentication import TokenAuthentication
-import re
-
-def extract_hashtags(content):
-    hashtag = re.findall(r"#(\w+)", content)
-    return hashtag
+from ..users.authentication import CachedTokenAuthentication
+from .hashtags import set_post_hashtags
+from .trending import WINDOWS, get_trending
+from .suggest import suggest
+from .search import get_engine
+from .timeline import publish, timeline_sources
+from .likes import (like, unlike, LikeTargetMissing, mark_liked_by_me, mark_comments_liked_by_me,
+                    liked_on_posts, apply_liked_by_me, apply_comment_liked_by_me)
+from .conditional import post_validators, comment_validators, page_etag, not_modified, add_validators
 
 
 
@@ -31,42 +43,112 @@ class PostListView(APIView):
 
         if serializer.is_valid():
 
-            post = serializer.save(user=request.user)
-            content = post_data.get('content', '')
-            hashtags = extract_hashtags(content)
-
-            for tag_name in hashtags:
-                hashtag, created = HashTag.objects.get_or_create(name=tag_name.lower())
-
-                PostHashTag.objects.create(post=post, hashtag=hashtag, added_by=user )
+            with transaction.atomic():
+                post = serializer.save(user=request.user)
+                set_post_hashtags(post, post_data.get('content', ''), user, created=True)
+                publish(post)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 
     def get(self, request):
-        posts = Post.objects.all()
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = PostCursorPagination()
+        posts = paginator.paginate_queryset(Post.objects.only('id', 'created_at'), request, view=self)
+        return paginator.get_paginated_response(mark_liked_by_me(render_posts(posts), request.user))
+
+
+class TimelineView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        entries, pulled = timeline_sources(request.user)
+        paginator = TimelinePagination()
+        posts = paginator.paginate_timeline(entries, pulled, request)
+        return paginator.get_paginated_response(mark_liked_by_me(render_posts(posts), request.user))
 
 
 class PostHashtagsView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def get(self, request, hashtag):
        try:
            hashtag_obj = HashTag.objects.get(name=hashtag)
 
-           posts = Post.objects.filter(hashtags=hashtag_obj)
-
-           serializer = PostSerializer(posts, many=True)
-           return Response(serializer.data, status=status.HTTP_200_OK)
+           paginator = PostCursorPagination()
+           posts = paginator.paginate_queryset(
+               Post.objects.filter(hashtags=hashtag_obj).only('id', 'created_at', 'updated_at'), request, view=self
+           )
+           liked = liked_on_posts(request.user, [post.pk for post in posts])
+           etag = page_etag(request, paginator.get_next_link(), posts, *liked)
+           response = not_modified(request, etag)
+           if response is None:
+               response = paginator.get_paginated_response(apply_liked_by_me(render_posts(posts), *liked))
+           return add_validators(response, etag, public=not request.user.is_authenticated)
 
        except HashTag.DoesNotExist:
            return Response({"errors": "Hashtag not found"}, status=status.HTTP_404_NOT_FOUND)
 
 
 
+class TrendingHashtagsView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+
+    def get(self, request):
+        window = request.query_params.get('window', '24h')
+        if window not in WINDOWS:
+            return Response({"errors": f"window must be one of {', '.join(WINDOWS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        trending = get_trending(window)
+        try:
+            limit = int(request.query_params.get('limit', len(trending['results'])))
+        except ValueError:
+            limit = len(trending['results'])
+        return Response(dict(trending, results=trending['results'][:max(limit, 0)]), status=status.HTTP_200_OK)
+
+
+
+class HashtagSuggestView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', settings.HASHTAG_SUGGEST_LIMIT))
+        except ValueError:
+            limit = settings.HASHTAG_SUGGEST_LIMIT
+        limit = max(1, min(limit, settings.HASHTAG_SUGGEST_DEPTH))
+
+        matches = suggest(request.query_params.get('q', ''), limit)
+        return Response({'results': [{'name': name, 'count': count} for name, count in matches]}, status=status.HTTP_200_OK)
+
+
+
+class PostSearchView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"errors": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        posts = get_engine().search(query)
+
+        hashtag = request.query_params.get('hashtag')
+        if hashtag:
+            posts = posts.filter(hashtags__name=hashtag.lstrip('#').lower())
+
+        author = request.query_params.get('author')
+        if author:
+            if not author.isdigit():
+                return Response({"errors": "author must be a user id"}, status=status.HTTP_400_BAD_REQUEST)
+            posts = posts.filter(user_id=author)
+
+        paginator = SearchCursorPagination()
+        page = paginator.paginate_queryset(posts.only('id', 'created_at'), request, view=self)
+        return paginator.get_paginated_response(mark_liked_by_me(render_posts(page), request.user))
+
+
+
 class PostDetailsView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -75,9 +157,14 @@ class PostDetailsView(APIView):
 
 
     def get(self, request, pk):
-        post = self.get_object(pk)
-        serializer = PostSerializer(post)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Only the stamp is read before deciding; the rest comes from the post cache
+        post = get_object_or_404(Post.objects.only('id', 'updated_at'), pk=pk)
+        liked = liked_on_posts(request.user, [post.pk])
+        etag, last_modified = post_validators(post, *liked)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = Response(apply_liked_by_me([render_post(post)], *liked)[0], status=status.HTTP_200_OK)
+        return add_validators(response, etag, last_modified)
 
 
 
@@ -93,16 +180,11 @@ class PostDetailsView(APIView):
 
         serializer = PostSerializer(post, data=request.data, partial=True)
         if serializer.is_valid():
-            content = request.data.get('content', '')
-            hashtags = extract_hashtags(content)
-
-            post.hashtags.clear()
-
-            for tag_name in hashtags:
-                hashtag, created = HashTag.objects.get_or_create(name=tag_name.lower())
-
-                PostHashTag.objects.create(post=post, hashtag=hashtag, added_by=request.user)
-            serializer.save()
+            with transaction.atomic():
+                # Partial updates that leave content alone keep their hashtags
+                if 'content' in request.data:
+                    set_post_hashtags(post, request.data.get('content', ''), request.user)
+                serializer.save()
 
             return  Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -123,51 +205,61 @@ class PostDetailsView(APIView):
 
 
 class LikePostView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
 
     def post(self, request, post_id):
-        user = request.user
-
-
+        # Toggle, kept for older clients; PUT and DELETE are idempotent
         try:
-            post = Post.objects.get(id=post_id)
-
-        except Post.DoesNotExist:
+            if unlike(request.user, post_id=post_id):
+                return Response({'message': "post unliked"}, status=status.HTTP_200_OK)
+            like(request.user, post_id=post_id)
+        except LikeTargetMissing:
             return Response({'error': "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'post liked'}, status=status.HTTP_201_CREATED)
 
-        like, created = Like.objects.get_or_create(user=user, post=post)
+    def put(self, request, post_id):
+        try:
+            created = like(request.user, post_id=post_id)
+        except LikeTargetMissing:
+            return Response({'error': "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'post liked'}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
-        if not  created:
-            like.delete()
-            return Response({'message': "post unliked"}, status=status.HTTP_200_OK)
-        return Response({'message': 'post liked'}, status=status.HTTP_201_CREATED)
+    def delete(self, request, post_id):
+        unlike(request.user, post_id=post_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 
 
 class LikeCommentView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
 
     def post(self, request, comment_id):
-        user = request.user
-
         try:
-            comment = Comment.objects.get(id=comment_id)
-
-        except Comment.DoesNotExist:
-            return Response({'error': "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+            if unlike(request.user, comment_id=comment_id):
+                return Response({'message': "comment unliked"}, status=status.HTTP_200_OK)
+            like(request.user, comment_id=comment_id)
+        except LikeTargetMissing:
+            return Response({'error': "Comment not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'comment liked'}, status=status.HTTP_201_CREATED)
 
-        like, created = Like.objects.get_or_create(user=user, comment=comment)
+    def put(self, request, comment_id):
+        try:
+            created = like(request.user, comment_id=comment_id)
+        except LikeTargetMissing:
+            return Response({'error': "Comment not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'comment liked'}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
-        if not  created:
-            like.delete()
-            return Response({'"message': "comment unliked"}, status=status.HTTP_200_OK)
-        return Response({'message': 'comment liked'}, status=status.HTTP_201_CREATED)
+    def delete(self, request, comment_id):
+        unlike(request.user, comment_id=comment_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 
 class CommentPostView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def post(self, request, post_id= None, parent_id=None):
         user = request.user
@@ -181,7 +273,11 @@ class CommentPostView(APIView):
         serializer = CommentSerializer(data=comment_data)
 
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            with transaction.atomic():
+                comment = serializer.save(user=request.user)
+                adjust_post_counters(comment.post_id, comments_count=1)
+                if comment.parent_id:
+                    adjust_comment_counters(comment.parent_id, replies_count=1)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -198,14 +294,58 @@ class CommentDetailsView(APIView):
 
 
     def get(self, request, pk):
-        comment = self.get_object(pk)
-        serializer = CommentSerializer(comment)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        comment = get_object_or_404(Comment.objects.annotate(post_updated_at=F('post__updated_at')), pk=pk)
+        _, liked_comments = liked_on_posts(request.user, [comment.post_id])
+        etag, last_modified = comment_validators(comment, comment.post_updated_at, liked_comments)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            tree = CommentTree.for_comments([comment])
+            serializer = CommentSerializer(comment, context={'comment_tree': tree})
+            response = Response(apply_comment_liked_by_me(serializer.data, liked_comments), status=status.HTTP_200_OK)
+        return add_validators(response, etag, last_modified)
 
 
     def delete(self, request, pk):
         comment = self.get_object(pk)
         if comment.user != request.user:
             return  Response({"error": "You do not have permission to delete this post."}, status=status.HTTP_403_FORBIDDEN)
-        comment.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        with transaction.atomic():
+            # Replies cascade with their parent, so take the removed total from the delete itself
+            _, deleted = comment.delete()
+            adjust_post_counters(comment.post_id, comments_count=-deleted.get(Comment._meta.label, 0))
+            if comment.parent_id:
+                adjust_comment_counters(comment.parent_id, replies_count=-1)
+            transaction.on_commit(partial(invalidate_post, comment.post_id))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+
+class PostCommentsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, post_id):
+        paginator = CommentCursorPagination()
+        comments = paginator.paginate_queryset(
+            Comment.objects.filter(post_id=post_id, parent__isnull=True), request, view=self
+        )
+        # Only an empty page can mean the post doesn't exist
+        if not comments and not Post.objects.filter(pk=post_id).exists():
+            return Response({"detail": "No Post matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+
+        tree = CommentTree.for_comments(comments)
+        data = CommentSerializer(comments, many=True, context={'comment_tree': tree}).data
+        return paginator.get_paginated_response(mark_comments_liked_by_me(data, request.user))
+
+
+
+class CommentRepliesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        comment = get_object_or_404(Comment.objects.only('id', 'path', 'depth'), pk=pk)
+        paginator = ReplyCursorPagination()
+        replies = paginator.paginate_queryset(Comment.objects.filter(comment.replies_filter()), request, view=self)
+
+        tree = CommentTree.for_comments(replies)
+        data = CommentSerializer(replies, many=True, context={'comment_tree': tree}).data
+        return paginator.get_paginated_response(mark_comments_liked_by_me(data, request.user))
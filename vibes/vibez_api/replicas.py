@@ -0,0 +1,223 @@
+"""
+Read replicas with read-your-writes stickiness.
+
+ReplicaMiddleware sends the reads of GET and HEAD requests to one replica,
+picked once per request by weight (DATABASE_REPLICA_WEIGHTS) among those
+whose replication lag, checked at most every REPLICA_LAG_CHECK_INTERVAL
+seconds, is within REPLICA_MAX_LAG, or to the primary when none is.
+ReplicaRouter reads that choice back; everything else, and any code outside
+a request, stays on the primary. A client whose request wrote something
+reads from the primary for the next READ_YOUR_WRITES_SECONDS, so a new post
+shows up in their next feed. Clients are told apart by their token or
+session id; signup and login pin the token they hand out, since the client
+has not used it yet. The pins live in the shared cache, which
+settings require to be a cross-process backend when replicas are set.
+
+Code that must not see replica lag, such as filling a shared cache, wraps
+its reads in ``primary()``.
+"""
+import hashlib
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# The replica this context reads from, or None for the primary
+_read_alias = ContextVar('read_alias', default=None)
+
+# Zero once the replica has replayed everything it received; NULL on a server
+# that is not in recovery.
+LAG_SQL = """
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+"""
+
+
+@contextmanager
+def reads_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def primary():
+    """Send the reads in this block to the primary."""
+    return reads_from(None)
+
+
+class LagMonitor:
+    """Per-process view of each replica's lag, refreshed on demand by whichever thread finds it stale."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked = {}
+
+    def lag(self, alias):
+        now = time.monotonic()
+        checked_at, lag = self.checked.get(alias, (None, None))
+        if checked_at is not None and now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return lag
+        if not self.lock.acquire(blocking=False):
+            # Another thread is checking; go by the last reading meanwhile
+            return lag if checked_at is not None else None
+        try:
+            lag = self.measure(alias)
+            self.checked[alias] = (time.monotonic(), lag)
+        finally:
+            self.lock.release()
+        return lag
+
+    def measure(self, alias):
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                (lag,) = cursor.fetchone()
+        except DatabaseError:
+            logger.warning("Replica %s is unreachable; reading from the primary", alias, exc_info=True)
+            connection.close()
+            return None
+        return float(lag or 0)
+
+    def reset(self):
+        with self.lock:
+            self.checked.clear()
+
+
+lag_monitor = LagMonitor()
+
+
+def choose_replica():
+    """A replica alias picked by weight among those fresh enough, or None."""
+    candidates, weights = [], []
+    for alias, weight in settings.DATABASE_REPLICA_WEIGHTS.items():
+        lag = lag_monitor.lag(alias)
+        if weight > 0 and lag is not None and lag <= settings.REPLICA_MAX_LAG:
+            candidates.append(alias)
+            weights.append(weight)
+    if not candidates:
+        return None
+    return random.choices(candidates, weights)[0]
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every database holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def pin_cache():
+    return caches[settings.READ_YOUR_WRITES_CACHE_ALIAS]
+
+
+def client_credential(request):
+    """The token from the Authorization header or, failing that, the session id of whoever is asking."""
+    auth = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(auth) == 2:
+        return auth[1]
+    return request.COOKIES.get(settings.SESSION_COOKIE_NAME) or None
+
+
+def pin_key(credential):
+    # Hashed, since the credential would otherwise sit in the cache in the clear
+    return 'primary-pin:' + hashlib.sha256(credential.encode()).hexdigest()[:32]
+
+
+def issued_credentials(request, response):
+    """Credentials a successful write was made with or handed out: the caller's own and any new session cookie."""
+    credentials = [client_credential(request)]
+    cookie = response.cookies.get(settings.SESSION_COOKIE_NAME)
+    if cookie is not None and cookie.value:
+        credentials.append(cookie.value)
+    return [pin_key(credential) for credential in credentials if credential]
+
+
+def pin_to_primary(credential):
+    """
+    Keep the reads of a credential handed out by a write, such as the token
+    returned by signup or login, on the primary for READ_YOUR_WRITES_SECONDS.
+    The middleware cannot see those in the response.
+    """
+    if settings.DATABASE_REPLICA_WEIGHTS:
+        pin_cache().set(pin_key(credential), True, settings.READ_YOUR_WRITES_SECONDS)
+
+
+async def apin_to_primary(credential):
+    if settings.DATABASE_REPLICA_WEIGHTS:
+        await pin_cache().aset(pin_key(credential), True, settings.READ_YOUR_WRITES_SECONDS)
+
+
+class ReplicaMiddleware:
+    """
+    Turns replica reads on for safe requests from clients that have not
+    written recently, and pins clients to the primary after they write.
+    Runs natively under both WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICA_WEIGHTS:
+            return self.get_response(request)
+
+        if request.method not in ('GET', 'HEAD'):
+            response = self.get_response(request)
+            if response.status_code < 400:
+                pin_cache().set_many(dict.fromkeys(issued_credentials(request, response), True),
+                                     settings.READ_YOUR_WRITES_SECONDS)
+            return response
+
+        credential = client_credential(request)
+        pinned = credential is not None and pin_cache().get(pin_key(credential)) is not None
+        with reads_from(None if pinned else choose_replica()):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICA_WEIGHTS:
+            return await self.get_response(request)
+
+        if request.method not in ('GET', 'HEAD'):
+            response = await self.get_response(request)
+            if response.status_code < 400:
+                await pin_cache().aset_many(dict.fromkeys(issued_credentials(request, response), True),
+                                            settings.READ_YOUR_WRITES_SECONDS)
+            return response
+
+        credential = client_credential(request)
+        pinned = credential is not None and await pin_cache().aget(pin_key(credential)) is not None
+        # A stale lag reading is refreshed with a query, so off the loop
+        with reads_from(None if pinned else await sync_to_async(choose_replica)()):
+            return await self.get_response(request)
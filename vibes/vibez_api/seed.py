@@ -0,0 +1,262 @@
+"""
+Synthetic social graph for local measurement (``manage.py seed_data``).
+
+Popularity follows a Zipf law throughout: a few authors get most of the
+followers, a few posts most of the likes and comments, a few hashtags most
+of the uses. Everything is written with bulk inserts and the denormalized
+counters are recomputed once at the end.
+"""
+import random
+from bisect import bisect
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .posts.counters import recount_counters
+from .posts.models import (Post, PostMedia, Comment, CommentMedia, Like, HashTag, PostHashTag,
+                           HashTagBucket, TimelineEntry, path_segment)
+from .posts.search import get_engine
+from .posts.trending import bucket_for
+from .users.models import Follow, UserStats
+
+USER_PREFIX = 'seed_user_'
+PASSWORD = 'seed-password'
+BATCH_SIZE = 2000
+
+WORDS = (
+    'coffee morning music weekend travel football sunset code rain city friends food '
+    'movie beach dance study gym photo family night coding market summer road book art '
+    'garden concert game party lecture street festival night vibes new launch week fun'
+).split()
+
+
+class Zipf:
+    """Draws indexes 0..n-1 with P(k) proportional to 1 / (k + 1) ** exponent."""
+
+    def __init__(self, n, exponent, rng):
+        self.rng = rng
+        self.cumulative = list(accumulate(1 / (k + 1) ** exponent for k in range(n)))
+
+    def draw(self):
+        return bisect(self.cumulative, self.rng.random() * self.cumulative[-1])
+
+
+def clear():
+    """Remove previously seeded users; everything they created cascades with them."""
+    deleted, _ = User.objects.filter(username__startswith=USER_PREFIX).delete()
+    return deleted
+
+
+def _insert(model, objects, **kwargs):
+    created = []
+    for start in range(0, len(objects), BATCH_SIZE):
+        created.extend(model.objects.bulk_create(objects[start:start + BATCH_SIZE], **kwargs))
+    return created
+
+
+def _backdate(model, objects, moments):
+    # created_at is auto_now_add, which bulk_create fills in with now
+    for obj, moment in zip(objects, moments):
+        obj.created_at = moment
+    model.objects.bulk_update(objects, ['created_at'], batch_size=BATCH_SIZE)
+
+
+class Seeder:
+    def __init__(self, users=1000, posts=10000, likes=100000, comments=20000, hashtags=500, follows=20,
+                 days=30, reply_ratio=0.4, max_depth=4, media_ratio=0.2, exponent=1.1, timelines=True, seed=42,
+                 log=None):
+        self.sizes = dict(users=users, posts=posts, likes=likes, comments=comments, hashtags=hashtags)
+        self.follows, self.days = follows, days
+        self.reply_ratio, self.max_depth, self.media_ratio = reply_ratio, max_depth, media_ratio
+        self.exponent, self.timelines = exponent, timelines
+        self.rng = random.Random(seed)
+        self.now = timezone.now()
+        self.log = log or (lambda message: None)
+
+    def zipf(self, n):
+        return Zipf(n, self.exponent, self.rng)
+
+    def run(self):
+        with transaction.atomic():
+            users = self.create_users()
+            followers = self.create_follows(users)
+            tags = self.create_hashtags()
+            posts = self.create_posts(users, tags)
+            if self.timelines:
+                self.create_timelines(posts, followers)
+            comments = self.create_comments(users, posts)
+            self.create_likes(users, posts, comments)
+            self.log("Recomputing counters")
+            recount_counters()
+        return {
+            'users': len(users), 'posts': len(posts), 'comments': len(comments),
+            'likes': Like.objects.filter(user__username__startswith=USER_PREFIX).count(),
+        }
+
+    def create_users(self):
+        self.log(f"Creating {self.sizes['users']} users")
+        password = make_password(PASSWORD)
+        start = User.objects.filter(username__startswith=USER_PREFIX).count()
+        users = _insert(User, [
+            User(username=f'{USER_PREFIX}{start + index}', email=f'{USER_PREFIX}{start + index}@example.com',
+                 password=password)
+            for index in range(self.sizes['users'])
+        ])
+        # The most followed and most prolific accounts are the same few users
+        self.rng.shuffle(users)
+        return users
+
+    def create_follows(self, users):
+        self.log("Creating follows")
+        popularity = self.zipf(len(users))
+        followers = defaultdict(set)
+        for follower in users:
+            for _ in range(self.rng.randint(0, 2 * self.follows)):
+                following = users[popularity.draw()]
+                if following.pk != follower.pk:
+                    followers[following.pk].add(follower.pk)
+
+        _insert(Follow, [
+            Follow(follower_id=follower_id, following_id=following_id)
+            for following_id, ids in followers.items() for follower_id in ids
+        ], ignore_conflicts=True)
+        following_counts = Counter(follower_id for ids in followers.values() for follower_id in ids)
+        _insert(UserStats, [
+            UserStats(user_id=user.pk, followers_count=len(followers[user.pk]),
+                      following_count=following_counts[user.pk])
+            for user in users
+        ], ignore_conflicts=True)
+        return followers
+
+    def create_hashtags(self):
+        names = [f'{self.rng.choice(WORDS)}{index}' for index in range(self.sizes['hashtags'])]
+        HashTag.objects.bulk_create([HashTag(name=name) for name in names], ignore_conflicts=True)
+        ids = dict(HashTag.objects.filter(name__in=names).values_list('name', 'id'))
+        return [(name, ids[name]) for name in names]
+
+    def create_posts(self, users, tags):
+        self.log(f"Creating {self.sizes['posts']} posts")
+        authors, popular_tags = self.zipf(len(users)), self.zipf(len(tags))
+        span = timedelta(days=self.days).total_seconds()
+
+        drafts = []
+        for _ in range(self.sizes['posts']):
+            post_tags = {tags[popular_tags.draw()] for _ in range(self.rng.choice((0, 1, 1, 2, 3)))}
+            words = self.rng.choices(WORDS, k=self.rng.randint(4, 30))
+            content = ' '.join(words + [f'#{name}' for name, _ in post_tags])
+            moment = self.now - timedelta(seconds=self.rng.uniform(0, span))
+            drafts.append((Post(user_id=users[authors.draw()].pk, content=content), moment, post_tags))
+
+        posts = _insert(Post, [post for post, _, _ in drafts])
+        _backdate(Post, posts, [moment for _, moment, _ in drafts])
+
+        links, buckets = [], Counter()
+        for post, moment, post_tags in drafts:
+            for _, tag_id in post_tags:
+                links.append(PostHashTag(post_id=post.pk, hashtag_id=tag_id, added_by_id=post.user_id))
+                buckets[tag_id, bucket_for(moment)] += 1
+        _insert(PostHashTag, links, ignore_conflicts=True)
+        _insert(HashTagBucket, [
+            HashTagBucket(hashtag_id=tag_id, bucket=bucket, count=count) for (tag_id, bucket), count in buckets.items()
+        ], ignore_conflicts=True)
+
+        media = [
+            PostMedia(post_id=post.pk, media_type='image', status='ready',
+                      media_url=f'{settings.MEDIA_BASE_URL}seed/{post.pk}-{number}.jpg')
+            for post in posts if self.rng.random() < self.media_ratio
+            for number in range(self.rng.randint(1, 2))
+        ]
+        _insert(PostMedia, media)
+
+        self.log("Indexing posts for search")
+        engine = get_engine()
+        for start in range(0, len(posts), BATCH_SIZE):
+            engine.index_many([post.pk for post in posts[start:start + BATCH_SIZE]])
+        return posts
+
+    def create_timelines(self, posts, followers):
+        self.log("Filling home timelines")
+        entries = []
+        for post in posts:
+            recipients = {post.user_id}
+            if len(followers[post.user_id]) <= settings.TIMELINE_FANOUT_LIMIT:
+                recipients |= followers[post.user_id]
+            entries.extend(
+                TimelineEntry(user_id=user_id, post_id=post.pk, author_id=post.user_id, created_at=post.created_at)
+                for user_id in recipients
+            )
+            if len(entries) >= BATCH_SIZE:
+                _insert(TimelineEntry, entries, ignore_conflicts=True)
+                entries = []
+        _insert(TimelineEntry, entries, ignore_conflicts=True)
+
+    def create_comments(self, users, posts):
+        self.log(f"Creating {self.sizes['comments']} comments")
+        ranked = self.rng.sample(posts, len(posts))
+        popular = self.zipf(len(ranked))
+
+        # (post, parent draft index, depth); drafts are inserted a level at a
+        # time so every reply's parent already has a primary key.
+        drafts, by_post = [], defaultdict(list)
+        for index in range(self.sizes['comments']):
+            post = ranked[popular.draw()]
+            parent, depth = None, 0
+            if by_post[post.pk] and self.rng.random() < self.reply_ratio:
+                parent = self.rng.choice(by_post[post.pk])
+                depth = drafts[parent][2] + 1
+            drafts.append((post, parent, depth))
+            if depth < self.max_depth:
+                by_post[post.pk].append(index)
+
+        comments = [None] * len(drafts)
+        for depth in range(self.max_depth + 1):
+            level = [index for index, (_, _, draft_depth) in enumerate(drafts) if draft_depth == depth]
+            created = _insert(Comment, [
+                Comment(post_id=drafts[index][0].pk, user_id=self.rng.choice(users).pk,
+                        parent_id=comments[drafts[index][1]].pk if drafts[index][1] is not None else None,
+                        depth=depth, content=' '.join(self.rng.choices(WORDS, k=self.rng.randint(2, 20))))
+                for index in level
+            ])
+            for index, comment in zip(level, created):
+                parent = drafts[index][1]
+                comment.path = (comments[parent].path if parent is not None else '') + path_segment(comment.pk)
+                comments[index] = comment
+            # Paths end with the comment's own id, known only once inserted
+            Comment.objects.bulk_update(created, ['path'], batch_size=BATCH_SIZE)
+
+        moments = []
+        for comment, (post, parent, _) in zip(comments, drafts):
+            after = moments[parent] if parent is not None else post.created_at
+            moments.append(min(self.now, after + timedelta(seconds=self.rng.uniform(0, 6 * 3600))))
+        _backdate(Comment, comments, moments)
+
+        _insert(CommentMedia, [
+            CommentMedia(comment_id=comment.pk, media_type='image', status='ready',
+                         media_url=f'{settings.MEDIA_BASE_URL}seed/comment-{comment.pk}.jpg')
+            for comment in comments if self.rng.random() < self.media_ratio / 4
+        ])
+        return comments
+
+    def create_likes(self, users, posts, comments):
+        self.log(f"Creating up to {self.sizes['likes']} likes")
+        ranked_posts = self.rng.sample(posts, len(posts))
+        ranked_comments = self.rng.sample(comments, len(comments))
+        popular_posts, popular_comments = self.zipf(len(ranked_posts)), self.zipf(len(ranked_comments) or 1)
+
+        post_likes, comment_likes = set(), set()
+        for _ in range(self.sizes['likes']):
+            user_id = self.rng.choice(users).pk
+            if comments and self.rng.random() < 0.2:
+                comment_likes.add((user_id, ranked_comments[popular_comments.draw()].pk))
+            else:
+                post_likes.add((user_id, ranked_posts[popular_posts.draw()].pk))
+
+        _insert(Like, [Like(user_id=user_id, post_id=post_id) for user_id, post_id in post_likes], ignore_conflicts=True)
+        _insert(Like, [Like(user_id=user_id, comment_id=comment_id) for user_id, comment_id in comment_likes],
+                ignore_conflicts=True)
@@ -0,0 +1,92 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import path
+from rest_framework.authtoken.models import Token
+
+from vibez_api.posts.async_views import (AsyncReadView, AsyncPostListView, AsyncPostDetailsView,
+                                         AsyncPostHashtagsView, AsyncCommentDetailsView)
+from vibez_api.posts.cache import post_cache
+from vibez_api.posts.hashtags import set_post_hashtags
+from vibez_api.posts.models import Comment, Like, Post
+from vibez_api.posts.views import PostDetailsView
+
+# The project urls pick the async views at import time, so the tests route to them here
+urlpatterns = [
+    path('posts/', AsyncPostListView.as_view()),
+    path('posts/<int:pk>/', AsyncPostDetailsView.as_view()),
+    path('posts/hashtag/<hashtag>/', AsyncPostHashtagsView.as_view()),
+    path('comments/<int:pk>/', AsyncCommentDetailsView.as_view()),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        post_cache().clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.other = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        self.auth = {'Authorization': f'Token {Token.objects.create(user=self.user).key}'}
+        self.posts = [Post.objects.create(user=self.other, content=f'post {index} #sea') for index in range(3)]
+        for post in self.posts:
+            set_post_hashtags(post, post.content, self.other, created=True)
+        self.comment = Comment.objects.create(user=self.other, post=self.posts[0], content='comment')
+        Like.objects.create(user=self.user, post=self.posts[1])
+
+    async def test_reads_need_a_valid_token(self):
+        for headers in [{}, {'Authorization': 'Token nope'}]:
+            with self.subTest(headers=headers):
+                response = await self.async_client.get('/posts/', headers=headers)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    async def test_list_is_newest_first_with_liked_by_me(self):
+        response = await self.async_client.get('/posts/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([item['id'] for item in results], [post.pk for post in reversed(self.posts)])
+        self.assertEqual([item['liked_by_me'] for item in results], [False, True, False])
+        self.assertEqual(results[2]['comments'][0]['content'], 'comment')
+
+    async def test_detail_matches_the_sync_view_and_revalidates(self):
+        pk = self.posts[1].pk
+        response = await self.async_client.get(f'/posts/{pk}/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['liked_by_me'])
+
+        again = await self.async_client.get(f'/posts/{pk}/', headers={**self.auth, 'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], response['ETag'])
+
+    async def test_missing_objects_are_404s(self):
+        for url in ['/posts/0/', '/comments/0/', '/posts/hashtag/nothing/']:
+            with self.subTest(url=url):
+                self.assertEqual((await self.async_client.get(url, headers=self.auth)).status_code, 404)
+
+    async def test_hashtag_pages_are_open_to_anonymous_readers(self):
+        response = await self.async_client.get('/posts/hashtag/sea/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertIn('public', response['Cache-Control'])
+
+    async def test_comment_detail(self):
+        response = await self.async_client.get(f'/comments/{self.comment.pk}/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['content'], response.json()['liked_by_me']), ('comment', False))
+
+    async def test_writes_go_to_the_sync_view(self):
+        response = await self.async_client.post(
+            '/posts/', json.dumps({'content': 'new'}), content_type='application/json', headers=self.auth,
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Post.objects.filter(user=self.user, content='new').aexists())
+
+
+class AbstractReadTests(SimpleTestCase):
+    def test_a_view_without_read_cannot_be_served(self):
+        class Unfinished(AsyncReadView):
+            sync_view = PostDetailsView
+
+        with self.assertRaises(TypeError):
+            Unfinished()
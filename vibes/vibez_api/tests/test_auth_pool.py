@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase
+
+from vibez_api.users import auth_pool
+from vibez_api.users.auth_pool import Overloaded, run_hashing
+
+
+def limit_pool(test, workers, pending):
+    executor = ThreadPoolExecutor(max_workers=workers)
+    test.addCleanup(executor.shutdown)
+    for name, value in [('_executor', executor), ('_admission', threading.BoundedSemaphore(pending))]:
+        patcher = mock.patch.object(auth_pool, name, value)
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+
+class RunHashingTests(SimpleTestCase):
+    def test_at_most_the_pool_size_run_at_once(self):
+        limit_pool(self, workers=2, pending=10)
+        running, peak, lock = 0, 0, threading.Lock()
+
+        def hash_password():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return 'hashed'
+
+        async def burst():
+            return await asyncio.gather(*(run_hashing(hash_password) for _ in range(6)))
+
+        self.assertEqual(asyncio.run(burst()), ['hashed'] * 6)
+        self.assertEqual(peak, 2)
+
+    def test_requests_beyond_the_limit_are_turned_away_at_once(self):
+        limit_pool(self, workers=1, pending=2)
+        release = threading.Event()
+
+        async def overload():
+            waiting = [asyncio.ensure_future(run_hashing(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(Overloaded):
+                await run_hashing(release.wait)
+            release.set()
+            return await asyncio.gather(*waiting)
+
+        self.assertEqual(asyncio.run(overload()), [True, True])
+
+    def test_a_slot_is_held_until_the_hash_finishes_even_if_the_caller_gives_up(self):
+        limit_pool(self, workers=1, pending=1)
+        release = threading.Event()
+
+        async def give_up():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(run_hashing(release.wait), 0.05)
+            with self.assertRaises(Overloaded):
+                await run_hashing(release.wait)
+
+        asyncio.run(give_up())
+        release.set()
+        auth_pool._executor.shutdown(wait=True)
+        self.assertTrue(auth_pool._admission.acquire(blocking=False))
+
+
+class SignupLoginTests(TransactionTestCase):
+    def setUp(self):
+        limit_pool(self, workers=1, pending=10)
+        # The pool thread keeps its connection, which would stop the test database being dropped
+        self.addCleanup(lambda: auth_pool._executor.submit(connections.close_all).result())
+
+    def test_signup_then_login(self):
+        response = self.client.post(
+            '/api/auth/signup/', {'username': 'alice', 'email': 'alice@example.com', 'password': 'pw12345!'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        token = response.json()['token']
+
+        response = self.client.post('/api/auth/login/', {'username': 'alice', 'password': 'pw12345!'})
+        self.assertEqual((response.status_code, response.json()['token']), (200, token))
+        response = self.client.post('/api/auth/login/', {'username': 'alice', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_bad_bodies_are_rejected_before_hashing(self):
+        with mock.patch.object(auth_pool, 'get_executor') as get_executor:
+            response = self.client.post('/api/auth/login/', '{not json', content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post('/api/auth/login/', {'username': 'alice'})
+            self.assertEqual(response.status_code, 400)
+        get_executor.assert_not_called()
+
+    def test_overload_is_a_503_with_retry_after(self):
+        for _ in range(10):
+            auth_pool._admission.acquire()
+        for url, data in [('/api/auth/signup/', {'username': 'bob', 'password': 'pw12345!'}),
+                          ('/api/auth/login/', {'username': 'bob', 'password': 'pw12345!'})]:
+            with self.subTest(url=url):
+                response = self.client.post(url, data)
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(User.objects.exists())
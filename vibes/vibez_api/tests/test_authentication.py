@@ -0,0 +1,69 @@
+import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from vibez_api.users.authentication import CachedTokenAuthentication, invalidate_user, token_cache
+
+
+class TokenCacheTests(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def request(self):
+        return APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_a_cached_token_is_answered_without_queries(self):
+        self.auth.authenticate(self.request())
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate(self.request())
+        self.assertEqual((user.pk, token.key), (self.user.pk, self.token.key))
+
+    def test_cached_users_are_copies(self):
+        first, _ = self.auth.authenticate(self.request())
+        first.username = 'changed'
+        second, _ = self.auth.authenticate(self.request())
+        self.assertEqual(second.username, 'alice')
+
+    def test_logout_revokes_the_token_at_once(self):
+        self.assertEqual(self.client.get('/api/posts/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        self.assertEqual(self.client.get('/api/posts/').status_code, 401)
+
+    def test_deactivating_the_user_invalidates_their_entries(self):
+        self.assertEqual(self.client.get('/api/posts/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get('/api/posts/').status_code, 401)
+
+    @override_settings(AUTH_TOKEN_CLOCK_SKEW=0)
+    def test_a_stamp_newer_than_the_entry_forces_a_reload(self):
+        self.auth.authenticate(self.request())
+        time.sleep(0.01)
+        invalidate_user(self.user.pk)
+        self.assertIsNone(self.auth.cached_credentials(self.token.key))
+        with self.assertNumQueries(1):
+            self.auth.authenticate(self.request())
+        with self.assertNumQueries(0):
+            self.auth.authenticate(self.request())
+
+    @override_settings(AUTH_TOKEN_CLOCK_SKEW=0)
+    def test_async_hits_check_the_stamp(self):
+        self.auth.authenticate(self.request())
+        user, _ = async_to_sync(self.auth.aauthenticate)(self.request())
+        self.assertEqual(user.pk, self.user.pk)
+
+        time.sleep(0.01)
+        invalidate_user(self.user.pk)
+        self.assertIsNone(async_to_sync(self.auth.acached_credentials)(self.token.key))
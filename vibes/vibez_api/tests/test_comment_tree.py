@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from vibez_api.posts.comment_tree import CommentTree
+from vibez_api.posts.counters import recount_counters
+from vibez_api.posts.models import Comment, Post
+
+
+@override_settings(COMMENT_INLINE_REPLIES=2, COMMENT_INLINE_DEPTH=2)
+class CommentTreeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+
+    def comment(self, post, parent=None, content='c'):
+        return Comment.objects.create(user=self.user, post=post, parent=parent, content=content)
+
+    def threaded_post(self):
+        post = Post.objects.create(user=self.user, content='post')
+        for _ in range(3):
+            root = self.comment(post)
+            for _ in range(3):
+                reply = self.comment(post, root)
+                self.comment(post, self.comment(post, reply))
+        return post
+
+    def queries_for(self, posts):
+        recount_counters()
+        with CaptureQueriesContext(connection) as queries:
+            CommentTree.for_posts([post.pk for post in posts])
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_posts_or_threads(self):
+        few = self.queries_for([self.threaded_post()])
+        many = self.queries_for([self.threaded_post() for _ in range(4)])
+        self.assertEqual(few, many)
+
+    def test_newest_top_level_comments_with_a_link_to_the_rest(self):
+        post = Post.objects.create(user=self.user, content='post')
+        roots = [self.comment(post, content=f'root {index}') for index in range(3)]
+        tree = CommentTree.for_posts([post.pk])
+        self.assertEqual(tree.comments_for(post.pk), [roots[2], roots[1]])
+        self.assertIn(f'/api/posts/{post.pk}/comments/?cursor=', tree.more_comments(post.pk))
+
+    def test_no_link_when_every_comment_is_shown(self):
+        post = Post.objects.create(user=self.user, content='post')
+        self.comment(post)
+        self.assertIsNone(CommentTree.for_posts([post.pk]).more_comments(post.pk))
+
+    def test_replies_in_thread_order_down_to_the_inline_depth(self):
+        post = Post.objects.create(user=self.user, content='post')
+        root = self.comment(post)
+        first, second, third = (self.comment(post, root) for _ in range(3))
+        deep = self.comment(post, first)
+        deeper = self.comment(post, deep)
+        recount_counters()
+
+        tree = CommentTree.for_posts([post.pk])
+        self.assertEqual(tree.replies_for(root.pk), [first, second])
+        self.assertIn(f'/api/comments/{root.pk}/replies/?cursor=', tree.more_replies(tree.get(root.pk)))
+        self.assertEqual(tree.replies_for(first.pk), [deep])
+        self.assertFalse(tree.covers(deeper))
+        self.assertEqual(tree.more_replies(tree.get(deep.pk)), f'/api/comments/{deep.pk}/replies/')
+
+    def test_trees_for_comments_start_at_those_comments(self):
+        post = Post.objects.create(user=self.user, content='post')
+        root = self.comment(post)
+        reply = self.comment(post, root)
+        nested = self.comment(post, reply)
+        recount_counters()
+
+        tree = CommentTree.for_comments([Comment.objects.get(pk=reply.pk)])
+        self.assertEqual(tree.replies_for(reply.pk), [nested])
+        self.assertFalse(tree.covers(root))
@@ -0,0 +1,119 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from vibez_api.posts.models import PATH_STEP, Comment, Post, path_segment
+
+comment_paths = import_module('vibez_api.posts.migrations.0016_comment_paths')
+path_step = import_module('vibez_api.posts.migrations.0021_comment_path_step')
+
+
+class CommentPathTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.post = Post.objects.create(user=self.user, content='hello')
+        self.client.force_authenticate(self.user)
+
+    def thread(self):
+        root = Comment.objects.create(user=self.user, post=self.post, content='root')
+        reply = Comment.objects.create(user=self.user, post=self.post, parent=root, content='reply')
+        nested = Comment.objects.create(user=self.user, post=self.post, parent=reply, content='nested')
+        return root, reply, nested
+
+    def test_path_and_depth_follow_the_parent(self):
+        root, reply, nested = self.thread()
+        self.assertEqual((root.depth, root.path), (0, path_segment(root.pk)))
+        self.assertEqual((reply.depth, reply.path), (1, root.path + path_segment(reply.pk)))
+        self.assertEqual((nested.depth, nested.path), (2, reply.path + path_segment(nested.pk)))
+        nested.refresh_from_db()
+        self.assertEqual(nested.path, reply.path + path_segment(nested.pk))
+
+    def test_reply_to_a_loaded_parent_is_inserted_with_its_path(self):
+        root = Comment.objects.create(user=self.user, post=self.post, content='root')
+        with CaptureQueriesContext(connection) as queries:
+            Comment.objects.create(user=self.user, post=self.post, parent=root, content='reply')
+        statements = [query['sql'].split()[0] for query in queries]
+        if connection.vendor == 'postgresql':
+            self.assertEqual(statements, ['SELECT', 'INSERT'])
+        else:
+            self.assertEqual(statements, ['INSERT', 'UPDATE'])
+
+    def test_path_segments_fit_any_big_id(self):
+        self.assertEqual(len(path_segment(2**63 - 1)), PATH_STEP)
+        root = Comment.objects.create(user=self.user, post=self.post, content='root', pk=10**12)
+        reply = Comment.objects.create(user=self.user, post=self.post, parent=root, content='reply')
+        self.assertEqual(Comment.objects.filter(root.replies_filter()).get(), reply)
+
+    def test_saving_again_keeps_the_path(self):
+        root, reply, _ = self.thread()
+        path = reply.path
+        reply.content = 'edited'
+        reply.save()
+        reply.refresh_from_db()
+        self.assertEqual(reply.path, path)
+
+    def test_replies_filter_reads_direct_replies_in_thread_order(self):
+        root, reply, nested = self.thread()
+        later = Comment.objects.create(user=self.user, post=self.post, parent=root, content='later')
+        replies = Comment.objects.filter(root.replies_filter()).order_by('path')
+        self.assertEqual(list(replies), [reply, later])
+
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_comment_and_reply_pages_cover_each_once_in_order(self):
+        comments = [Comment.objects.create(user=self.user, post=self.post, content=f'c{index}') for index in range(5)]
+        replies = [Comment.objects.create(user=self.user, post=self.post, parent=comments[0], content=f'r{index}')
+                   for index in range(5)]
+        Comment.objects.create(user=self.user, post=self.post, parent=replies[0], content='nested')
+
+        ids = self.collect(f'/api/posts/{self.post.pk}/comments/?page_size=2')
+        self.assertEqual(ids, [comment.pk for comment in reversed(comments)])
+        ids = self.collect(f'/api/comments/{comments[0].pk}/replies/?page_size=2')
+        self.assertEqual(ids, [reply.pk for reply in replies])
+
+    def test_reply_api_sets_depth(self):
+        root = Comment.objects.create(user=self.user, post=self.post, content='root')
+        response = self.client.post(f'/api/posts/{self.post.pk}/comment/{root.pk}/reply/', {'content': 'hi'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['depth'], 1)
+
+    def test_reply_must_be_on_its_parents_post(self):
+        root = Comment.objects.create(user=self.user, post=self.post, content='root')
+        other = Post.objects.create(user=self.user, content='other')
+        response = self.client.post(f'/api/posts/{other.pk}/comment/{root.pk}/reply/', {'content': 'hi'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent', response.data)
+
+    def test_migration_backfills_paths_level_by_level(self):
+        root, reply, nested = self.thread()
+        other = Comment.objects.create(user=self.user, post=self.post, content='other')
+        expected = {comment.pk: (comment.path, comment.depth) for comment in (root, reply, nested, other)}
+        Comment.objects.update(path='', depth=0)
+
+        comment_paths.fill_paths(apps, None)
+
+        self.assertEqual({comment.pk: (comment.path, comment.depth) for comment in Comment.objects.all()}, expected)
+
+    def test_migration_repads_ten_digit_paths(self):
+        root, reply, nested = self.thread()
+        expected = {comment.pk: comment.path for comment in (root, reply, nested)}
+        for comment in (root, reply, nested):
+            old_path = ''.join(f'{int(comment.path[start:start + PATH_STEP]):010d}'
+                               for start in range(0, len(comment.path), PATH_STEP))
+            Comment.objects.filter(pk=comment.pk).update(path=old_path)
+
+        path_step.repad_paths(apps, None)
+        path_step.repad_paths(apps, None)
+
+        self.assertEqual(dict(Comment.objects.values_list('pk', 'path')), expected)
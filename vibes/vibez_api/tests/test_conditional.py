@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from vibez_api.posts.models import Comment, Post
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.other = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        self.post = Post.objects.create(user=self.user, content='hello')
+        self.url = f'/api/posts/{self.post.pk}/'
+        self.client.force_authenticate(self.user)
+
+    def etag(self, url=None):
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_etag_is_304(self):
+        response = self.client.get(self.url)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], response['ETag'])
+        self.assertFalse(again.content)
+
+    def test_stale_etag_gets_the_post(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_like_changes_the_etag(self):
+        before = self.etag()
+        self.client.put(f'{self.url}like/')
+        after = self.etag()
+        self.assertNotEqual(before, after)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=before).status_code, 200)
+
+    def test_another_users_like_changes_the_etag(self):
+        before = self.etag()
+        self.client.force_authenticate(self.other)
+        self.client.put(f'{self.url}like/')
+        self.client.force_authenticate(self.user)
+        self.assertNotEqual(before, self.etag())
+
+    def test_comment_changes_the_etag(self):
+        before = self.etag()
+        response = self.client.post(f'/api/posts/{self.post.pk}/comment/', {'content': 'nice'})
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(before, self.etag())
+
+    def test_edit_changes_the_etag(self):
+        before = self.etag()
+        response = self.client.patch(self.url, {'content': 'hello again'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(before, self.etag())
+
+    def test_comment_detail_follows_its_post(self):
+        comment = Comment.objects.create(user=self.user, post=self.post, content='first')
+        url = f'/api/comments/{comment.pk}/comment/'
+        before = self.etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=before).status_code, 304)
+        self.client.put(f'/api/posts/comment/{comment.pk}/like/')
+        self.assertNotEqual(before, self.etag(url))
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from vibez_api.posts.counters import recount_counters
+from vibez_api.posts.models import Comment, Like, Post
+
+
+class CounterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.post = Post.objects.create(user=self.user, content='post')
+        self.client.force_authenticate(self.user)
+
+    def comment(self, parent=None):
+        url = f'/api/posts/{self.post.pk}/comment/'
+        if parent:
+            url = f'/api/posts/{self.post.pk}/comment/{parent}/reply/'
+        response = self.client.post(url, {'content': 'hi'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_comments_and_replies_move_the_counters(self):
+        root = self.comment()
+        self.comment(root)
+        self.comment(root)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+        self.assertEqual(Comment.objects.get(pk=root).replies_count, 2)
+
+    def test_deleting_a_comment_takes_its_replies_off_the_post(self):
+        root = self.comment()
+        reply = self.comment(root)
+        self.comment(reply)
+        self.comment()
+
+        self.assertEqual(self.client.delete(f'/api/comments/{reply}/comment/').status_code, 204)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        self.assertEqual(Comment.objects.get(pk=root).replies_count, 0)
+
+    def test_recount_repairs_only_drifted_rows(self):
+        root = self.comment()
+        self.comment(root)
+        other = Post.objects.create(user=self.user, content='other')
+        Like.objects.create(user=self.user, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=7)
+        Comment.objects.filter(pk=root).update(replies_count=0)
+
+        drift = recount_counters()
+
+        self.assertEqual(drift, {
+            'post.likes_count': 1,
+            'post.comments_count': 1,
+            'comment.likes_count': 0,
+            'comment.replies_count': 1,
+        })
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 2))
+        self.assertEqual(Comment.objects.get(pk=root).replies_count, 1)
+        self.assertEqual(Post.objects.get(pk=other.pk).comments_count, 0)
+        self.assertEqual(recount_counters(dry_run=True), dict.fromkeys(drift, 0))
+
+    def test_dry_run_reports_without_writing(self):
+        Post.objects.filter(pk=self.post.pk).update(comments_count=4)
+        out = StringIO()
+        call_command('recount_counters', '--dry-run', stdout=out)
+        self.assertIn('post.comments_count: 1 drifted', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 4)
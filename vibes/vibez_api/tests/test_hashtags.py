@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from vibez_api.posts.hashtags import normalize_hashtags, set_post_hashtags
+from vibez_api.posts.models import HashTag, Post, PostHashTag
+
+
+def tags_of(post):
+    return sorted(post.hashtags.values_list('name', flat=True))
+
+
+class SetPostHashtagsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.post = Post.objects.create(user=self.user, content='post')
+
+    def test_normalizing_lowercases_dedupes_and_drops_overlong_tags(self):
+        limit = HashTag._meta.get_field('name').max_length
+        content = f"#Vibes #music #VIBES #{'x' * (limit + 1)} #ok"
+        self.assertEqual(normalize_hashtags(content), ['vibes', 'music', 'ok'])
+
+    def test_only_the_difference_is_written(self):
+        set_post_hashtags(self.post, '#a #b #c', self.user, created=True)
+        links = dict(PostHashTag.objects.filter(post=self.post).values_list('hashtag__name', 'pk'))
+
+        added, removed = set_post_hashtags(self.post, '#b #c #d', self.user)
+
+        self.assertEqual((added, removed), (['d'], ['a']))
+        self.assertEqual(tags_of(self.post), ['b', 'c', 'd'])
+        kept = dict(PostHashTag.objects.filter(post=self.post).values_list('hashtag__name', 'pk'))
+        self.assertEqual((kept['b'], kept['c']), (links['b'], links['c']))
+
+    def test_unchanged_content_writes_nothing(self):
+        set_post_hashtags(self.post, '#a #b', self.user, created=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(set_post_hashtags(self.post, '#B #a', self.user), ([], []))
+        self.assertFalse([query for query in queries if not query['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE'))])
+
+    def test_query_count_does_not_depend_on_the_number_of_tags(self):
+        def queries_for(count):
+            post = Post.objects.create(user=self.user, content='post')
+            content = ' '.join(f'#tag{post.pk}_{index}' for index in range(count))
+            with CaptureQueriesContext(connection) as queries:
+                set_post_hashtags(post, content, self.user, created=True)
+            return len(queries)
+
+        self.assertEqual(queries_for(2), queries_for(20))
+
+    def test_existing_tags_are_reused(self):
+        other = Post.objects.create(user=self.user, content='other')
+        set_post_hashtags(other, '#shared', self.user, created=True)
+        set_post_hashtags(self.post, '#shared #new', self.user, created=True)
+        self.assertEqual(HashTag.objects.filter(name='shared').count(), 1)
+        self.assertEqual(HashTag.objects.get(name='shared').posts.count(), 2)
+
+
+class PostHashtagApiTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.client.force_authenticate(self.user)
+
+    def test_creating_and_editing_a_post_keeps_its_tags_in_step(self):
+        response = self.client.post('/api/posts/', {'content': 'hello #one #two'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(pk=response.data['id'])
+        self.assertEqual(tags_of(post), ['one', 'two'])
+
+        self.client.patch(f'/api/posts/{post.pk}/', {'content': 'now #two #three'}, format='json')
+        self.assertEqual(tags_of(post), ['three', 'two'])
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from vibez_api.posts import likes
+from vibez_api.posts.cache import post_cache, render_post
+from vibez_api.posts.counters import CounterBuffer
+from vibez_api.posts.models import Comment, Post
+
+
+@override_settings(LIKE_BUFFER_ENABLED=True)
+class LikeBufferTests(APITestCase):
+    def setUp(self):
+        post_cache().clear()
+        # No flusher thread: the tests flush by hand
+        patcher = mock.patch.object(CounterBuffer, 'start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = CounterBuffer()
+        patcher = mock.patch.object(likes, 'like_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.users = [User.objects.create_user(f'user{index}', f'user{index}@example.com', 'pw') for index in range(3)]
+        self.post = Post.objects.create(user=self.users[0], content='post')
+        self.comment = Comment.objects.create(user=self.users[0], post=self.post, content='comment')
+
+    def like(self, user, url):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.put(url)
+
+    def stored(self, obj):
+        obj.refresh_from_db(fields=['likes_count'])
+        return obj.likes_count
+
+    def test_likes_wait_in_the_buffer_but_readers_here_see_them(self):
+        for user in self.users:
+            self.assertEqual(self.like(user, f'/api/posts/{self.post.pk}/like/').status_code, 201)
+
+        self.assertEqual(self.stored(self.post), 0)
+        self.assertEqual(self.buffer.pending(Post, self.post.pk), 3)
+        response = self.client.get(f'/api/posts/{self.post.pk}/')
+        self.assertEqual((response.data['likes_count'], response.data['liked_by_me']), (3, True))
+
+    def test_flush_writes_the_summed_deltas(self):
+        for user in self.users:
+            self.like(user, f'/api/posts/{self.post.pk}/like/')
+            self.like(user, f'/api/posts/comment/{self.comment.pk}/like/')
+        self.client.force_authenticate(self.users[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/posts/comment/{self.comment.pk}/like/')
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual((self.stored(self.post), self.stored(self.comment)), (3, 2))
+        self.assertEqual(self.buffer.pending(Post, self.post.pk), 0)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_one_update_per_table_however_many_targets(self):
+        def flush_queries(count):
+            posts = [Post.objects.create(user=self.users[0], content='p') for _ in range(count)]
+            comments = [Comment.objects.create(user=self.users[0], post=post, content='c') for post in posts]
+            for post, comment in zip(posts, comments):
+                self.buffer.add(Post, post.pk, 2)
+                self.buffer.add(Comment, comment.pk, 1)
+            with CaptureQueriesContext(connection) as queries:
+                self.buffer.flush()
+            return len(queries)
+
+        self.assertEqual(flush_queries(1), flush_queries(10))
+
+    def test_flushing_moves_the_posts_on(self):
+        render_post(self.post)
+        before = Post.objects.get(pk=self.post.pk).updated_at
+        self.buffer.add(Comment, self.comment.pk, 1)
+        self.buffer.flush()
+
+        self.assertGreater(Post.objects.get(pk=self.post.pk).updated_at, before)
+        self.assertEqual(render_post(self.post)['comments'][0]['likes_count'], 1)
+
+    def test_a_failed_flush_keeps_the_deltas(self):
+        self.buffer.add(Post, self.post.pk, 2)
+        with mock.patch.object(CounterBuffer, 'write', side_effect=RuntimeError('database down')):
+            with self.assertRaises(RuntimeError):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.pending(Post, self.post.pk), 2)
+
+        self.buffer.add(Post, self.post.pk, 1)
+        self.buffer.flush()
+        self.assertEqual(self.stored(self.post), 3)
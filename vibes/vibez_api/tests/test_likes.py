@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from vibez_api.posts.likes import LikeTargetMissing, like, unlike
+from vibez_api.posts.models import Comment, Like, Post
+
+
+class LikeTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.post = Post.objects.create(user=self.user, content='hello')
+        self.comment = Comment.objects.create(user=self.user, post=self.post, content='first')
+        self.client.force_authenticate(self.user)
+
+    def likes_count(self, obj):
+        obj.refresh_from_db(fields=['likes_count'])
+        return obj.likes_count
+
+    def test_put_is_idempotent(self):
+        url = f'/api/posts/{self.post.pk}/like/'
+        self.assertEqual(self.client.put(url).status_code, 201)
+        self.assertEqual(self.client.put(url).status_code, 200)
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 1)
+        self.assertEqual(self.likes_count(self.post), 1)
+
+    def test_delete_is_idempotent(self):
+        url = f'/api/posts/{self.post.pk}/like/'
+        self.client.put(url)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Like.objects.filter(post=self.post).exists())
+        self.assertEqual(self.likes_count(self.post), 0)
+
+    def test_post_toggles(self):
+        url = f'/api/posts/{self.post.pk}/like/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.likes_count(self.post), 1)
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.likes_count(self.post), 0)
+
+    def test_comment_likes_move_only_the_comment_counter(self):
+        url = f'/api/posts/comment/{self.comment.pk}/like/'
+        self.assertEqual(self.client.put(url).status_code, 201)
+        self.assertEqual(self.client.put(url).status_code, 200)
+        self.assertEqual(self.likes_count(self.comment), 1)
+        self.assertEqual(self.likes_count(self.post), 0)
+        self.client.delete(url)
+        self.client.delete(url)
+        self.assertEqual(self.likes_count(self.comment), 0)
+
+    def test_missing_target_is_404(self):
+        self.assertEqual(self.client.put('/api/posts/999999/like/').status_code, 404)
+        self.assertEqual(self.client.put('/api/posts/comment/999999/like/').status_code, 404)
+        self.assertFalse(Like.objects.exists())
+
+    def test_anonymous_is_401(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.put(f'/api/posts/{self.post.pk}/like/').status_code, 401)
+        self.assertEqual(self.client.delete(f'/api/posts/comment/{self.comment.pk}/like/').status_code, 401)
+
+    def test_like_and_unlike_report_whether_anything_changed(self):
+        self.assertTrue(like(self.user, post_id=self.post.pk))
+        self.assertFalse(like(self.user, post_id=self.post.pk))
+        self.assertTrue(unlike(self.user, post_id=self.post.pk))
+        self.assertFalse(unlike(self.user, post_id=self.post.pk))
+        with self.assertRaises(LikeTargetMissing):
+            like(self.user, post_id=999999)
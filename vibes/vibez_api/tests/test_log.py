@@ -0,0 +1,88 @@
+import json
+import logging
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from vibes import log
+from vibes.log import JsonFormatter, QueueHandler, RateLimitFilter
+
+
+def record(name='noisy', level=logging.INFO, msg='hello %s', args=('world',), **extra):
+    return logging.makeLogRecord({'name': name, 'levelno': level, 'levelname': logging.getLevelName(level),
+                                  'msg': msg, 'args': args, **extra})
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class RateLimitFilterTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 100.0
+        patcher = mock.patch.object(log.time, 'monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.filter = RateLimitFilter({'noisy': 2})
+
+    def kept(self, count, **kwargs):
+        return sum(bool(self.filter.filter(record(**kwargs))) for _ in range(count))
+
+    def test_limits_apply_to_children_but_not_other_loggers(self):
+        self.assertEqual(self.kept(5), 2)
+        self.assertEqual(self.kept(5, name='noisy.child'), 2)
+        self.assertEqual(self.kept(5, name='quiet'), 5)
+
+    def test_errors_are_never_held_back(self):
+        self.kept(2)
+        self.assertEqual(self.kept(3, level=logging.ERROR), 3)
+
+    def test_the_next_record_through_says_how_many_were_dropped(self):
+        self.kept(5)
+        self.now += 1
+        first, second = record(), record()
+        self.assertTrue(self.filter.filter(first))
+        self.assertTrue(self.filter.filter(second))
+        self.assertEqual(first.suppressed, 3)
+        self.assertFalse(hasattr(second, 'suppressed'))
+
+
+class QueueHandlerTests(SimpleTestCase):
+    def test_arguments_are_bound_on_the_callers_thread(self):
+        handler = QueueHandler()
+        args = ['before']
+        handler.handle(record(args=(args,)))
+        args[0] = 'after'
+        queued = handler.queue.get_nowait()
+        self.assertEqual((queued.getMessage(), queued.args), ("hello ['before']", None))
+
+    def test_a_full_queue_drops_instead_of_blocking(self):
+        handler = QueueHandler(maxsize=2)
+        for _ in range(5):
+            handler.handle(record())
+        self.assertEqual((handler.queue.qsize(), handler.dropped), (2, 3))
+
+    def test_configure_starts_a_listener_writing_to_the_targets(self):
+        # dictConfig itself is stubbed out: applying a config would replace the test run's own logging
+        queue_handler, target, other = QueueHandler(targets=['memory']), ListHandler(), ListHandler()
+        self.addCleanup(queue_handler.close)
+        configurator = mock.Mock(config={'handlers': {'queue': queue_handler, 'memory': target, 'other': other}})
+        with mock.patch.object(log.logging.config, 'dictConfigClass', return_value=configurator):
+            log.configure({'version': 1})
+        configurator.configure.assert_called_once_with()
+
+        queue_handler.handle(record(msg='saved %d posts', args=(3,)))
+        queue_handler.stop()
+        self.assertEqual([item.getMessage() for item in target.records], ['saved 3 posts'])
+        self.assertEqual(other.records, [])
+
+
+class JsonFormatterTests(SimpleTestCase):
+    def test_extra_fields_become_top_level_keys(self):
+        entry = json.loads(JsonFormatter().format(record(route='post-list', queries=12)))
+        self.assertEqual((entry['message'], entry['route'], entry['queries']), ('hello world', 'post-list', 12))
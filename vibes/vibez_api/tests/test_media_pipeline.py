@@ -0,0 +1,115 @@
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from vibez_api.posts import media_pipeline
+from vibez_api.posts.media_pipeline import claim, enqueue, process, process_pending
+from vibez_api.posts.models import Post, PostMedia
+from vibez_api.uploads import StoredFile, UploadError
+
+
+def stored(paths):
+    return [StoredFile(f'https://cdn.example.com/{os.path.basename(path)}', path, 'image') for path in paths]
+
+
+class MediaPipelineTests(TestCase):
+    def setUp(self):
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        overrides = override_settings(
+            MEDIA_SPOOL_DIR=spool_dir.name, MEDIA_WORKER_IN_PROCESS=False, MEDIA_UPLOAD_MAX_ATTEMPTS=2
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+
+    def enqueue(self, post, name='photo.jpg'):
+        with self.captureOnCommitCallbacks(execute=True):
+            media = enqueue(PostMedia, SimpleUploadedFile(name, b'bytes'), post=post)
+        return PostMedia.objects.get(pk=media.pk)
+
+    def test_files_are_spooled_once_the_row_commits(self):
+        post = Post.objects.create(user=self.user, content='post')
+        with self.captureOnCommitCallbacks() as callbacks:
+            media = enqueue(PostMedia, SimpleUploadedFile('clip.MOV', b'bytes'), post=post)
+            self.assertEqual((media.status, media.media_type, media.spool_path), ('pending', 'video', ''))
+            self.assertEqual(claim(PostMedia, 'post_id', 10), [])
+        for callback in callbacks:
+            callback()
+
+        media.refresh_from_db()
+        self.assertTrue(media.spool_path.endswith('.mov'))
+        with open(media.spool_path, 'rb') as spooled:
+            self.assertEqual(spooled.read(), b'bytes')
+
+    def test_claim_takes_every_row_of_an_owner_together(self):
+        first, second = (Post.objects.create(user=self.user, content=name) for name in ('first', 'second'))
+        a, b = self.enqueue(first), self.enqueue(first)
+        c = self.enqueue(second)
+
+        batches = claim(PostMedia, 'post_id', 10)
+
+        self.assertEqual([[row.pk for row in batch] for batch in batches], [[a.pk, b.pk], [c.pk]])
+        self.assertEqual(set(PostMedia.objects.values_list('status', 'attempts')), {('processing', 1)})
+        self.assertEqual(claim(PostMedia, 'post_id', 10), [])
+
+    def test_claim_limit_counts_owners(self):
+        posts = [Post.objects.create(user=self.user, content=str(index)) for index in range(3)]
+        for post in posts:
+            self.enqueue(post)
+            self.enqueue(post)
+        self.assertEqual([len(batch) for batch in claim(PostMedia, 'post_id', 2)], [2, 2])
+
+    def test_successful_upload_marks_ready_and_drops_the_spool(self):
+        media = self.enqueue(Post.objects.create(user=self.user, content='post'))
+        spooled = media.spool_path
+        with mock.patch.object(media_pipeline, 'upload_files', side_effect=stored) as upload:
+            self.assertEqual(process_pending(), 1)
+
+        upload.assert_called_once_with([spooled])
+        media.refresh_from_db()
+        self.assertEqual((media.status, media.spool_path), ('ready', ''))
+        self.assertEqual(media.media_url, f'https://cdn.example.com/{os.path.basename(spooled)}')
+        self.assertFalse(os.path.exists(spooled))
+
+    def test_failed_upload_is_retried_then_given_up(self):
+        media = self.enqueue(Post.objects.create(user=self.user, content='post'))
+        spooled = media.spool_path
+        with mock.patch.object(media_pipeline, 'upload_files', side_effect=UploadError('down')):
+            [batch] = claim(PostMedia, 'post_id', 10)
+            self.assertFalse(process(batch))
+            media.refresh_from_db()
+            self.assertEqual((media.status, media.attempts), ('pending', 1))
+            self.assertTrue(os.path.exists(spooled))
+
+            [batch] = claim(PostMedia, 'post_id', 10)
+            self.assertFalse(process(batch))
+
+        media.refresh_from_db()
+        self.assertEqual((media.status, media.spool_path), ('failed', ''))
+        self.assertFalse(os.path.exists(spooled))
+
+    def test_rows_never_spooled_are_failed_after_the_claim_timeout(self):
+        post = Post.objects.create(user=self.user, content='post')
+        media = PostMedia.objects.create(post=post, media_type='image')
+        self.assertEqual(claim(PostMedia, 'post_id', 10), [])
+
+        PostMedia.objects.filter(pk=media.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(claim(PostMedia, 'post_id', 10), [])
+        media.refresh_from_db()
+        self.assertEqual(media.status, 'failed')
+
+    def test_stuck_claims_are_taken_again_after_the_claim_timeout(self):
+        media = self.enqueue(Post.objects.create(user=self.user, content='post'))
+        claim(PostMedia, 'post_id', 10)
+        self.assertEqual(claim(PostMedia, 'post_id', 10), [])
+
+        PostMedia.objects.filter(pk=media.pk).update(claimed_at=timezone.now() - timedelta(hours=1))
+        [[again]] = claim(PostMedia, 'post_id', 10)
+        self.assertEqual((again.pk, again.attempts), (media.pk, 2))
@@ -0,0 +1,73 @@
+import base64
+import json
+
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from vibez_api.posts.hashtags import set_post_hashtags
+from vibez_api.posts.models import Post
+from vibez_api.posts.pagination import KeysetPagination
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+class CursorTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.posts = [Post.objects.create(user=self.user, content=f'post {index}') for index in range(5)]
+        self.client.force_authenticate(self.user)
+
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [post['id'] for post in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_round_trip_visits_every_post_once_newest_first(self):
+        ids = self.collect('/api/posts/?page_size=2')
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+
+    def test_posts_created_ahead_of_the_cursor_do_not_shift_later_pages(self):
+        first = self.client.get('/api/posts/?page_size=2')
+        Post.objects.create(user=self.user, content='newer')
+        rest = self.collect(first.data['next'])
+        self.assertEqual(rest, [post.pk for post in reversed(self.posts[:3])])
+
+    def test_page_size_is_capped(self):
+        with self.settings(POSTS_MAX_PAGE_SIZE=3):
+            response = self.client.get('/api/posts/?page_size=50')
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_hashtag_pages_round_trip(self):
+        tagged = self.posts[1:4]
+        for post in tagged:
+            set_post_hashtags(post, '#vibes', self.user, created=True)
+        ids = self.collect('/api/posts/hashtag/vibes/?page_size=2')
+        self.assertEqual(ids, [post.pk for post in reversed(tagged)])
+
+    def test_tampered_cursors_are_404(self):
+        created_at = self.posts[0].created_at.isoformat()
+        for value in [
+            'not base64!',
+            base64.urlsafe_b64encode(b'not json').decode(),
+            cursor({'created_at': created_at}),
+            cursor([created_at]),
+            cursor([created_at, 1, 2]),
+            cursor(['yesterday', 1]),
+            cursor([created_at, 'one']),
+            cursor([None, 1]),
+        ]:
+            with self.subTest(cursor=value):
+                self.assertEqual(self.client.get('/api/posts/', {'cursor': value}).status_code, 404)
+
+    def test_encode_position_round_trips(self):
+        post = self.posts[2]
+        encoded = KeysetPagination.encode_position([post.created_at, post.pk])
+        response = self.client.get('/api/posts/', {'cursor': encoded})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.posts[1].pk, self.posts[0].pk])
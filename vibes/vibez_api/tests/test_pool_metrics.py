@@ -0,0 +1,53 @@
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from vibes import db
+
+
+def pooled(pool):
+    return mock.Mock(pool=pool)
+
+
+class PoolMetricsTests(SimpleTestCase):
+    def patch(self, databases, connections):
+        for name, value in [('settings', mock.Mock(DATABASES=databases)), ('connections', connections)]:
+            patcher = mock.patch.object(db, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_only_open_pools_are_read(self):
+        stats = {'pool_size': 4, 'pool_available': 1}
+        self.patch(
+            {'default': {'OPTIONS': {'pool': True}}, 'replica': {'OPTIONS': {'pool': True}}, 'plain': {}},
+            {'default': pooled(mock.Mock(get_stats=lambda: stats)), 'replica': pooled(None),
+             'plain': pooled(mock.Mock())},
+        )
+        self.assertEqual(list(db.pool_stats()), [('default', stats)])
+
+    def test_observations_are_labelled_by_alias(self):
+        self.patch(
+            {'default': {'OPTIONS': {'pool': True}}},
+            {'default': pooled(mock.Mock(get_stats=lambda: {'pool_size': 4, 'pool_available': 1}))},
+        )
+        [observation] = db.observe(lambda stats: stats['pool_size'] - stats['pool_available'])(None)
+        self.assertEqual((observation.value, observation.attributes), (3, {'db.alias': 'default'}))
+
+
+@skipUnless(connection.vendor == 'postgresql', "connection pools need psycopg 3")
+class PsycopgPoolStatsTests(SimpleTestCase):
+    def test_the_gauges_read_the_keys_psycopg_pool_reports(self):
+        from psycopg_pool import ConnectionPool
+
+        pool = ConnectionPool(kwargs=connection.get_connection_params(), min_size=2, max_size=2, open=True)
+        self.addCleanup(pool.close)
+        pool.wait()
+        reads = {
+            'in use': lambda stats: stats.get('pool_size', 0) - stats.get('pool_available', 0),
+            'idle': lambda stats: stats.get('pool_available', 0),
+        }
+        with mock.patch.object(db, 'pool_stats', lambda: [('default', pool.get_stats())]):
+            with pool.connection():
+                readings = {name: db.observe(read)(None)[0].value for name, read in reads.items()}
+        self.assertEqual(readings, {'in use': 1, 'idle': 1})
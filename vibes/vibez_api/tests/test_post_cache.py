@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from vibez_api.posts.cache import post_cache, render_post
+from vibez_api.posts.models import Comment, CommentMedia, Like, Post, PostMedia
+
+
+class PostCacheTests(APITestCase):
+    def setUp(self):
+        post_cache().clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.post = Post.objects.create(user=self.user, content='post')
+        self.client.force_authenticate(self.user)
+
+    def cached(self):
+        """The cached representation, or None if rendering it had to hit the database."""
+        with CaptureQueriesContext(connection) as queries:
+            data = render_post(self.post)
+        return None if queries else data
+
+    def assertInvalidatedBy(self, change):
+        render_post(self.post)
+        self.assertIsNotNone(self.cached())
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertIsNone(self.cached())
+
+    def test_second_render_is_served_from_the_cache(self):
+        first = render_post(self.post)
+        self.assertEqual(self.cached(), first)
+
+    def test_editing_the_post(self):
+        self.assertInvalidatedBy(
+            lambda: self.client.patch(f'/api/posts/{self.post.pk}/', {'content': 'edited'}, format='json')
+        )
+        self.assertEqual(render_post(self.post)['content'], 'edited')
+
+    def test_commenting(self):
+        self.assertInvalidatedBy(
+            lambda: self.client.post(f'/api/posts/{self.post.pk}/comment/', {'content': 'hi'}, format='json')
+        )
+
+    def test_deleting_a_comment(self):
+        comment = Comment.objects.create(user=self.user, post=self.post, content='hi')
+        self.assertInvalidatedBy(lambda: self.client.delete(f'/api/comments/{comment.pk}/comment/'))
+        self.assertEqual(render_post(self.post)['comments'], [])
+
+    def test_liking_the_post_or_a_comment(self):
+        comment = Comment.objects.create(user=self.user, post=self.post, content='hi')
+        self.assertInvalidatedBy(lambda: self.client.put(f'/api/posts/{self.post.pk}/like/'))
+        self.assertInvalidatedBy(lambda: self.client.put(f'/api/posts/comment/{comment.pk}/like/'))
+
+    def test_deleting_a_post_does_not_visit_its_children_one_by_one(self):
+        def delete_queries(children):
+            post = Post.objects.create(user=self.user, content='busy')
+            for index in range(children):
+                PostMedia.objects.create(post=post, media_type='image', status='ready')
+                comment = Comment.objects.create(user=self.user, post=post, content=f'comment {index}')
+                CommentMedia.objects.create(comment=comment, media_type='image', status='ready')
+                Like.objects.create(user=self.user, comment=comment)
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            return len(queries)
+
+        self.assertEqual(delete_queries(1), delete_queries(10))
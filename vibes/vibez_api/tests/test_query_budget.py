@@ -0,0 +1,71 @@
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from vibes import middleware
+from vibes.middleware import RequestCounterMiddleware, query_budget
+from vibez_api.posts.models import Post
+
+
+@override_settings(QUERY_BUDGET_DEFAULT=30, QUERY_BUDGETS={'post-detail': 10, 'PATCH post-detail': 6})
+class QueryBudgetLookupTests(SimpleTestCase):
+    def test_bare_names_cover_reads_only(self):
+        self.assertEqual(query_budget('GET', 'post-detail'), 10)
+        self.assertEqual(query_budget('HEAD', 'post-detail'), 10)
+        self.assertEqual(query_budget('DELETE', 'post-detail'), 30)
+
+    def test_method_prefixed_names_and_the_default(self):
+        self.assertEqual(query_budget('PATCH', 'post-detail'), 6)
+        self.assertEqual(query_budget('GET', 'unmatched'), 30)
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.client.force_authenticate(self.user)
+        Post.objects.create(user=self.user, content='post')
+        for name in ['query_count', 'budget_exceeded']:
+            patcher = mock.patch.object(middleware, name)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def test_every_query_of_the_request_is_counted(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/posts/')
+        count, attributes = self.query_count.record.call_args.args
+        self.assertEqual(count, len(queries))
+        self.assertEqual(attributes, {'http.route': 'post-list', 'http.request.method': 'GET',
+                                      'http.status_class': '2xx'})
+
+    def test_requests_within_budget_are_quiet(self):
+        with self.assertNoLogs('vibes.middleware', 'WARNING'):
+            self.client.get('/api/posts/')
+        self.budget_exceeded.add.assert_not_called()
+
+    @override_settings(QUERY_BUDGETS={'post-list': 1})
+    def test_requests_over_budget_are_logged_and_counted(self):
+        with self.assertLogs('vibes.middleware', 'WARNING') as logs:
+            self.client.get('/api/posts/')
+        self.assertEqual(logs.records[0].route, 'post-list')
+        self.assertEqual(logs.records[0].budget, 1)
+        self.budget_exceeded.add.assert_called_once()
+
+
+class AsyncRequestMetricsTests(TestCase):
+    @override_settings(QUERY_BUDGET_DEFAULT=1)
+    async def test_queries_run_by_async_views_are_counted(self):
+        async def view(request):
+            await Post.objects.acount()
+            await sync_to_async(list)(Post.objects.all())
+            return HttpResponse()
+
+        with mock.patch.object(middleware, 'query_count') as query_count, \
+                self.assertLogs('vibes.middleware', 'WARNING'):
+            await RequestCounterMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(query_count.record.call_args.args[0], 2)
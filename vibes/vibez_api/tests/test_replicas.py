@@ -0,0 +1,149 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from vibez_api import replicas
+from vibez_api.posts.models import Post
+from vibez_api.replicas import ReplicaMiddleware, ReplicaRouter, choose_replica, primary, reads_from
+from vibez_api.users import views as user_views
+
+REPLICAS = {'replica_0': 1.0, 'replica_1': 1.0}
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    # Not TestCase: its wrapping transaction would keep every read on the primary
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_outside_a_request_reads_go_to_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_reads_go_to_the_chosen_replica(self):
+        with reads_from('replica_0'):
+            self.assertEqual(self.router.db_for_read(Post), 'replica_0')
+            with primary():
+                self.assertEqual(self.router.db_for_read(Post), DEFAULT_DB_ALIAS)
+            self.assertEqual(self.router.db_for_read(Post), 'replica_0')
+
+    def test_reads_inside_a_transaction_stay_on_the_primary(self):
+        with reads_from('replica_0'), transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_writes_go_to_the_primary(self):
+        with reads_from('replica_0'):
+            self.assertEqual(self.router.db_for_write(Post), DEFAULT_DB_ALIAS)
+
+
+@override_settings(DATABASE_REPLICA_WEIGHTS=REPLICAS, REPLICA_MAX_LAG=2)
+class ChooseReplicaTests(SimpleTestCase):
+    def lags(self, **lags):
+        return mock.patch.object(replicas.lag_monitor, 'lag', side_effect=lambda alias: lags[alias])
+
+    def test_lagging_and_unreachable_replicas_are_skipped(self):
+        with self.lags(replica_0=5.0, replica_1=0.5):
+            self.assertEqual({choose_replica() for _ in range(20)}, {'replica_1'})
+        with self.lags(replica_0=None, replica_1=0.0):
+            self.assertEqual(choose_replica(), 'replica_1')
+
+    def test_none_when_no_replica_is_fresh(self):
+        with self.lags(replica_0=5.0, replica_1=None):
+            self.assertIsNone(choose_replica())
+
+
+@override_settings(DATABASE_REPLICA_WEIGHTS=REPLICAS, READ_YOUR_WRITES_SECONDS=5)
+class ReplicaMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.factory = RequestFactory(HTTP_AUTHORIZATION='Token abc')
+        self.seen = []
+        patcher = mock.patch.object(replicas, 'choose_replica', return_value='replica_1')
+        self.choose_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def view(self, status=200):
+        def get_response(request):
+            self.seen.append(ReplicaRouter().db_for_read(Post))
+            return HttpResponse(status=status)
+        return get_response
+
+    def test_a_get_chooses_its_replica_once(self):
+        ReplicaMiddleware(self.view())(self.factory.get('/'))
+        self.assertEqual(self.seen, ['replica_1'])
+        self.choose_replica.assert_called_once_with()
+
+    def test_a_write_pins_the_client_to_the_primary(self):
+        ReplicaMiddleware(self.view())(self.factory.post('/'))
+        ReplicaMiddleware(self.view())(self.factory.get('/'))
+        self.assertEqual(self.seen, [DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS])
+        self.choose_replica.assert_not_called()
+
+        other_client = RequestFactory(HTTP_AUTHORIZATION='Token xyz')
+        ReplicaMiddleware(self.view())(other_client.get('/'))
+        self.assertEqual(self.seen[-1], 'replica_1')
+
+    def test_the_token_scheme_does_not_matter(self):
+        ReplicaMiddleware(self.view())(self.factory.post('/'))
+        ReplicaMiddleware(self.view())(RequestFactory(HTTP_AUTHORIZATION='Bearer abc').get('/'))
+        self.assertEqual(self.seen[-1], DEFAULT_DB_ALIAS)
+
+    def test_a_session_started_by_the_write_is_pinned(self):
+        def log_in(request):
+            response = HttpResponse()
+            response.set_cookie(settings.SESSION_COOKIE_NAME, 'new-session')
+            return response
+
+        ReplicaMiddleware(log_in)(RequestFactory().post('/'))
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = 'new-session'
+        ReplicaMiddleware(self.view())(request)
+        self.assertEqual(self.seen, [DEFAULT_DB_ALIAS])
+
+    def test_a_failed_write_does_not_pin(self):
+        ReplicaMiddleware(self.view(status=400))(self.factory.post('/'))
+        ReplicaMiddleware(self.view())(self.factory.get('/'))
+        self.assertEqual(self.seen[-1], 'replica_1')
+
+    def test_async_requests_pin_and_choose_the_same_way(self):
+        def async_view(status=200):
+            async def get_response(request):
+                self.seen.append(ReplicaRouter().db_for_read(Post))
+                return HttpResponse(status=status)
+            return get_response
+
+        async_to_sync(ReplicaMiddleware(async_view()))(self.factory.get('/'))
+        async_to_sync(ReplicaMiddleware(async_view()))(self.factory.post('/'))
+        async_to_sync(ReplicaMiddleware(async_view()))(self.factory.get('/'))
+        self.assertEqual(self.seen, ['replica_1', DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS])
+
+
+@override_settings(DATABASE_REPLICA_WEIGHTS=REPLICAS, READ_YOUR_WRITES_SECONDS=5)
+class IssuedTokenTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        # Hash on this thread rather than the auth pool's
+        patcher = mock.patch.object(user_views, 'run_hashing', lambda func, *args: sync_to_async(func)(*args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pinned(self, token):
+        # The test transaction keeps every read on the primary, so look at whether a replica was chosen
+        with mock.patch.object(replicas, 'choose_replica', return_value='replica_1') as choose_replica:
+            request = RequestFactory(HTTP_AUTHORIZATION=f'Token {token}').get('/')
+            ReplicaMiddleware(lambda request: HttpResponse())(request)
+        return not choose_replica.called
+
+    def test_signup_and_login_pin_the_token_they_hand_out(self):
+        response = self.client.post(
+            '/api/auth/signup/', {'username': 'alice', 'email': 'alice@example.com', 'password': 'pw12345!'},
+        )
+        self.assertTrue(self.pinned(response.json()['token']))
+
+        caches['shared'].clear()
+        response = self.client.post('/api/auth/login/', {'username': 'alice', 'password': 'pw12345!'})
+        self.assertTrue(self.pinned(response.json()['token']))
+        self.assertFalse(self.pinned('someone-else'))
@@ -0,0 +1,89 @@
+import base64
+import json
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from vibez_api.posts.hashtags import set_post_hashtags
+from vibez_api.posts.models import Post
+from vibez_api.posts.search import get_engine
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.other = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        self.client.force_authenticate(self.user)
+
+    def post(self, content, user=None):
+        return Post.objects.create(user=user or self.user, content=content)
+
+    def search(self, **params):
+        response = self.client.get('/api/posts/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_matches_stemmed_words_best_first(self):
+        once = self.post('a dog went running in the park')
+        twice = self.post('dogs running, dog running')
+        self.post('cats sleeping')
+        self.assertEqual(self.search(q='dog runs'), [twice.pk, once.pk])
+
+    def test_edits_and_deletes_are_picked_up(self):
+        post = self.post('sunny beach')
+        post.content = 'rainy mountain'
+        post.save()
+        self.assertEqual(self.search(q='beach'), [])
+        self.assertEqual(self.search(q='mountain'), [post.pk])
+
+        post.delete()
+        self.assertEqual(self.search(q='mountain'), [])
+
+    def test_bulk_updates_are_picked_up(self):
+        post = self.post('old words')
+        Post.objects.filter(pk=post.pk).update(content='fresh words')
+        get_engine().index_many([post.pk])
+        self.assertEqual(self.search(q='fresh'), [post.pk])
+
+    def test_filters_by_hashtag_and_author(self):
+        tagged = self.post('summer trip #travel')
+        set_post_hashtags(tagged, tagged.content, self.user, created=True)
+        untagged = self.post('summer trip')
+        theirs = self.post('summer trip', self.other)
+
+        self.assertEqual(self.search(q='summer', hashtag='#Travel'), [tagged.pk])
+        self.assertEqual(self.search(q='summer', author=self.other.pk), [theirs.pk])
+        self.assertCountEqual(self.search(q='summer', author=self.user.pk), [tagged.pk, untagged.pk])
+
+    def test_pages_cover_every_match_once(self):
+        posts = [self.post(' '.join(['word'] * (index + 1))) for index in range(5)]
+        ids, url = [], '/api/posts/search/?q=word&page_size=2'
+        while url:
+            response = self.client.get(url)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        self.assertCountEqual(ids, [post.pk for post in posts])
+        self.assertEqual(len(ids), 5)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': ' '}).status_code, 400)
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': 'x', 'author': 'bob'}).status_code, 400)
+
+    def test_search_cursor_rank_must_be_a_number(self):
+        response = self.client.get('/api/posts/search/', {'q': 'post', 'cursor': cursor(['high', 1])})
+        self.assertEqual(response.status_code, 404)
+
+    @skipUnless(connection.vendor == 'postgresql', "search_vector is only kept on PostgreSQL")
+    def test_the_vector_is_written_by_the_same_statement_as_the_content(self):
+        with self.assertNumQueries(1):
+            post = Post.objects.create(user=self.user, content='quiet lake')
+        post.content = 'loud city'
+        with self.assertNumQueries(1):
+            post.save()
+        self.assertIn("'citi'", Post.objects.filter(pk=post.pk).values_list('search_vector', flat=True).get())
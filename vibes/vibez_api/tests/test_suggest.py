@@ -0,0 +1,102 @@
+import asyncio
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from rest_framework.test import APITestCase
+
+from vibez_api.posts import suggest
+from vibez_api.posts.hashtags import set_post_hashtags
+from vibez_api.posts.models import HashTag, Post
+from vibez_api.posts.suggest import HashtagIndex
+
+
+def forget_index(test):
+    suggest._index = None
+    test.addCleanup(setattr, suggest, '_index', None)
+
+
+class HashtagIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = HashtagIndex(depth=2)
+        for name, uses in [('music', 5), ('museum', 4), ('mug', 3), ('art', 1)]:
+            self.index.add(name, uses)
+
+    def test_each_prefix_keeps_its_heaviest_names(self):
+        self.assertEqual(self.index.suggest('mu', 10), [('music', 5), ('museum', 4)])
+        self.assertEqual(self.index.suggest('mus', 1), [('music', 5)])
+        self.assertEqual(self.index.suggest('mug', 10), [('mug', 3)])
+        self.assertEqual(self.index.suggest('x', 10), [])
+
+    def test_changing_weights_reorders_the_prefix(self):
+        self.index.add('music', -2)
+        self.assertEqual(self.index.suggest('mu', 10), [('museum', 4), ('music', 3)])
+        self.index.add('mug', 3)
+        self.assertEqual(self.index.suggest('mu', 10), [('mug', 6), ('museum', 4)])
+
+
+class LoadIndexTests(TestCase):
+    def setUp(self):
+        forget_index(self)
+        user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        for content in ['#beach #bees', '#beach', '#bed']:
+            set_post_hashtags(Post.objects.create(user=user, content=content), content, user, created=True)
+
+    def test_weights_come_from_how_many_posts_use_each_tag(self):
+        self.assertEqual(suggest.suggest('#BE', 10), [('beach', 2), ('bed', 1), ('bees', 1)])
+
+    def test_tagging_and_deleting_posts_moves_the_weights(self):
+        suggest.get_index()
+        user = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        post = Post.objects.create(user=user, content='#bees #beetle')
+        with self.captureOnCommitCallbacks(execute=True):
+            set_post_hashtags(post, post.content, user, created=True)
+        self.assertEqual(suggest.suggest('bee', 10), [('bees', 2), ('beetle', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_post_hashtags(post, '#beetle', user)
+        self.assertEqual(suggest.suggest('bee', 10), [('bees', 1), ('beetle', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.assertEqual(suggest.suggest('bee', 10), [('bees', 1), ('beetle', 0)])
+
+    def test_posts_deleted_with_their_author_are_taken_off(self):
+        suggest.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(username='alice').delete()
+        self.assertEqual(suggest.suggest('be', 10), [('beach', 0), ('bed', 0), ('bees', 0)])
+
+
+class BuildIndexTests(TransactionTestCase):
+    def setUp(self):
+        forget_index(self)
+        HashTag.objects.create(name='sunset')
+
+    def test_built_before_any_request(self):
+        suggest.build_index()
+        self.assertTrue(suggest.loaded())
+        self.assertFalse(suggest._reloading.locked())
+
+    def test_inside_an_event_loop_it_is_built_on_a_thread_that_early_lookups_wait_for(self):
+        async def start_server():
+            suggest.build_index()
+
+        asyncio.run(start_server())
+        self.assertEqual(suggest.suggest('sun', 10), [('sunset', 0)])
+        self.assertFalse(suggest._reloading.locked())
+
+
+class SuggestApiTests(APITestCase):
+    def setUp(self):
+        forget_index(self)
+        self.client.force_authenticate(User.objects.create_user('alice', 'alice@example.com', 'pw'))
+        for name in ['cats', 'catalog', 'dogs']:
+            HashTag.objects.create(name=name)
+
+    def test_results_and_limit(self):
+        response = self.client.get('/api/hashtags/suggest/', {'q': '#Cat', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [{'name': 'catalog', 'count': 0}])
+
+    def test_empty_prefix(self):
+        self.assertEqual(self.client.get('/api/hashtags/suggest/', {'q': '#'}).data['results'], [])
@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.urls import resolve
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import NonRecordingSpan, SpanContext, StatusCode, TraceFlags
+
+from vibes import telemetry
+from vibes.telemetry import ERROR_SAMPLED, ErrorAwareSampler, record_failed_request
+
+
+class TelemetryTests(SimpleTestCase):
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.provider = TracerProvider(sampler=ErrorAwareSampler(0))
+        self.provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        patcher = mock.patch.object(telemetry.trace, 'get_tracer', self.provider.get_tracer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, path='/api/posts/'):
+        request = RequestFactory().get(path)
+        request.resolver_match = resolve(path)
+        request._otel_start_time = 1700000000.0
+        return request
+
+    def test_spans_that_lose_the_draw_are_not_recorded(self):
+        span = self.provider.get_tracer(__name__).start_span('GET api/posts/')
+        self.assertFalse(span.is_recording())
+        span.end()
+        self.assertEqual(self.exporter.get_finished_spans(), ())
+
+    def test_error_spans_are_always_sampled(self):
+        sampled = self.provider.get_tracer(__name__).start_span('GET api/posts/', attributes={ERROR_SAMPLED: True})
+        self.assertTrue(sampled.get_span_context().trace_flags.sampled)
+
+    def test_an_unsampled_failed_request_exports_one_span_in_its_trace(self):
+        dropped = NonRecordingSpan(SpanContext(0xabc, 0xdef, False, TraceFlags(TraceFlags.DEFAULT)))
+        record_failed_request(dropped, self.request(), HttpResponse(status=503))
+
+        [span] = self.exporter.get_finished_spans()
+        self.assertEqual(span.name, 'GET api/posts/')
+        self.assertEqual((span.context.trace_id, span.parent.span_id), (0xabc, 0xdef))
+        self.assertIs(span.status.status_code, StatusCode.ERROR)
+        self.assertEqual(span.attributes['http.status_code'], 503)
+        self.assertEqual(span.attributes['http.route'], 'api/posts/')
+        self.assertEqual(span.start_time, 1700000000 * 10**9)
+
+    def test_successes_and_recorded_spans_are_left_alone(self):
+        dropped = NonRecordingSpan(SpanContext(0xabc, 0xdef, False, TraceFlags(TraceFlags.DEFAULT)))
+        record_failed_request(dropped, self.request(), HttpResponse(status=404))
+        sampled = self.provider.get_tracer(__name__).start_span('sampled', attributes={ERROR_SAMPLED: True})
+        record_failed_request(sampled, self.request(), HttpResponse(status=500))
+        sampled.end()
+        self.assertEqual([span.name for span in self.exporter.get_finished_spans()], ['sampled'])
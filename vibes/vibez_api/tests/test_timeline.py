@@ -0,0 +1,123 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from vibez_api.posts import timeline
+from vibez_api.posts.models import Post, TimelineEntry, TimelineJob
+from vibez_api.posts.timeline import process_jobs
+
+
+@override_settings(TIMELINE_WORKER_IN_PROCESS=False, TIMELINE_FANOUT_LIMIT=2, TIMELINE_BACKFILL=2)
+class TimelineTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.readers = [User.objects.create_user(f'reader{index}', f'reader{index}@example.com', 'pw')
+                        for index in range(3)]
+
+    def as_user(self, user):
+        self.client.force_authenticate(user)
+        return self.client
+
+    def follow(self, reader, author=None):
+        response = self.as_user(reader).post(f'/api/auth/users/{(author or self.author).pk}/follow/')
+        self.assertEqual(response.status_code, 201)
+
+    def unfollow(self, reader):
+        self.assertEqual(self.as_user(reader).delete(f'/api/auth/users/{self.author.pk}/follow/').status_code, 200)
+
+    def publish(self, content='post'):
+        response = self.as_user(self.author).post('/api/posts/', {'content': content}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def timeline(self, user):
+        response = self.as_user(user).get('/api/timeline/')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_new_posts_reach_followers_once_the_job_runs(self):
+        reader = self.readers[0]
+        self.follow(reader)
+        process_jobs()
+        post = self.publish()
+
+        self.assertEqual(self.timeline(self.author), [post])
+        self.assertEqual(self.timeline(reader), [])
+        self.assertEqual(process_jobs(), 1)
+        self.assertEqual(self.timeline(reader), [post])
+        self.assertFalse(TimelineJob.objects.exists())
+
+    def test_following_queues_a_backfill_of_recent_posts(self):
+        _, *recent = [self.publish(f'post {index}') for index in range(3)]
+        process_jobs()
+        reader = self.readers[0]
+        self.follow(reader)
+
+        self.assertEqual(self.timeline(reader), [])
+        self.assertEqual(list(TimelineJob.objects.values_list('kind', 'follower_id')), [('follow', reader.pk)])
+        process_jobs()
+        self.assertEqual(self.timeline(reader), recent[::-1])
+
+    def test_a_backfill_queued_before_an_unfollow_does_nothing(self):
+        self.publish()
+        process_jobs()
+        reader = self.readers[0]
+        self.follow(reader)
+        self.unfollow(reader)
+        process_jobs()
+        self.assertFalse(TimelineEntry.objects.filter(user=reader).exists())
+
+    def test_widely_followed_authors_are_pulled_at_read_time(self):
+        for reader in self.readers:
+            self.follow(reader)
+        process_jobs()
+        post = self.publish()
+        process_jobs()
+
+        self.assertFalse(TimelineEntry.objects.filter(user__in=self.readers).exists())
+        self.assertEqual(self.timeline(self.readers[0]), [post])
+
+    def test_dropping_back_to_the_limit_pushes_the_author_again(self):
+        for reader in self.readers:
+            self.follow(reader)
+        post = self.publish()
+        process_jobs()
+
+        self.unfollow(self.readers[2])
+        self.assertEqual(list(TimelineJob.objects.values_list('kind', flat=True)), ['author'])
+        process_jobs()
+        for reader in self.readers[:2]:
+            self.assertTrue(TimelineEntry.objects.filter(user=reader, post_id=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(user=self.readers[2]).exists())
+
+    @override_settings(TIMELINE_JOB_MAX_ATTEMPTS=2)
+    def test_failing_jobs_are_retried_then_dropped(self):
+        self.publish()
+        with mock.patch.object(timeline, 'run_job', side_effect=RuntimeError('boom')):
+            self.assertEqual(process_jobs(), 0)
+            self.assertEqual(TimelineJob.objects.get().attempts, 1)
+            self.assertEqual(process_jobs(), 0)
+        self.assertFalse(TimelineJob.objects.exists())
+
+    def test_a_failed_job_is_run_again(self):
+        reader = self.readers[0]
+        self.follow(reader)
+        process_jobs()
+        self.publish()
+        with mock.patch.object(timeline, '_push', side_effect=RuntimeError('boom')):
+            process_jobs()
+        self.assertFalse(TimelineEntry.objects.filter(user=reader).exists())
+        process_jobs()
+        self.assertTrue(TimelineEntry.objects.filter(user=reader).exists())
+
+    def test_command_runs_one_batch(self):
+        self.follow(self.readers[0])
+        self.publish()
+        out = StringIO()
+        call_command('run_timeline_worker', '--once', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Ran 2 timeline job(s)')
+        self.assertEqual(Post.objects.count(), TimelineEntry.objects.filter(user=self.readers[0]).count())
@@ -0,0 +1,119 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from vibez_api.posts import trending
+from vibez_api.posts.models import HashTag, HashTagBucket
+from vibez_api.posts.trending import compute_trending, get_trending, record_usage, trending_cache
+
+
+class TrendingTestCase(TestCase):
+    def setUp(self):
+        trending_cache().clear()
+        self.now = timezone.now()
+        self.tags = {name: HashTag.objects.create(name=name) for name in ('steady', 'rising', 'quiet', 'old')}
+
+    def use(self, name, times, ago=timedelta()):
+        for _ in range(times):
+            record_usage([self.tags[name].pk], self.now - ago)
+
+
+@override_settings(TRENDING_BUCKET_SECONDS=60, TRENDING_TOP_K=2)
+class ComputeTrendingTests(TrendingTestCase):
+    def test_usage_is_counted_per_bucket(self):
+        self.use('steady', 3)
+        self.use('steady', 2, timedelta(minutes=5))
+        self.assertEqual(
+            sorted(HashTagBucket.objects.filter(hashtag=self.tags['steady']).values_list('count', flat=True)), [2, 3]
+        )
+
+    def test_growth_outranks_volume_and_only_the_top_k_are_kept(self):
+        self.use('steady', 6)
+        self.use('steady', 6, timedelta(minutes=90))
+        self.use('rising', 5)
+        self.use('quiet', 1)
+        self.use('old', 9, timedelta(minutes=90))
+
+        results = compute_trending('1h', self.now)['results']
+
+        self.assertEqual([item['name'] for item in results], ['rising', 'steady'])
+        self.assertEqual((results[0]['count'], results[0]['previous_count']), (5, 0))
+        self.assertEqual((results[1]['count'], results[1]['previous_count']), (6, 6))
+
+    def test_windows_only_count_their_own_span(self):
+        self.use('old', 4, timedelta(hours=3))
+        self.assertEqual(compute_trending('1h', self.now)['results'], [])
+        self.assertEqual([item['name'] for item in compute_trending('24h', self.now)['results']], ['old'])
+
+
+@override_settings(TRENDING_REFRESH_SECONDS=60)
+class GetTrendingTests(TrendingTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(trending, 'wake_workers')
+        self.wake_workers = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.use('steady', 1)
+
+    def test_a_window_with_no_snapshot_is_computed_inline(self):
+        snapshot = get_trending('1h')
+        self.assertEqual([item['name'] for item in snapshot['results']], ['steady'])
+        self.assertEqual(trending_cache().get('trending:1h'), snapshot)
+        self.wake_workers.assert_not_called()
+
+    def test_a_stale_snapshot_is_served_without_querying_and_the_refresher_woken(self):
+        snapshot = get_trending('1h')
+        trending_cache().delete('trending:1h:fresh')
+        self.use('rising', 5)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_trending('1h'), snapshot)
+        self.wake_workers.assert_called_once_with()
+
+    def test_a_fresh_snapshot_leaves_the_refresher_alone(self):
+        get_trending('1h')
+        get_trending('1h')
+        self.wake_workers.assert_not_called()
+
+    def test_the_refresher_replaces_every_window(self):
+        for window in trending.WINDOWS:
+            get_trending(window)
+        self.use('rising', 5)
+
+        trending.TrendingWorker(poll_interval=60).process()
+
+        for window in trending.WINDOWS:
+            self.assertEqual(get_trending(window)['results'][0]['name'], 'rising')
+
+    def test_command_refreshes_and_prunes(self):
+        self.use('old', 1, timedelta(days=30))
+        out = StringIO()
+        call_command('compute_trending', '--prune', stdout=out)
+        self.assertIn('Pruned 1 bucket(s)', out.getvalue())
+        self.assertIn('7d: 1 tags (#steady)', out.getvalue())
+        self.assertTrue(trending_cache().get('trending:7d:fresh'))
+
+
+class TrendingApiTests(APITestCase):
+    def setUp(self):
+        trending_cache().clear()
+        self.client.force_authenticate(User.objects.create_user('alice', 'alice@example.com', 'pw'))
+        for name, times in [('one', 1), ('two', 2), ('three', 3)]:
+            hashtag = HashTag.objects.create(name=name)
+            for _ in range(times):
+                record_usage([hashtag.pk])
+
+    def test_limit_and_window(self):
+        response = self.client.get('/api/hashtags/trending/', {'window': '1h', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['window'], '1h')
+        self.assertEqual([item['name'] for item in response.data['results']], ['three', 'two'])
+
+    def test_unknown_window_is_rejected(self):
+        self.assertEqual(self.client.get('/api/hashtags/trending/', {'window': '1y'}).status_code, 400)
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from vibez_api import uploads
+from vibez_api.uploads import LocalStorage, StorageBackend, StoredFile, UploadError, upload_files
+
+
+class FakeStorage(StorageBackend):
+    """Files are names; 'slow:<seconds>:<name>' sleeps first and 'bad:<name>' raises."""
+
+    def __init__(self):
+        self.deleted = []
+        self.all_deleted = threading.Condition()
+
+    def upload(self, file, timeout=None):
+        if file.startswith('bad:'):
+            raise OSError(f'cannot upload {file}')
+        if file.startswith('slow:'):
+            time.sleep(float(file.split(':')[1]))
+        return StoredFile(f'https://cdn.example.com/{file}', file, 'image')
+
+    def delete(self, stored):
+        with self.all_deleted:
+            self.deleted.append(stored.key)
+            self.all_deleted.notify_all()
+
+    def wait_for_deletes(self, count):
+        with self.all_deleted:
+            self.all_deleted.wait_for(lambda: len(self.deleted) >= count, timeout=5)
+        return sorted(self.deleted)
+
+
+class UploadFilesTests(SimpleTestCase):
+    def setUp(self):
+        self.storage = FakeStorage()
+        executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(executor.shutdown)
+        for name, value in [('get_storage', lambda: self.storage), ('get_executor', lambda: executor)]:
+            patcher = mock.patch.object(uploads, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_results_come_back_in_order(self):
+        files = ['slow:0.2:a', 'b', 'slow:0.1:c']
+        self.assertEqual([stored.key for stored in upload_files(files, timeout=5)], files)
+
+    def test_files_upload_concurrently(self):
+        started = time.monotonic()
+        upload_files([f'slow:0.3:{name}' for name in 'abcd'], timeout=5)
+        self.assertLess(time.monotonic() - started, 0.9)
+
+    def test_one_failure_removes_the_files_that_made_it(self):
+        with self.assertRaisesRegex(UploadError, 'cannot upload bad:b'):
+            upload_files(['a', 'bad:b', 'slow:0.2:c'], timeout=5)
+        self.assertEqual(self.storage.wait_for_deletes(2), ['a', 'slow:0.2:c'])
+
+    def test_uploads_running_past_the_timeout_are_abandoned_and_removed_later(self):
+        started = time.monotonic()
+        with self.assertRaisesRegex(UploadError, r'1 upload\(s\) timed out after 0.2s'):
+            upload_files(['a', 'slow:0.6:b'], timeout=0.2)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(self.storage.wait_for_deletes(2), ['a', 'slow:0.6:b'])
+
+    def test_waiting_for_an_upload_thread_does_not_count_against_the_timeout(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        with mock.patch.object(uploads, 'get_executor', lambda: executor):
+            stored = upload_files([f'slow:0.15:{name}' for name in 'abc'], timeout=0.3)
+        self.assertEqual(len(stored), 3)
+
+
+class LocalStorageTests(SimpleTestCase):
+    def test_copies_under_media_root_and_deletes(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            MEDIA_ROOT=root, MEDIA_BASE_URL='http://media.example.com/'
+        ):
+            source = os.path.join(root, 'photo.PNG')
+            with open(source, 'wb') as out:
+                out.write(b'png')
+
+            stored = LocalStorage().upload(source)
+
+            self.assertTrue(stored.url.startswith('http://media.example.com/'))
+            self.assertTrue(stored.url.endswith('.png'))
+            with open(stored.key, 'rb') as copied:
+                self.assertEqual(copied.read(), b'png')
+            LocalStorage().delete(stored)
+            self.assertFalse(os.path.exists(stored.key))
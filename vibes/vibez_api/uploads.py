@@ -1,9 +1,20 @@
+import time
 import uuid
+import shutil
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from pathlib import Path
+from urllib.parse import urljoin
+
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
 
 import os
+from django.conf import settings
+from django.utils.module_loading import import_string
 from dotenv import  load_dotenv
 load_dotenv()
 
@@ -14,10 +25,153 @@ cloudinary.config(
     secure=True
 )
 
-def upload_file(file):
-    if file:
-        upload_result = cloudinary.uploader.upload(file, public_id=str(uuid.uuid4()))
-        return upload_result.get('secure_url')
-    return None
+logger = logging.getLogger(__name__)
+
+StoredFile = namedtuple('StoredFile', ['url', 'key', 'resource_type'])
+
+
+class UploadError(Exception):
+    pass
+
+
+class StorageBackend:
+    """Where media files end up. Subclasses upload a local file or file object and can delete it again."""
+
+    def upload(self, file, timeout=None):
+        raise NotImplementedError
+
+    def delete(self, stored):
+        raise NotImplementedError
+
+
+class CloudinaryStorage(StorageBackend):
+
+    def upload(self, file, timeout=None):
+        upload_result = cloudinary.uploader.upload(
+            file, public_id=str(uuid.uuid4()), resource_type='auto', timeout=timeout
+        )
+        return StoredFile(upload_result.get('secure_url'), upload_result.get('public_id'), upload_result.get('resource_type'))
+
+    def delete(self, stored):
+        cloudinary.uploader.destroy(stored.key, resource_type=stored.resource_type or 'image')
+
+
+class LocalStorage(StorageBackend):
+    """Offline stand-in for Cloudinary: files are copied under MEDIA_ROOT."""
+
+    def upload(self, file, timeout=None):
+        source = Path(file if isinstance(file, (str, Path)) else file.name)
+        name = f"{uuid.uuid4()}{source.suffix.lower()}"
+        destination = Path(settings.MEDIA_ROOT) / name
+        destination.parent.mkdir(parents=True, exist_ok=True)
+
+        if isinstance(file, (str, Path)):
+            shutil.copyfile(file, destination)
+        else:
+            with open(destination, 'wb') as out:
+                for chunk in file.chunks():
+                    out.write(chunk)
+        return StoredFile(urljoin(settings.MEDIA_BASE_URL, name), str(destination), None)
+
+    def delete(self, stored):
+        try:
+            os.remove(stored.key)
+        except FileNotFoundError:
+            pass
+
+
+STORAGE_BACKENDS = {
+    'cloudinary': CloudinaryStorage,
+    'local': LocalStorage,
+}
+
+_storage = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        backend = settings.MEDIA_STORAGE_BACKEND
+        backend_class = STORAGE_BACKENDS.get(backend) or import_string(backend)
+        _storage = backend_class()
+    return _storage
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.MEDIA_UPLOAD_CONCURRENCY, thread_name_prefix='media-upload')
+    return _executor
+
+
+class Upload:
+    """One file's upload. Its timeout runs from when a worker starts it, not from when it was queued."""
+
+    def __init__(self, storage, file, timeout):
+        self.storage = storage
+        self.file = file
+        self.timeout = timeout
+        self.started = None
+
+    def __call__(self):
+        self.started = time.monotonic()
+        stored = self.storage.upload(self.file, timeout=self.timeout)
+        if time.monotonic() - self.started > self.timeout:
+            # The backend ignored its timeout; the caller has given up on this one
+            discard(self.storage, stored)
+            raise UploadError(f"upload took longer than {self.timeout}s")
+        return stored
+
+    def remaining(self, now):
+        """Seconds left before this upload times out, or None while it is still queued."""
+        return None if self.started is None else self.started + self.timeout - now
+
+
+def upload_files(files, timeout=None):
+    """
+    Upload every file concurrently and return their StoredFiles in order.
+
+    All or nothing: if any upload fails or runs for more than ``timeout``
+    seconds, the rest are abandoned, the files that did make it (including
+    ones that finish late) are deleted and UploadError is raised. Time spent
+    waiting for a free upload thread doesn't count against ``timeout``.
+    """
+    storage = get_storage()
+    timeout = timeout or settings.MEDIA_UPLOAD_TIMEOUT
+    uploads = {get_executor().submit(upload): upload for upload in (Upload(storage, file, timeout) for file in files)}
+
+    pending, failed = set(uploads), False
+    while pending and not failed:
+        now = time.monotonic()
+        remaining = [left for left in (uploads[future].remaining(now) for future in pending) if left is not None]
+        if any(left <= 0 for left in remaining):
+            break
+        # Queued uploads are looked at again every tenth of the timeout, in case they have started
+        done, pending = wait(pending, timeout=min(remaining + [timeout / 10]), return_when=FIRST_EXCEPTION)
+        failed = any(future.exception() for future in done)
+
+    if not pending and not failed:
+        return [future.result() for future in uploads]
+
+    for future in uploads:
+        future.cancel()
+        future.add_done_callback(
+            lambda f: not f.cancelled() and f.exception() is None and discard(storage, f.result())
+        )
+    errors = [repr(future.exception()) for future in uploads if future.done() and not future.cancelled()
+              and future.exception()]
+    now = time.monotonic()
+    timed_out = sum(1 for future in pending if (uploads[future].remaining(now) or 1) <= 0)
+    if timed_out:
+        errors.append(f"{timed_out} upload(s) timed out after {timeout}s")
+    raise UploadError('; '.join(errors) or "abandoned after another upload failed")
 
 
+def discard(storage, stored):
+    try:
+        storage.delete(stored)
+    except Exception:
+        logger.exception("Could not remove uploaded file %s", stored.key)
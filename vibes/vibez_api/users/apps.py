@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class UsersConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "vibez_api.users"
+    label = "users"
+
+    def ready(self):
+        from . import signals  # noqa: F401
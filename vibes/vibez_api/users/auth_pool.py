@@ -0,0 +1,55 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class Overloaded(Exception):
+    """Raised when AUTH_HASH_MAX_PENDING password hashes are already queued or running."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_admission = threading.BoundedSemaphore(settings.AUTH_HASH_MAX_PENDING)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.AUTH_HASH_WORKERS, thread_name_prefix='auth-hash')
+    return _executor
+
+
+def _run(func, *args, **kwargs):
+    # Pool threads outlive requests, so they manage their own connections.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_hashing(func, *args, **kwargs):
+    """
+    Run ``func`` (anything that hashes or checks a password) on the auth pool.
+
+    At most AUTH_HASH_WORKERS hashes run at once, so a burst of logins cannot
+    take every core from the rest of the app, and at most
+    AUTH_HASH_MAX_PENDING are accepted at all: beyond that Overloaded is
+    raised straight away instead of queueing requests that would time out.
+    """
+    if not _admission.acquire(blocking=False):
+        raise Overloaded
+    try:
+        future = get_executor().submit(partial(_run, func, *args, **kwargs))
+    except BaseException:
+        _admission.release()
+        raise
+    # Released when the hash finishes, not when the caller stops waiting
+    future.add_done_callback(lambda _: _admission.release())
+    return await asyncio.wrap_future(future)
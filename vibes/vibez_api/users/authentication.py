@@ -0,0 +1,144 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+from ..replicas import primary
+
+
+def stamp_cache():
+    return caches[settings.AUTH_TOKEN_CACHE_ALIAS]
+
+
+def stamp_key(user_id):
+    return f'auth-token:user:{user_id}'
+
+
+class TokenCache:
+    """
+    Bounded LRU of token key -> (user, token, loaded_at) with a TTL on each
+    entry. Thread-safe; one instance is shared by the whole process.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] + self.ttl < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        return entry
+
+    def set(self, key, user, token, loaded_at):
+        with self.lock:
+            self.entries[key] = (user, token, loaded_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+
+
+def invalidate_user(user_id, token_key=None):
+    """
+    Stamp ``user_id`` as changed now. Entries for the user loaded before the
+    stamp are misses in every process sharing the stamp cache.
+    """
+    stamp_cache().set(stamp_key(user_id), time.time(), None)
+    if token_key:
+        token_cache.discard(token_key)
+
+
+def _stamp_allows(stamp, loaded_at):
+    return stamp is None or stamp + settings.AUTH_TOKEN_CLOCK_SKEW < loaded_at
+
+
+def is_current(user_id, loaded_at):
+    return _stamp_allows(stamp_cache().get(stamp_key(user_id)), loaded_at)
+
+
+async def ais_current(user_id, loaded_at):
+    return _stamp_allows(await stamp_cache().aget(stamp_key(user_id)), loaded_at)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that only queries Token and User on a cache miss.
+
+    A hit costs one lookup of the user's invalidation stamp in the shared
+    cache instead of the Token JOIN User query. The stamp is a timestamp
+    rather than a counter so that an invalidation landing while a miss is
+    being loaded still wins: the entry is stamped with the time the load
+    started, not when it finished.
+    """
+
+    def cached_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is not None:
+            user, token, loaded_at = entry
+            if is_current(user.pk, loaded_at):
+                return copy.copy(user), token
+            token_cache.discard(key)
+        return None
+
+    async def acached_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is not None:
+            user, token, loaded_at = entry
+            if await ais_current(user.pk, loaded_at):
+                return copy.copy(user), token
+            token_cache.discard(key)
+        return None
+
+    def authenticate_credentials(self, key):
+        cached = self.cached_credentials(key)
+        if cached is not None:
+            return cached
+
+        loaded_at = time.time()
+        # A replica may not have a token issued moments ago, nor the change
+        # that invalidated an entry, so loads always go to the primary.
+        with primary():
+            user, token = super().authenticate_credentials(key)
+        token_cache.set(key, copy.copy(user), token, loaded_at)
+        return user, token
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views. Cache hits are answered on the event
+        loop, checking the user's stamp with the cache's async API; misses and
+        malformed headers go through the sync path.
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 2:
+            try:
+                cached = await self.acached_credentials(auth[1].decode())
+            except UnicodeError:
+                cached = None
+            if cached is not None:
+                return cached
+        return await sync_to_async(self.authenticate)(request)
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models import F
+
+from .models import Follow, UserStats
+from ..posts.timeline import author_gained_follower, author_lost_follower, forget_author
+
+
+def adjust_follow_counts(follower_id, following_id, delta):
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=follower_id), UserStats(user_id=following_id)], ignore_conflicts=True
+    )
+    UserStats.objects.filter(user_id=follower_id).update(following_count=F('following_count') + delta)
+    UserStats.objects.filter(user_id=following_id).update(followers_count=F('followers_count') + delta)
+
+
+def follow(follower, following):
+    """Returns True if a new follow was created."""
+    with transaction.atomic():
+        _, created = Follow.objects.get_or_create(follower=follower, following=following)
+        if created:
+            adjust_follow_counts(follower.pk, following.pk, 1)
+            author_gained_follower(follower.pk, following.pk)
+    return created
+
+
+def unfollow(follower, following):
+    """Returns True if an existing follow was removed."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(follower=follower, following=following).delete()
+        if deleted:
+            adjust_follow_counts(follower.pk, following.pk, -1)
+            forget_author(follower.pk, following.pk)
+            author_lost_follower(following.pk)
+    return bool(deleted)
+
+
+def get_stats(user):
+    stats = UserStats.objects.filter(user=user).first()
+    return {
+        'followers_count': stats.followers_count if stats else 0,
+        'following_count': stats.following_count if stats else 0,
+    }
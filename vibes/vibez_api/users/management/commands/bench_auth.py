@@ -0,0 +1,69 @@
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from vibez_api.benchmarks import HttpClient, Recorder, bench_users, run_threads
+
+PASSWORD = 'bench-password-1'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure feed read latency on a running server, first alone and then during a login storm. "
+        "Start the server against the same database first, e.g. `uvicorn vibes.asgi:application` "
+        "or `gunicorn vibes.wsgi` to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--readers', type=int, default=8, help="Threads reading the feed.")
+        parser.add_argument('--logins', type=int, default=16, help="Threads logging in back to back.")
+        parser.add_argument('--duration', type=float, default=10, help="Seconds per phase.")
+
+    def handle(self, *args, **options):
+        readers, logins = options['readers'], options['logins']
+        with bench_users(readers + logins, prefix='bench_auth') as users:
+            User.objects.filter(pk__in=[user.pk for user in users]).update(password=make_password(PASSWORD))
+            tokens = [Token.objects.create(user=user).key for user in users[:readers]]
+
+            baseline = self.run_phase(options['url'], users, tokens, 0, options['duration'])
+            self.report('reads alone', baseline['reads'])
+            storm = self.run_phase(options['url'], users, tokens, logins, options['duration'])
+            self.report('reads during logins', storm['reads'])
+            self.report('logins', storm['logins'])
+            self.stdout.write(f"logins rejected with 503: {storm['rejected']}")
+
+    def run_phase(self, url, users, tokens, logins, duration):
+        reads, successful_logins, rejected = Recorder(), Recorder(), Recorder()
+        deadline = time.monotonic() + duration
+
+        def read(index):
+            client = HttpClient(url, token=tokens[index])
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                code, _ = client.request('GET', '/api/posts/')
+                reads.record(time.perf_counter() - started, ok=code == 200)
+            client.close()
+
+        def login(index):
+            client = HttpClient(url)
+            username = users[len(tokens) + index].username
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                code, _ = client.request('POST', '/api/auth/login/', {'username': username, 'password': PASSWORD})
+                if code == 503:
+                    rejected.record(time.perf_counter() - started)
+                    time.sleep(0.05)
+                else:
+                    successful_logins.record(time.perf_counter() - started, ok=code == 200)
+            client.close()
+
+        elapsed = run_threads(lambda index: read(index) if index < len(tokens) else login(index - len(tokens)),
+                              len(tokens) + logins)
+        return {'reads': reads.summary(elapsed), 'logins': successful_logins.summary(elapsed), 'rejected': len(rejected.latencies)}
+
+    def report(self, label, summary):
+        self.stdout.write(f"{label}: " + ", ".join(f"{key}={value}" for key, value in summary.items()))
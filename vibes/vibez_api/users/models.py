@@ -0,0 +1,29 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class Follow(models.Model):
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
+    following = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('follower', 'following')
+        constraints = [
+            models.CheckConstraint(
+                check=~models.Q(follower=models.F('following')),
+                name="follow_cannot_follow_self"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.follower_id} follows {self.following_id}"
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.followers_count} followers, {self.following_count} following"
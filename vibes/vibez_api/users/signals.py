@@ -0,0 +1,21 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_user
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Covers deactivation and deletion; stamp after commit so a request that
+    # loads the user in between cannot cache the old row under the new stamp.
+    transaction.on_commit(partial(invalidate_user, instance.pk))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_user, instance.user_id, instance.key))
@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import SignupView, LoginView, LogoutView
+from .views import SignupView, LoginView, LogoutView, UserDetailView, FollowView
 
 urlpatterns = [
     path('signup/', SignupView.as_view(), name='signup'),
     path('login/', LoginView.as_view(), name='login'),
-    path('logout/', LogoutView.as_view(), name='logout')
+    path('logout/', LogoutView.as_view(), name='logout'),
+    path('users/<int:user_id>/', UserDetailView.as_view(), name='user-detail'),
+    path('users/<int:user_id>/follow/', FollowView.as_view(), name='user-follow'),
 ]
\ No newline at end of file
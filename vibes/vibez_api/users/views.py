@@ -1,3 +1,10 @@
+import json
+import logging
+
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -7,38 +14,97 @@ from rest_framework.permissions import IsAuthenticated
 from django.core.exceptions import ObjectDoesNotExist
 
 from rest_framework.authtoken.models import Token
+from rest_framework.generics import get_object_or_404
+from django.contrib.auth.models import User
+from .follows import follow, unfollow, get_stats
+from .auth_pool import run_hashing, Overloaded
+from ..replicas import apin_to_primary
 
-class SignupView(APIView):
+logger = logging.getLogger(__name__)
 
-    def post(self, request):
 
-        serializer = UserSerializer(data=request.data)
+def read_request_data(request):
+    """The JSON or form body of a plain Django request, or None if it can't be parsed."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
 
-        if serializer.is_valid():
-            user = serializer.save()
-            token, created = Token.objects.get_or_create(user=user)
+def overloaded_response():
+    response = JsonResponse(
+        {'errors': 'Too many sign-in attempts in progress, please retry shortly.'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response['Retry-After'] = '1'
+    return response
 
-            return Response({'user': UserSerializer(user).data,'token': token.key, 'message':'User created successfully'}, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def signup(data):
+    serializer = UserSerializer(data=data)
 
-class LoginView(APIView):
+    if serializer.is_valid():
+        user = serializer.save()
+        token, created = Token.objects.get_or_create(user=user)
 
-    def post(self, request):
-        username = request.data.get('username')
-        password = request.data.get('password')
+        return {'user': UserSerializer(user).data,'token': token.key, 'message':'User created successfully'}, status.HTTP_201_CREATED
+    return serializer.errors, status.HTTP_400_BAD_REQUEST
 
-        print(f'user {username}, pass {password}')
-        if not username or not password:
-            return Response({'errors': 'Username and password are required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = authenticate(username=username, password=password)
+def login(username, password):
+    user = authenticate(username=username, password=password)
 
-        if user is not None:
-            token, created = Token.objects.get_or_create(user=user)
+    if user is not None:
+        token, created = Token.objects.get_or_create(user=user)
 
-            return Response({'user': UserSerializer(user).data,'token': token.key, 'message':'User retrieved successfully'}, status=status.HTTP_200_OK)
-        return Response({'errors': 'Invalid Credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+        return {'user': UserSerializer(user).data,'token': token.key, 'message':'User retrieved successfully'}, status.HTTP_200_OK
+    return {'errors': 'Invalid Credentials'}, status.HTTP_401_UNAUTHORIZED
+
+
+# Signup and login are async views so that, under ASGI, the password hash
+# runs on the bounded auth pool while the event loop keeps serving reads.
+@method_decorator(csrf_exempt, name='dispatch')
+class SignupView(View):
+
+    async def post(self, request):
+        data = read_request_data(request)
+        if data is None:
+            return JsonResponse({'errors': 'Malformed request body.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            body, code = await run_hashing(signup, data)
+        except Overloaded:
+            return overloaded_response()
+        if code == status.HTTP_201_CREATED:
+            # The new account is only on the primary until the replicas catch up
+            await apin_to_primary(body['token'])
+        return JsonResponse(body, status=code)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class LoginView(View):
+
+    async def post(self, request):
+        data = read_request_data(request)
+        if data is None:
+            return JsonResponse({'errors': 'Malformed request body.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        username = data.get('username')
+        password = data.get('password')
+        if not username or not password:
+            return JsonResponse({'errors': 'Username and password are required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            body, code = await run_hashing(login, username, password)
+        except Overloaded:
+            return overloaded_response()
+        if code == status.HTTP_200_OK:
+            # The token may have just been created
+            await apin_to_primary(body['token'])
+        return JsonResponse(body, status=code)
 
 
 class LogoutView(APIView):
@@ -46,8 +112,8 @@ class LogoutView(APIView):
 
     def post(self, request):
         try:
-            print(f'user {request.user.auth_token}')
             request.user.auth_token.delete()
+            logger.info("User %s logged out", request.user.pk)
             return Response({'message': 'Successfully logged out'})
         except ObjectDoesNotExist:
             return Response({
@@ -55,7 +121,31 @@ class LogoutView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class UserDetailView(APIView):
+    permission_classes = [IsAuthenticated]
 
+    def get(self, request, user_id):
+        user = get_object_or_404(User, pk=user_id)
+        return Response({'user': UserSerializer(user).data, **get_stats(user)}, status=status.HTTP_200_OK)
 
 
+class FollowView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, user_id):
+        following = get_object_or_404(User, pk=user_id)
+        if following == request.user:
+            return Response({'errors': 'You cannot follow yourself'}, status=status.HTTP_400_BAD_REQUEST)
+
+        created = follow(request.user, following)
+        return Response(
+            {'message': 'followed' if created else 'already following', **get_stats(following)},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    def delete(self, request, user_id):
+        following = get_object_or_404(User, pk=user_id)
+        if not unfollow(request.user, following):
+            return Response({'errors': 'You are not following this user'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': 'unfollowed', **get_stats(following)}, status=status.HTTP_200_OK)
 
@@ -0,0 +1,70 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class PollingWorker(threading.Thread):
+    """
+    Runs ``process()`` until stopped. Whenever a round finds nothing to do
+    it waits ``poll_interval`` seconds, or until woken.
+    """
+    thread_name = 'worker'
+
+    def __init__(self, poll_interval):
+        super().__init__(name=self.thread_name, daemon=True)
+        self.poll_interval = poll_interval
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+
+    def process(self):
+        """Do one round of work and return how much was done."""
+        raise NotImplementedError
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                handled = self.process()
+            except Exception:
+                logger.exception("%s round failed", self.name)
+                handled = 0
+            finally:
+                connection.close()
+
+            if not handled:
+                self.wakeup.wait(self.poll_interval)
+                self.wakeup.clear()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+
+
+class InProcessWorkers:
+    """
+    Worker threads inside a web process, started on first use when
+    ``enabled_setting`` is on. Without a ``threads_setting`` there is one.
+    """
+
+    def __init__(self, worker_class, enabled_setting, threads_setting=None):
+        self.worker_class = worker_class
+        self.enabled_setting = enabled_setting
+        self.threads_setting = threads_setting
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def wake(self):
+        if not getattr(settings, self.enabled_setting):
+            return
+        with self.lock:
+            if not self.workers:
+                threads = getattr(settings, self.threads_setting) if self.threads_setting else 1
+                for _ in range(threads):
+                    worker = self.worker_class()
+                    worker.start()
+                    self.workers.append(worker)
+        for worker in self.workers:
+            worker.wakeup.set()